@@ -3,7 +3,7 @@ Admin configuration for accounts app
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, OTP
+from .models import User, OTP, CustomerStats
 
 
 @admin.register(User)
@@ -39,3 +39,12 @@ class OTPAdmin(admin.ModelAdmin):
     list_filter = ['purpose', 'is_used', 'created_at']
     search_fields = ['user__email', 'user__mobile', 'otp_code']
     readonly_fields = ['created_at', 'expires_at']
+
+
+@admin.register(CustomerStats)
+class CustomerStatsAdmin(admin.ModelAdmin):
+    """Admin interface for denormalized customer counters"""
+    list_display = ['user', 'total_spent', 'purchases', 'open_services', 'updated_at']
+    search_fields = ['user__email', 'user__name', 'user__mobile']
+    ordering = ['-total_spent']
+    readonly_fields = ['user', 'total_spent', 'purchases', 'open_services', 'updated_at']
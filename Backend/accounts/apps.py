@@ -2,6 +2,7 @@
 App configuration for accounts
 """
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AccountsConfig(AppConfig):
@@ -10,3 +11,5 @@ class AccountsConfig(AppConfig):
     
     def ready(self):
         import accounts.signals  # noqa
+        from accounts.throttling import check_rate_counter
+        checks.register(check_rate_counter)
@@ -0,0 +1,133 @@
+"""
+Stateless JWT authentication for accounts app
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import blacklist_index
+from .models import User, ClaimsUser
+
+
+class UserAuthCache:
+    """
+    In-process {user_id: (role, is_active, token_version)} with a short TTL
+    (USER_AUTH_CACHE_SECONDS). Entries are dropped on User save in this
+    process; other processes pick changes up when the entry expires.
+    """
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, user_id):
+        """Auth state of a user, or None if the user does not exist"""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        state = User.objects.filter(pk=user_id).values_list('role', 'is_active', 'token_version').first()
+        if state is not None:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries = {
+                    key: value for key, value in self._entries.items() if value[0] > now
+                }
+            self._entries[user_id] = (now + settings.USER_AUTH_CACHE_SECONDS, state)
+        return state
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries = {}
+
+
+user_auth_cache = UserAuthCache()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token carrying role, is_active and token_version (copied to
+    access tokens). Blacklist checks go through the in-process
+    blacklist_index, and the outstanding/blacklisted rows are written
+    without loading the user.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['is_active'] = user.is_active
+        token['token_version'] = user.token_version
+        return token
+
+    def check_blacklist(self):
+        if blacklist_index.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        token = self.outstand()
+        blacklisted, created = BlacklistedToken.objects.get_or_create(token=token)
+        transaction.on_commit(lambda: blacklist_index.add(token.jti))
+        return blacklisted, created
+
+    def outstand(self):
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None and user_auth_cache.get(int(user_id)) is None:
+            user_id = None
+        token, _created = OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                'user_id': user_id,
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            }
+        )
+        return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token claims
+    instead of loading the users row. The token_version claim is checked
+    against UserAuthCache, so tokens stop working once the user's role,
+    is_active or password changes. Tokens issued without the claims are
+    served from the same cache.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        state = user_auth_cache.get(user_id)
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        role, is_active, token_version = state
+
+        if 'token_version' in validated_token:
+            if validated_token['token_version'] != token_version:
+                raise AuthenticationFailed(_('Token has been revoked.'), code='token_revoked')
+            role = validated_token.get('role', role)
+            is_active = validated_token.get('is_active', is_active)
+
+        if not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return ClaimsUser.from_claims(
+            id=user_id,
+            role=role,
+            is_active=is_active,
+            token_version=token_version
+        )
@@ -0,0 +1,118 @@
+"""
+In-process index of the refresh token blacklist
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Max
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class TokenBlacklistIndex:
+    """
+    Answers "is this JTI blacklisted?" mostly without a query.
+
+    A Bloom filter holds every blacklisted JTI, so a miss means the token is
+    not blacklisted. A hit is confirmed against an LRU of recently seen
+    blacklisted JTIs and only then against the database. The filter is
+    built on first use, updated directly when this process blacklists a
+    token, and picks up rows blacklisted by other processes with an
+    `id > last seen` read at most every TOKEN_BLACKLIST_SYNC_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._recent = OrderedDict()
+        self._last_id = 0
+        self._synced_at = 0.0
+
+    def rebuild(self):
+        """Load the whole blacklist into a fresh filter"""
+        with self._lock:
+            last_id = BlacklistedToken.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            count = BlacklistedToken.objects.filter(id__lte=last_id).count()
+            bloom = BloomFilter(
+                max(settings.TOKEN_BLACKLIST_BLOOM_CAPACITY, count * 2),
+                settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE
+            )
+            for jti in BlacklistedToken.objects.filter(id__lte=last_id).values_list('token__jti', flat=True).iterator():
+                bloom.add(jti)
+            self._bloom = bloom
+            self._recent.clear()
+            self._last_id = last_id
+            self._synced_at = time.monotonic()
+
+    def sync(self):
+        """Add tokens blacklisted elsewhere since the last sync"""
+        if self._bloom is None:
+            self.rebuild()
+            return
+        if time.monotonic() - self._synced_at < settings.TOKEN_BLACKLIST_SYNC_SECONDS:
+            return
+        with self._lock:
+            rows = list(
+                BlacklistedToken.objects.filter(id__gt=self._last_id)
+                .values_list('id', 'token__jti').order_by('id')
+            )
+            for row_id, jti in rows:
+                self._bloom.add(jti)
+                self._last_id = row_id
+            self._synced_at = time.monotonic()
+
+    def add(self, jti):
+        """Record a token blacklisted by this process"""
+        if self._bloom is None:
+            self.rebuild()
+        with self._lock:
+            self._bloom.add(jti)
+            self._remember(jti)
+
+    def contains(self, jti):
+        self.sync()
+        if jti not in self._bloom:
+            return False
+        with self._lock:
+            if jti in self._recent:
+                self._recent.move_to_end(jti)
+                return True
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            with self._lock:
+                self._remember(jti)
+            return True
+        return False
+
+    def _remember(self, jti):
+        self._recent[jti] = True
+        self._recent.move_to_end(jti)
+        while len(self._recent) > settings.TOKEN_BLACKLIST_RECENT_SIZE:
+            self._recent.popitem(last=False)
+
+
+blacklist_index = TokenBlacklistIndex()
@@ -0,0 +1,124 @@
+"""
+Load test customer registration with concurrent clients.
+
+Runs against a throwaway test database, never the configured one:
+
+    python manage.py benchmark_registration --signups 2000 --clients 8 --retries 0.2
+"""
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from accounts.views import RegisterView
+
+
+class Command(BaseCommand):
+    help = 'Measure signups/sec and queries per signup for POST /auth/register/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=1000, help='Registration requests to send')
+        parser.add_argument('--clients', type=int, default=4, help='Concurrent client threads')
+        parser.add_argument(
+            '--retries', type=float, default=0.1,
+            help='Share of signups that reuse the email of an abandoned unverified account'
+        )
+
+    def handle(self, *args, **options):
+        test_db = None
+        if connection.vendor == 'sqlite':
+            # A file database so every client thread sees the same data
+            fd, test_db = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = test_db
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run_benchmark(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if test_db and os.path.exists(test_db):
+                os.remove(test_db)
+
+    def run_benchmark(self, options):
+        signups = options['signups']
+        retries = int(signups * options['retries'])
+
+        # Abandoned registrations whose email/mobile the retries reuse
+        User.objects.bulk_create([
+            User(email=f'bench-signup{n}@example.com', mobile=f'9{n:09d}', name=f'Stale {n}', is_verified=False)
+            for n in range(signups - retries, signups)
+        ])
+
+        work = queue.Queue()
+        for n in range(signups):
+            work.put(n)
+
+        view = RegisterView.as_view(throttle_classes=[])
+        factory = APIRequestFactory()
+        latencies = []
+        query_counts = []
+        failures = []
+        lock = threading.Lock()
+
+        def client_worker():
+            local, counts = [], []
+            try:
+                while True:
+                    try:
+                        n = work.get_nowait()
+                    except queue.Empty:
+                        break
+                    request = factory.post('/api/auth/register/', {
+                        'name': f'Bench Customer {n}',
+                        'email': f'bench-signup{n}@example.com',
+                        'mobile': f'9{n:09d}',
+                        'password': 'Bench-pass-123',
+                        'password_confirm': 'Bench-pass-123',
+                    }, format='json')
+                    with CaptureQueriesContext(connections['default']) as queries:
+                        started = time.perf_counter()
+                        response = view(request)
+                        local.append(time.perf_counter() - started)
+                    counts.append(len(queries))
+                    if response.status_code != 201:
+                        with lock:
+                            failures.append((n, response.status_code))
+            finally:
+                connections.close_all()
+                with lock:
+                    latencies.extend(local)
+                    query_counts.extend(counts)
+
+        threads = [threading.Thread(target=client_worker) for _ in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        users = User.objects.count()
+
+        self.stdout.write(f'clients={len(threads)} signups={signups} elapsed={elapsed:.2f}s users={users}')
+        self.stdout.write(f'signups/sec: {len(latencies) / elapsed:.1f}')
+        if latencies:
+            self.stdout.write(
+                f'latency p50={latencies[len(latencies) // 2] * 1000:.1f}ms '
+                f'p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms'
+            )
+            self.stdout.write(
+                f'queries per signup: min={min(query_counts)} max={max(query_counts)} '
+                f'avg={sum(query_counts) / len(query_counts):.1f}'
+            )
+        if failures:
+            self.stdout.write(self.style.WARNING(f'{len(failures)} request(s) failed, e.g. {failures[:5]}'))
@@ -0,0 +1,57 @@
+"""
+Delete abandoned unverified registrations in batches.
+
+Accounts that never finish OTP verification, and are not replaced by a
+new registration with the same email or mobile, are removed here once
+they are older than UNVERIFIED_USER_TTL_HOURS. Accounts with purchases or
+service requests are kept. Run it from cron:
+
+    python manage.py purge_unverified_users
+    python manage.py purge_unverified_users --hours 48 --dry-run
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Delete unverified users older than UNVERIFIED_USER_TTL_HOURS in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None, help='Override UNVERIFIED_USER_TTL_HOURS')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the users that would be deleted')
+
+    def handle(self, *args, **options):
+        hours = options['hours'] if options['hours'] is not None else settings.UNVERIFIED_USER_TTL_HOURS
+        cutoff = timezone.now() - timedelta(hours=hours)
+
+        queryset = User.objects.filter(
+            is_verified=False,
+            is_superuser=False,
+            created_at__lt=cutoff,
+        ).exclude(
+            User.history_exists()
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{queryset.count()} unverified user(s) older than {hours}h would be deleted.')
+            return
+
+        started = time.perf_counter()
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # Re-check is_verified so a user verifying mid-run is not deleted
+            deleted += User.objects.filter(id__in=ids, is_verified=False).delete()[1].get(User._meta.label, 0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} unverified user(s) older than {hours}h in {time.perf_counter() - started:.2f}s.'
+        ))
@@ -0,0 +1,46 @@
+"""
+Recompute CustomerStats counters from sales and service requests.
+
+    python manage.py reconcile_customer_stats
+    python manage.py reconcile_customer_stats --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomerStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-customer purchase and service counters and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report mismatches')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fields = ['total_spent', 'purchases', 'open_services']
+        expected = CustomerStats.compute()
+        existing = CustomerStats.objects.in_bulk(list(expected))
+
+        to_create, to_update = [], []
+        for user_id, values in expected.items():
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(CustomerStats(user_id=user_id, **values))
+            elif any(getattr(stats, field) != values[field] for field in fields):
+                self.stdout.write(
+                    f'User #{user_id}: '
+                    + ', '.join(f'{field} {getattr(stats, field)} -> {values[field]}' for field in fields)
+                )
+                for field in fields:
+                    setattr(stats, field, values[field])
+                to_update.append(stats)
+
+        self.stdout.write(f'{len(to_create)} missing row(s), {len(to_update)} drifted row(s).')
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            CustomerStats.objects.bulk_create(to_create, batch_size=options['batch_size'])
+            CustomerStats.objects.bulk_update(to_update, fields, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Customer stats reconciled.'))
@@ -0,0 +1,89 @@
+"""
+Purge leftover OTP rows and expired entries of the OTP cache.
+
+OTP codes live in the cache (accounts.otp) and expire there; this removes
+what the TTLs leave behind: rows of the old OTP table, codes still stored
+on users, and expired rows of a database-backed cache. Run it from cron,
+or keep it running in the background with --interval:
+
+    python manage.py sweep_otps
+    python manage.py sweep_otps --interval 300
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management.base import BaseCommand
+from django.db import connections, router
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import OTP, User
+
+
+class Command(BaseCommand):
+    help = 'Delete leftover OTP rows and expired OTP cache entries in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help='Repeat every N seconds (0: run once)')
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options['batch_size'])
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        now = timezone.now()
+        rows = self.delete_in_batches(
+            OTP.objects.filter(Q(expires_at__lte=now) | Q(is_used=True)), batch_size
+        )
+
+        cleared = 0
+        while True:
+            ids = list(User.objects.filter(otp__isnull=False).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            cleared += User.objects.filter(id__in=ids).update(otp=None, otp_created_at=None)
+
+        expired = self.delete_expired_cache_entries(caches[settings.OTP_CACHE_ALIAS], batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {rows} OTP row(s) and {expired} expired cache entr(ies); '
+            f'cleared codes on {cleared} user(s).'
+        ))
+
+    @staticmethod
+    def delete_in_batches(queryset, batch_size):
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
+
+    @staticmethod
+    def delete_expired_cache_entries(cache, batch_size):
+        """Other backends (Redis, locmem, file) evict expired keys themselves"""
+        if not isinstance(cache, DatabaseCache):
+            return 0
+
+        connection = connections[router.db_for_write(cache.cache_model_class)]
+        table = connection.ops.quote_name(settings.CACHES[settings.OTP_CACHE_ALIAS]['LOCATION'])
+        expires = connection.ops.adapt_datetimefield_value(timezone.now().replace(microsecond=0))
+        deleted = 0
+        with connection.cursor() as cursor:
+            # Select a batch of keys, then delete those: MySQL rejects LIMIT in an IN subquery
+            while True:
+                cursor.execute(f'SELECT cache_key FROM {table} WHERE expires < %s LIMIT %s', [expires, batch_size])
+                keys = [row[0] for row in cursor.fetchall()]
+                if not keys:
+                    return deleted
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE cache_key IN ({", ".join(["%s"] * len(keys))})',
+                    keys
+                )
+                deleted += cursor.rowcount
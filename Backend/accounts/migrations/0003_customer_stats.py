@@ -0,0 +1,58 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:31
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_customer_stats(apps, schema_editor):
+    """One counters row per existing user, computed from current data"""
+    User = apps.get_model('accounts', 'User')
+    CustomerStats = apps.get_model('accounts', 'CustomerStats')
+    Sale = apps.get_model('sales', 'Sale')
+    ServiceRequest = apps.get_model('service', 'ServiceRequest')
+
+    stats = {
+        user_id: CustomerStats(user_id=user_id)
+        for user_id in User.objects.values_list('id', flat=True).iterator()
+    }
+    for row in Sale.objects.filter(status='verified').values('customer_id').annotate(
+        total=models.Sum('amount'), count=models.Count('id')
+    ).order_by():
+        stats[row['customer_id']].total_spent = row['total']
+        stats[row['customer_id']].purchases = row['count']
+    for row in ServiceRequest.objects.filter(
+        status__in=['pending', 'in_progress']
+    ).values('customer_id').annotate(count=models.Count('id')).order_by():
+        stats[row['customer_id']].open_services = row['count']
+    CustomerStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_role'),
+        ('sales', '0001_initial'),
+        ('service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('purchases', models.IntegerField(default=0)),
+                ('open_services', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Customer Stats',
+                'verbose_name_plural': 'Customer Stats',
+                'db_table': 'customer_stats',
+                'indexes': [models.Index(fields=['total_spent'], name='customer_st_total_s_0e9f2e_idx'), models.Index(fields=['purchases'], name='customer_st_purchas_935d86_idx'), models.Index(fields=['open_services'], name='customer_st_open_se_ac5db7_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
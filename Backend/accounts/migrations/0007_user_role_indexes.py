@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:57
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_rate_limit_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'is_active'], name='accounts_us_role_2b136f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'created_at'], name='accounts_us_role_cf74dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(models.F('role'), django.db.models.functions.text.Lower('name'), name='user_role_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(models.F('role'), django.db.models.functions.text.Lower('email'), name='user_role_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'mobile'], name='accounts_us_role_644761_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.9 on 2026-10-18 23:40
+
+from django.db import migrations
+
+# (name, columns): LIKE 'prefix%' can only use an index with the pattern_ops
+# operator class unless the column has the C collation
+PATTERN_INDEXES = [
+    ('user_role_name_pattern_idx', 'role, LOWER(name) text_pattern_ops'),
+    ('user_role_email_pattern_idx', 'role, LOWER(email) text_pattern_ops'),
+    ('user_role_mobile_pattern_idx', 'role, mobile varchar_pattern_ops'),
+]
+
+
+def create_pattern_indexes(apps, schema_editor):
+    """Prefix-search indexes for User.search_customers (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('accounts', 'User')._meta.db_table)
+    for name, columns in PATTERN_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in PATTERN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_role_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
@@ -2,8 +2,12 @@
 Custom User Model for 2 Wheeler Sales Management System
 """
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.apps import apps
+from django.db import models, router
+from django.db.models import Case, Count, Exists, F, OuterRef, Sum, Value, When
+from django.db.models.functions import Lower
 from django.utils import timezone
+from decimal import Decimal
 
 
 class UserManager(BaseUserManager):
@@ -57,8 +61,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     otp_created_at = models.DateTimeField(null=True, blank=True)
     is_verified = models.BooleanField(default=False)
     
+    # Embedded in JWTs; bumped when role, is_active or password change so
+    # that tokens issued before are rejected (see accounts.authentication)
+    token_version = models.PositiveIntegerField(default=0)
+    
     objects = UserManager()
     
+    AUTH_STATE_FIELDS = ('role', 'is_active', 'password')
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name', 'mobile']
     
@@ -66,10 +76,84 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['role', 'is_active']),
+            models.Index(fields=['role', 'created_at']),
+            # Order for prefix search (User.search_customers); the LIKE
+            # itself uses pattern_ops indexes on PostgreSQL (migration 0008)
+            models.Index(F('role'), Lower('name'), name='user_role_name_lower_idx'),
+            models.Index(F('role'), Lower('email'), name='user_role_email_lower_idx'),
+            models.Index(fields=['role', 'mobile']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.email})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_auth_state = instance._auth_state()
+        return instance
+    
+    def _auth_state(self):
+        if any(field in self.get_deferred_fields() for field in self.AUTH_STATE_FIELDS):
+            return None
+        return tuple(getattr(self, field) for field in self.AUTH_STATE_FIELDS)
+    
+    def save(self, *args, **kwargs):
+        """Bump token_version when role, is_active or password changed"""
+        saved = getattr(self, '_saved_auth_state', None)
+        current = self._auth_state()
+        if not self._state.adding and saved is not None and current is not None and saved != current:
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        super().save(*args, **kwargs)
+        self._saved_auth_state = current
+    
+    @classmethod
+    def search_customers(cls, query, limit=20):
+        """
+        Active customers whose name, email or mobile starts with query
+        (case-insensitive), ordered by name. Each field is a LIKE 'query%'
+        on its lowercased value, capped at limit rows. On PostgreSQL the
+        pattern_ops indexes of migration 0008 make that a range scan
+        whatever the database collation, so the cost does not grow with
+        the number of customers.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        
+        if query.isdigit():
+            lookups = [('mobile', F('mobile'))]
+        elif '@' in query:
+            lookups = [('email', Lower('email'))]
+        else:
+            lookups = [('name', Lower('name')), ('email', Lower('email'))]
+        
+        customers = {}
+        for field, expression in lookups:
+            key = f'search_{field}'
+            queryset = cls.objects.alias(**{key: expression}).filter(
+                role='customer',
+                is_active=True,
+                **{f'{key}__startswith': query}
+            ).order_by(key).only('id', 'name', 'email', 'mobile')
+            for user in queryset[:limit]:
+                customers.setdefault(user.id, user)
+        
+        return sorted(customers.values(), key=lambda user: (user.name.lower(), user.id))[:limit]
+    
+    @classmethod
+    def history_exists(cls):
+        """Condition: the user has sales or service requests, live or archived"""
+        condition = None
+        for label in ('sales.Sale', 'sales.ArchivedSale', 'service.ServiceRequest', 'service.ArchivedServiceRequest'):
+            exists = Exists(apps.get_model(label).objects.filter(customer=OuterRef('pk')))
+            condition = exists if condition is None else condition | exists
+        return condition
+    
     def get_full_name(self):
         return self.name
     
@@ -77,6 +161,32 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.name.split()[0] if self.name else self.email
 
 
+class ClaimsUser(User):
+    """
+    User rebuilt from access token claims without a query. Fields missing
+    from the claims are deferred and load together on first access.
+    """
+    
+    class Meta:
+        proxy = True
+    
+    @classmethod
+    def from_claims(cls, **claims):
+        """e.g. from_claims(id=5, role='customer', is_active=True, token_version=0)"""
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in claims]
+        return cls.from_db(
+            router.db_for_read(cls),
+            field_names,
+            [claims[field_name] for field_name in field_names]
+        )
+    
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using, fields)
+
+
 class OTP(models.Model):
     """OTP model for email/mobile verification"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='otps')
@@ -92,3 +202,114 @@ class OTP(models.Model):
     
     def __str__(self):
         return f"OTP for {self.user.email} - {self.purpose}"
+
+
+class CustomerStats(models.Model):
+    """
+    Denormalized per-user purchase and service counters, kept current with
+    F() updates from sale verify/cancel and service status changes.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    purchases = models.IntegerField(default=0)
+    open_services = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'customer_stats'
+        verbose_name = 'Customer Stats'
+        verbose_name_plural = 'Customer Stats'
+        indexes = [
+            models.Index(fields=['total_spent']),
+            models.Index(fields=['purchases']),
+            models.Index(fields=['open_services']),
+        ]
+    
+    def __str__(self):
+        return f"Stats for user #{self.user_id}"
+    
+    @classmethod
+    def bump(cls, user_id, **deltas):
+        """Atomically add deltas, e.g. bump(5, purchases=1, total_spent=amount)"""
+        cls.bump_many({user_id: deltas})
+    
+    @classmethod
+    def bump_many(cls, deltas_by_user):
+        """Apply {user_id: {field: delta}} with a single UPDATE"""
+        deltas_by_user = {user_id: deltas for user_id, deltas in deltas_by_user.items() if deltas}
+        if not deltas_by_user:
+            return
+        
+        cls.objects.bulk_create(
+            [cls(user_id=user_id) for user_id in deltas_by_user],
+            ignore_conflicts=True
+        )
+        fields = {field for deltas in deltas_by_user.values() for field in deltas}
+        updates = {}
+        for field in fields:
+            output_field = cls._meta.get_field(field)
+            if len(deltas_by_user) == 1:
+                (deltas,) = deltas_by_user.values()
+                updates[field] = F(field) + Value(deltas.get(field, 0), output_field=output_field)
+                continue
+            updates[field] = F(field) + Case(
+                *[When(user_id=user_id, then=Value(deltas.get(field, 0), output_field=output_field))
+                  for user_id, deltas in deltas_by_user.items()],
+                default=Value(0, output_field=output_field),
+                output_field=output_field
+            )
+        cls.objects.filter(user_id__in=deltas_by_user).update(updated_at=timezone.now(), **updates)
+    
+    @classmethod
+    def compute(cls, user_ids=None):
+        """Recompute counters from sales and service requests: {user_id: {field: value}}"""
+        ServiceRequest = apps.get_model('service', 'ServiceRequest')
+        
+        # Verified sales may have been moved to the archive table
+        sales = [
+            apps.get_model('sales', name).objects.filter(status='verified')
+            for name in ('Sale', 'ArchivedSale')
+        ]
+        services = ServiceRequest.objects.filter(status__in=['pending', 'in_progress'])
+        users = User.objects.all()
+        if user_ids is not None:
+            sales = [queryset.filter(customer_id__in=user_ids) for queryset in sales]
+            services = services.filter(customer_id__in=user_ids)
+            users = users.filter(id__in=user_ids)
+        
+        stats = {
+            user_id: {'total_spent': Decimal('0.00'), 'purchases': 0, 'open_services': 0}
+            for user_id in users.values_list('id', flat=True)
+        }
+        for queryset in sales:
+            for row in queryset.values('customer_id').annotate(
+                total=Sum('amount'), count=Count('id')
+            ).order_by():
+                stats[row['customer_id']]['total_spent'] += row['total']
+                stats[row['customer_id']]['purchases'] += row['count']
+        for row in services.values('customer_id').annotate(count=Count('id')).order_by():
+            stats[row['customer_id']]['open_services'] = row['count']
+        return stats
+
+
+class RateLimitCounter(models.Model):
+    """
+    Request count of one throttle key in one fixed window, shared by all
+    worker processes (see accounts.throttling.DatabaseRateCounter).
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'rate_limit_counters'
+        verbose_name = 'Rate Limit Counter'
+        verbose_name_plural = 'Rate Limit Counters'
+    
+    def __str__(self):
+        return f"{self.key}: {self.count}"
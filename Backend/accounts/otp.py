@@ -0,0 +1,56 @@
+"""
+OTP store for accounts app, backed by Django's cache framework
+"""
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+
+class OTPStore:
+    """
+    One-time codes keyed by (purpose, email) in the OTP_CACHE_ALIAS cache.
+    Codes expire through the cache's own TTL (OTP_TTL_SECONDS), and a
+    separate key enforces the resend cooldown (OTP_RESEND_COOLDOWN_SECONDS),
+    so issuing and verifying are single cache operations. The cache must be
+    shared between processes (database, file or Redis, not locmem).
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.OTP_CACHE_ALIAS]
+
+    @staticmethod
+    def _key(prefix, email, purpose):
+        return f'{prefix}:{purpose}:{email.strip().lower()}'
+
+    def issue(self, email, purpose='email_verification'):
+        """Store and return a new code, or None while the previous one is cooling down"""
+        cooldown_key = self._key('otp-cooldown', email, purpose)
+        if not self.cache.add(cooldown_key, 1, settings.OTP_RESEND_COOLDOWN_SECONDS):
+            return None
+        code = f'{secrets.randbelow(900000) + 100000}'
+        self.cache.set(self._key('otp', email, purpose), code, settings.OTP_TTL_SECONDS)
+        return code
+
+    def verify(self, email, code, purpose='email_verification'):
+        """
+        Consume the code if it matches; False when wrong or expired. The
+        code is claimed by deleting it: delete() reports whether this call
+        removed the key, so of two concurrent requests only one succeeds.
+        """
+        key = self._key('otp', email, purpose)
+        stored = self.cache.get(key)
+        if stored is None or not constant_time_compare(stored, str(code)):
+            return False
+        return bool(self.cache.delete(key))
+
+    def discard(self, email, purpose='email_verification'):
+        self.cache.delete_many([
+            self._key('otp', email, purpose),
+            self._key('otp-cooldown', email, purpose),
+        ])
+
+
+otp_store = OTPStore()
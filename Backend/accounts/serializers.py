@@ -3,19 +3,21 @@ Serializers for accounts app
 """
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from django.utils import timezone
-from datetime import timedelta
-import random
 from django.db import transaction
-from django.db.models import Q
-from .models import User, OTP
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from .authentication import ClaimsRefreshToken, user_auth_cache
+from .otp import otp_store
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration (Customer & Admin)
     Handles:
         - Password validation
-        - Duplicate unverified user cleanup
+        - Replacing unverified registrations of the same email/mobile
         - OTP generation for customers
         - Admin vs Customer creation logic
     """
@@ -44,41 +46,75 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         }
 
     def validate(self, attrs):
-        """Validate password confirmation"""
+        """
+        Validate password confirmation and look up existing accounts for
+        the email and mobile in one query. Verified accounts block
+        registration, and so do unverified ones with purchases or service
+        requests: replacing those would delete or hand over that history.
+        Other unverified accounts are replaced by create().
+        """
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError({"password": "Password fields didn't match."})
+        
+        existing = list(
+            User.objects.filter(Q(email=attrs['email']) | Q(mobile=attrs['mobile']))
+            .annotate(has_history=ExpressionWrapper(User.history_exists(), output_field=BooleanField()))
+        )
+        errors = {}
+        for user in existing:
+            if user.is_verified:
+                if user.email == attrs['email']:
+                    errors['email'] = ["A verified user with this email already exists."]
+                if user.mobile == attrs['mobile']:
+                    errors['mobile'] = ["A verified user with this mobile number already exists."]
+            elif user.has_history:
+                if user.email == attrs['email']:
+                    errors.setdefault('email', ["An account with this email is awaiting verification."])
+                if user.mobile == attrs['mobile']:
+                    errors.setdefault('mobile', ["An account with this mobile number is awaiting verification."])
+        if errors:
+            raise serializers.ValidationError(errors)
+        
+        attrs['unverified_users'] = existing
         return attrs
 
-    def validate_email(self, value):
-        """Only block if a verified user exists"""
-        if User.objects.filter(email=value, is_verified=True).exists():
-            raise serializers.ValidationError("A verified user with this email already exists.")
-        return value
-
-    def validate_mobile(self, value):
-        if User.objects.filter(mobile=value, is_verified=True).exists():
-            raise serializers.ValidationError("A verified user with this mobile number already exists.")
-        return value
+    def save_user(self, email, mobile, password, unverified_users, fields, superuser=False):
+        """
+        Delete the unverified registrations holding this email or mobile and
+        create the user, as plain registration always did. A customer
+        registering again with the same email, and no other registration
+        holding the mobile, updates their own row instead.
+        """
+        own = [user for user in unverified_users if user.email == email]
+        if (not superuser and len(own) == len(unverified_users) == 1
+                and own[0].role == fields['role'] == 'customer'):
+            user = own[0]
+            user.mobile = mobile
+            user.set_password(password)
+            for field, value in fields.items():
+                setattr(user, field, value)
+            user.save()
+            return user
+        
+        create = User.objects.create_superuser if superuser else User.objects.create_user
+        with transaction.atomic():
+            if unverified_users:
+                # Re-checked in the DELETE: a purchase made since validate() keeps the account
+                User.objects.filter(
+                    id__in=[user.id for user in unverified_users], is_verified=False
+                ).exclude(User.history_exists()).delete()
+            return create(email=email, password=password, mobile=mobile, **fields)
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
+        unverified_users = validated_data.pop('unverified_users', [])
 
         user_type = self.context.get('user_type', 'customer')
 
         email = validated_data.pop('email')   # ✅ POP IT
         mobile = validated_data.pop('mobile') # ✅ POP IT
 
-        # Cleanup unverified duplicates
-        with transaction.atomic():
-            unverified_users = User.objects.filter(
-                Q(email=email) | Q(mobile=mobile),
-                is_verified=False
-            )
-            if unverified_users.exists():
-                OTP.objects.filter(user__in=unverified_users).delete()
-                unverified_users.delete()
-
         # =============================
         # DEVELOPER (DJANGO ADMIN USER)
         # =============================
@@ -90,12 +126,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
                 'is_verified': True,
             })
 
-            user = User.objects.create_superuser(
-                email=email,
-                password=password,
-                mobile=mobile,
-                **validated_data
-            )
+            user = self.save_user(email, mobile, password, unverified_users, validated_data, superuser=True)
             return user
 
         # =============================
@@ -109,25 +140,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
                 'is_verified': False,
             })
 
-            user = User.objects.create_user(
-                email=email,
-                password=password,
-                mobile=mobile,
-                **validated_data
-            )
+            user = self.save_user(email, mobile, password, unverified_users, validated_data)
 
             # OTP for admin
-            otp_code = str(random.randint(100000, 999999))
-            OTP.objects.create(
-                user=user,
-                otp_code=otp_code,
-                purpose='email_verification',
-                expires_at=timezone.now() + timedelta(minutes=5)
-            )
-
-            user.otp = otp_code
-            user.otp_created_at = timezone.now()
-            user.save()
+            self.otp_code = self.issue_otp(email)
 
             return user
 
@@ -141,27 +157,18 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             'is_verified': False,
         })
 
-        user = User.objects.create_user(
-            email=email,
-            password=password,
-            mobile=mobile,
-            **validated_data
-        )
-
-        otp_code = str(random.randint(100000, 999999))
-        OTP.objects.create(
-            user=user,
-            otp_code=otp_code,
-            purpose='email_verification',
-            expires_at=timezone.now() + timedelta(minutes=5)
-        )
+        user = self.save_user(email, mobile, password, unverified_users, validated_data)
 
-        user.otp = otp_code
-        user.otp_created_at = timezone.now()
-        user.save()
+        self.otp_code = self.issue_otp(email)
 
         return user
 
+    @staticmethod
+    def issue_otp(email):
+        """A fresh code replaces any pending one from an earlier registration"""
+        otp_store.discard(email)
+        return otp_store.issue(email)
+
 
 class UserLoginSerializer(serializers.Serializer):
     """Serializer for user login"""
@@ -190,25 +197,13 @@ class OTPVerificationSerializer(serializers.Serializer):
                 "email": "User with this email does not exist."
             })
         
-        otp_obj = OTP.objects.filter(
-            user=user,
-            otp_code=otp_code,
-            purpose='email_verification',
-            is_used=False
-        ).first()
-        
-        if not otp_obj:
+        # Consumes the code, so it cannot be used twice
+        if not otp_store.verify(email, otp_code):
             raise serializers.ValidationError({
                 "otp_code": "Invalid or expired OTP."
             })
         
-        if otp_obj.expires_at < timezone.now():
-            raise serializers.ValidationError({
-                "otp_code": "OTP has expired."
-            })
-        
         attrs['user'] = user
-        attrs['otp_obj'] = otp_obj
         return attrs
 
 
@@ -220,9 +215,66 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'is_verified']
 
 
+class CustomerSerializer(UserSerializer):
+    """User details with denormalized purchase/service counters (admin customer screens)"""
+    total_spent = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    purchases = serializers.IntegerField(source='purchase_count', read_only=True)
+    open_services = serializers.IntegerField(read_only=True)
+    
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['total_spent', 'purchases', 'open_services']
+
+
+class CustomerSearchSerializer(serializers.ModelSerializer):
+    """Compact customer rows for the admin customer picker"""
+    class Meta:
+        model = User
+        fields = ['id', 'name', 'email', 'mobile']
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for user profile update"""
     class Meta:
         model = User
         fields = ['id', 'name', 'email', 'mobile', 'role', 'is_active', 'is_verified', 'created_at']
         read_only_fields = ['id', 'email', 'role', 'created_at', 'is_verified']
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh using the cached user auth state instead of loading the user;
+    tokens from before a role/is_active/password change are refused, and
+    rotated tokens get the current claims.
+    """
+    token_class = ClaimsRefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        state = user_auth_cache.get(int(user_id)) if user_id is not None else None
+        if (
+            state is None
+            or not state[1]
+            or refresh.payload.get('token_version', state[2]) != state[2]
+        ):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+        refresh['role'], refresh['is_active'], refresh['token_version'] = state
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            
+            data['refresh'] = str(refresh)
+        
+        return data
@@ -3,7 +3,18 @@ Signals for accounts app
 """
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import User
+from .models import User, CustomerStats
+from .authentication import user_auth_cache
 
-# Add any signals here if needed in the future
-# For example, sending welcome emails, creating profiles, etc.
+
+@receiver(post_save, sender=User)
+def create_customer_stats(sender, instance, created, raw=False, **kwargs):
+    """Give every new user a zeroed counters row"""
+    if created and not raw:
+        CustomerStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """Drop this process's cached auth state so the new token_version applies at once"""
+    user_auth_cache.invalidate(instance.pk)
@@ -0,0 +1,153 @@
+"""
+Tests for accounts app
+"""
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from inventory.models import Vehicle
+from sales.models import Sale
+from .models import User
+from .serializers import UserRegistrationSerializer
+from .throttling import check_rate_counter
+
+
+class RegistrationCollisionTests(TestCase):
+    """Registering over unverified accounts that hold the same email or mobile"""
+
+    def register(self, email, mobile, user_type='customer'):
+        serializer = UserRegistrationSerializer(
+            data={
+                'name': 'New Person',
+                'email': email,
+                'mobile': mobile,
+                'password': 'Str0ng-pass-123',
+                'password_confirm': 'Str0ng-pass-123',
+            },
+            context={'user_type': user_type},
+        )
+        return serializer
+
+    def unverified(self, email, mobile):
+        return User.objects.create_user(
+            email=email, password='old-pass-123', mobile=mobile, name='Old Person', is_verified=False
+        )
+
+    def buy(self, customer):
+        vehicle = Vehicle.objects.create(brand='Hero', model='Splendor', price=Decimal('75000'), stock_qty=5)
+        return Sale.objects.create(customer=customer, vehicle=vehicle, amount=vehicle.price)
+
+    def test_mobile_only_collision_creates_a_new_account(self):
+        other = self.unverified('other@example.com', '9000000001')
+
+        serializer = self.register('new@example.com', '9000000001')
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        user = serializer.save()
+
+        self.assertNotEqual(user.pk, other.pk)
+        self.assertEqual(user.email, 'new@example.com')
+        self.assertFalse(User.objects.filter(pk=other.pk).exists())
+
+    def test_mobile_only_collision_with_purchases_is_refused(self):
+        other = self.unverified('other@example.com', '9000000001')
+        sale = self.buy(other)
+
+        serializer = self.register('new@example.com', '9000000001')
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('mobile', serializer.errors)
+
+        other.refresh_from_db()
+        self.assertEqual(other.email, 'other@example.com')
+        self.assertTrue(Sale.objects.filter(pk=sale.pk, customer=other).exists())
+
+    def test_same_email_reuses_the_unverified_row(self):
+        existing = self.unverified('same@example.com', '9000000001')
+
+        serializer = self.register('same@example.com', '9000000002')
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        user = serializer.save()
+
+        self.assertEqual(user.pk, existing.pk)
+        self.assertEqual(user.mobile, '9000000002')
+        self.assertTrue(user.check_password('Str0ng-pass-123'))
+
+    def test_email_and_mobile_held_by_two_registrations(self):
+        by_email = self.unverified('same@example.com', '9000000001')
+        by_mobile = self.unverified('other@example.com', '9000000002')
+
+        serializer = self.register('same@example.com', '9000000002')
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        user = serializer.save()
+
+        self.assertNotIn(user.pk, (by_email.pk, by_mobile.pk))
+        self.assertEqual(User.objects.filter(is_verified=False).count(), 1)
+
+    def test_admin_registration_does_not_take_over_a_customer_row(self):
+        customer = self.unverified('same@example.com', '9000000001')
+
+        serializer = self.register('same@example.com', '9000000001', user_type='admin')
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        user = serializer.save()
+
+        self.assertNotEqual(user.pk, customer.pk)
+        self.assertEqual(user.role, 'admin')
+
+
+@override_settings(THROTTLE_COUNTER_BACKEND='accounts.throttling.CacheRateCounter', THROTTLE_CACHE_ALIAS='counters')
+class RateCounterCheckTests(SimpleTestCase):
+    """CacheRateCounter needs a cache that every worker shares"""
+
+    def check_with(self, backend):
+        with override_settings(CACHES={'default': {'BACKEND': backend}, 'counters': {'BACKEND': backend}}):
+            return [warning.id for warning in check_rate_counter()]
+
+    def test_locmem_warns(self):
+        self.assertEqual(self.check_with('django.core.cache.backends.locmem.LocMemCache'), ['accounts.W001'])
+
+    def test_database_cache_warns(self):
+        self.assertEqual(self.check_with('django.core.cache.backends.db.DatabaseCache'), ['accounts.W001'])
+
+    def test_redis_passes(self):
+        self.assertEqual(self.check_with('django.core.cache.backends.redis.RedisCache'), [])
+
+    @override_settings(THROTTLE_COUNTER_BACKEND='accounts.throttling.DatabaseRateCounter')
+    def test_database_counter_passes(self):
+        self.assertEqual(self.check_with('django.core.cache.backends.locmem.LocMemCache'), [])
+
+
+class CustomerSearchTests(TestCase):
+    """Prefix search matches with LIKE, so it does not depend on the column collation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for n, (name, email) in enumerate([
+            ('Jo Ann Smith', 'jo.ann@example.com'),
+            ('JOANNA Rao', 'joanna@example.com'),
+            ('Jon_Doe', 'jon_doe@example.com'),
+            ('Jonas 100%', 'jonas@example.com'),
+            ('Maya Jo', 'maya@example.com'),
+        ]):
+            User.objects.create_user(
+                email=email, password=None, name=name, mobile=f'98765{n:05d}', is_verified=True
+            )
+        User.objects.create_user(
+            email='jo.admin@example.com', password=None, name='Jo Admin', mobile='8000000000', role='admin'
+        )
+
+    def names(self, query, limit=20):
+        return [user.name for user in User.search_customers(query, limit)]
+
+    def test_prefix_is_case_insensitive_and_ordered_by_name(self):
+        self.assertEqual(self.names('jo'), ['Jo Ann Smith', 'JOANNA Rao', 'Jon_Doe', 'Jonas 100%'])
+        self.assertEqual(self.names('jo', limit=2), ['Jo Ann Smith', 'JOANNA Rao'])
+
+    def test_spaces_and_wildcards_match_literally(self):
+        self.assertEqual(self.names('jo a'), ['Jo Ann Smith'])
+        self.assertEqual(self.names('jon_'), ['Jon_Doe'])
+        self.assertEqual(self.names('jonas 100%'), ['Jonas 100%'])
+        self.assertEqual(self.names('jo%'), [])
+
+    def test_email_and_mobile(self):
+        self.assertEqual(self.names('jo.ann@'), ['Jo Ann Smith'])
+        self.assertEqual(self.names('9876500001'), ['JOANNA Rao'])
+        self.assertEqual(len(self.names('98765')), 5)
@@ -0,0 +1,160 @@
+"""
+Fixed-window throttles counting in a pluggable counter backend
+
+THROTTLE_COUNTER_BACKEND picks where the counters live:
+
+- DatabaseRateCounter (default): rows in rate_limit_counters, shared by
+  every worker without a cache server, at the cost of a write per throttle
+  on every request (on SQLite those writes queue behind the single writer
+  lock).
+- CacheRateCounter: the THROTTLE_CACHE_ALIAS cache, which must be Redis or
+  Memcached. Other backends are per process (locmem) or have a non-atomic
+  incr(); check_rate_counter warns about them at startup.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+from .models import RateLimitCounter
+
+
+class DatabaseRateCounter:
+    """
+    Counters in the rate_limit_counters table. On SQLite and PostgreSQL a
+    hit is a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING; expired
+    windows are deleted at most once a minute per process.
+    """
+    PURGE_INTERVAL = 60
+
+    def __init__(self):
+        self._purged_at = 0.0
+
+    def hit(self, key, expires_at):
+        """Add one request to `key` and return its count in the window"""
+        now = time.monotonic()
+        if now - self._purged_at > self.PURGE_INTERVAL:
+            self._purged_at = now
+            RateLimitCounter.objects.filter(expires_at__lt=timezone.now()).delete()
+
+        connection = connections[router.db_for_write(RateLimitCounter)]
+        if connection.vendor in ('sqlite', 'postgresql'):
+            quote = connection.ops.quote_name
+            table = quote(RateLimitCounter._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} ({quote("key")}, {quote("count")}, {quote("expires_at")}) '
+                    f'VALUES (%s, 1, %s) ON CONFLICT ({quote("key")}) '
+                    f'DO UPDATE SET {quote("count")} = {table}.{quote("count")} + 1 '
+                    f'RETURNING {quote("count")}',
+                    [key, connection.ops.adapt_datetimefield_value(expires_at)]
+                )
+                return cursor.fetchone()[0]
+
+        if not RateLimitCounter.objects.filter(key=key).update(count=F('count') + 1):
+            try:
+                with transaction.atomic():
+                    RateLimitCounter.objects.create(key=key, count=1, expires_at=expires_at)
+                return 1
+            except IntegrityError:
+                RateLimitCounter.objects.filter(key=key).update(count=F('count') + 1)
+        return RateLimitCounter.objects.values_list('count', flat=True).get(key=key)
+
+
+class CacheRateCounter:
+    """Counters in the THROTTLE_CACHE_ALIAS cache; incr() is atomic on locmem, Redis and Memcached"""
+
+    def hit(self, key, expires_at):
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        cache.add(key, 0, max(1, int(expires_at.timestamp() - time.time()) + 1))
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The window expired between add() and incr()
+            cache.add(key, 1, 1)
+            return 1
+
+
+# Cache backends whose incr() is atomic and shared between processes
+SHARED_COUNTER_CACHES = ('redis', 'memcached')
+
+
+def check_rate_counter(app_configs=None, **kwargs):
+    """System check: CacheRateCounter on a cache that cannot share counters"""
+    backend = import_string(settings.THROTTLE_COUNTER_BACKEND)
+    if not issubclass(backend, CacheRateCounter):
+        return []
+    alias = settings.THROTTLE_CACHE_ALIAS
+    cache_backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if any(name in cache_backend.lower() for name in SHARED_COUNTER_CACHES):
+        return []
+    return [checks.Warning(
+        f"Throttle counters use the '{alias}' cache ({cache_backend}), which is not shared "
+        f"between worker processes or cannot increment atomically; rate limits will not hold.",
+        hint='Point THROTTLE_CACHE_ALIAS at a Redis or Memcached cache, or use '
+             'THROTTLE_COUNTER_BACKEND=accounts.throttling.DatabaseRateCounter.',
+        id='accounts.W001',
+    )]
+
+
+_rate_counter = None
+
+
+def get_rate_counter():
+    global _rate_counter
+    if _rate_counter is None:
+        _rate_counter = import_string(settings.THROTTLE_COUNTER_BACKEND)()
+    return _rate_counter
+
+
+class FixedWindowRateThrottle(throttling.SimpleRateThrottle):
+    """
+    SimpleRateThrottle counting requests per fixed window in a single
+    counter (THROTTLE_COUNTER_BACKEND), instead of a list of timestamps.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = time.time()
+        window = int(now // self.duration)
+        window_end = (window + 1) * self.duration
+        count = get_rate_counter().hit(
+            f'{self.key}:{window}',
+            datetime.fromtimestamp(window_end, tz=dt_timezone.utc)
+        )
+        self.wait_seconds = window_end - now
+        return count <= self.num_requests
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class SharedAnonRateThrottle(FixedWindowRateThrottle, throttling.AnonRateThrottle):
+    """'anon' rate per client IP"""
+
+
+class SharedUserRateThrottle(FixedWindowRateThrottle, throttling.UserRateThrottle):
+    """'user' rate per authenticated user"""
+
+    def get_cache_key(self, request, view):
+        # Anonymous requests are already counted by SharedAnonRateThrottle
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class SharedScopedRateThrottle(throttling.ScopedRateThrottle, FixedWindowRateThrottle):
+    """Rate of the view's throttle_scope (login, register, ...); views without one are not limited"""
@@ -3,7 +3,6 @@ URLs for accounts app
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     RegisterView,
     LoginView,
@@ -14,6 +13,7 @@ from .views import (
     AdminRegisterView,
     ResendOTPView,
     DeveloperRegisterView,
+    ClaimsTokenRefreshView,
 )
 
 router = DefaultRouter()
@@ -24,7 +24,7 @@ urlpatterns = [
     path('admin/register/', AdminRegisterView.as_view()),
     path('developer/register/', DeveloperRegisterView.as_view()),
     path('login/', LoginView.as_view(), name='login'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', ClaimsTokenRefreshView.as_view(), name='token_refresh'),
     path("otp/resend/", ResendOTPView.as_view()),
     path('verify-otp/', VerifyOTPView.as_view(), name='verify-otp'),
     path('logout/', LogoutView.as_view(), name='logout'),
@@ -1,25 +1,30 @@
-from rest_framework import status, generics, viewsets
+from rest_framework import status, generics, viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+from .authentication import ClaimsRefreshToken
 from django.contrib.auth import authenticate
-from .models import User, OTP
+from .models import User
+from .otp import otp_store
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
     OTPVerificationSerializer,
     UserSerializer,
-    UserProfileSerializer
+    CustomerSerializer,
+    CustomerSearchSerializer,
+    UserProfileSerializer,
+    ClaimsTokenRefreshSerializer
 )
 from .permissions import IsAdmin
-from django.utils import timezone
-from datetime import timedelta
-import random
 from django.db import IntegrityError, transaction
+from django.db.models import F
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
+    throttle_scope = 'register'
     serializer_class = UserRegistrationSerializer
 
     def create(self, request, *args, **kwargs):
@@ -43,13 +48,14 @@ class RegisterView(generics.CreateAPIView):
             "success": True,
             "message": "Customer registered successfully. OTP sent.",
             "user": UserSerializer(user).data,
-            "otp": user.otp  # ⚠️ dev/testing only
+            "otp": serializer.otp_code  # ⚠️ dev/testing only
         }, status=status.HTTP_201_CREATED)
 
 
 class AdminRegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
+    throttle_scope = 'register'
     serializer_class = UserRegistrationSerializer
 
     def create(self, request, *args, **kwargs):
@@ -65,12 +71,13 @@ class AdminRegisterView(generics.CreateAPIView):
             "success": True,
             "message": "Admin registered successfully. OTP sent for verification.",
             "user": UserSerializer(user).data,
-            "otp": user.otp  # dev/testing
+            "otp": serializer.otp_code  # dev/testing
         }, status=status.HTTP_201_CREATED)
 
 class DeveloperRegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [AllowAny]  # later restrict
+    throttle_scope = 'register'
     serializer_class = UserRegistrationSerializer
 
     def create(self, request, *args, **kwargs):
@@ -90,6 +97,7 @@ class DeveloperRegisterView(generics.CreateAPIView):
 
 class LoginView(generics.GenericAPIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'login'
     serializer_class = UserLoginSerializer
 
     def post(self, request):
@@ -106,7 +114,7 @@ class LoginView(generics.GenericAPIView):
         if not user.is_active:
             return Response({"success": False, "error": "User account is disabled."}, status=status.HTTP_401_UNAUTHORIZED)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             "success": True,
             "message": "Login successful",
@@ -116,6 +124,7 @@ class LoginView(generics.GenericAPIView):
 
 class ResendOTPView(generics.GenericAPIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'otp_resend'
 
     def post(self, request):
         email = request.data.get("email")
@@ -134,34 +143,15 @@ class ResendOTPView(generics.GenericAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # ⏱️ cooldown check (1 minute)
-        last_otp = OTP.objects.filter(
-            user=user,
-            purpose="email_verification",
-            is_used=False
-        ).order_by("-created_at").first()
+        # ⏱️ generate new OTP unless the last one is still cooling down
+        otp_code = otp_store.issue(user.email)
 
-        if last_otp and timezone.now() < last_otp.created_at + timedelta(minutes=1):
+        if otp_code is None:
             return Response({
                 "success": False,
                 "error": "Please wait 1 minute before resending OTP"
             }, status=status.HTTP_429_TOO_MANY_REQUESTS)
 
-        # generate new OTP
-        otp_code = str(random.randint(100000, 999999))
-        expires_at = timezone.now() + timedelta(minutes=1)
-
-        OTP.objects.create(
-            user=user,
-            otp_code=otp_code,
-            purpose="email_verification",
-            expires_at=expires_at
-        )
-
-        user.otp = otp_code
-        user.otp_created_at = timezone.now()
-        user.save()
-
         return Response({
             "success": True,
             "message": "OTP resent successfully",
@@ -170,6 +160,7 @@ class ResendOTPView(generics.GenericAPIView):
 
 class VerifyOTPView(generics.GenericAPIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'otp_verify'
     serializer_class = OTPVerificationSerializer
 
     def post(self, request):
@@ -177,15 +168,9 @@ class VerifyOTPView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         user = serializer.validated_data['user']
-        otp_obj = serializer.validated_data['otp_obj']
-
-        otp_obj.is_used = True
-        otp_obj.save()
 
         user.is_verified = True
-        user.otp = None
-        user.otp_created_at = None
-        user.save()
+        user.save(update_fields=['is_verified', 'updated_at'])
 
         return Response({
             "success": True,
@@ -194,6 +179,11 @@ class VerifyOTPView(generics.GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class ClaimsTokenRefreshView(TokenRefreshView):
+    """POST /api/auth/token/refresh/ - rotate a refresh token (checked against the blacklist index)"""
+    serializer_class = ClaimsTokenRefreshSerializer
+
+
 class LogoutView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
@@ -201,7 +191,7 @@ class LogoutView(generics.GenericAPIView):
         try:
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = ClaimsRefreshToken(refresh_token)
                 token.blacklist()
 
             return Response({"success": True, "message": "Logout successful."}, status=status.HTTP_200_OK)
@@ -214,17 +204,70 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user is built from token claims; edit the stored row
+        return User.objects.get(pk=self.request.user.pk)
 
 
 class UserViewSet(viewsets.ModelViewSet):
+    """
+    GET /api/auth/users/?role=customer&ordering=-total_spent
+    Customer listings include total_spent, purchases and open_services,
+    read from the CustomerStats counters and sortable via
+    ?ordering=total_spent|purchase_count|open_services.
+    """
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsAdmin]
     serializer_class = UserSerializer
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_at', 'name', 'total_spent', 'purchase_count', 'open_services']
+    ordering = ['-created_at']
+    # Query budgets (config.middleware); search reads up to two index ranges
+    query_budget = {'list': 5, 'retrieve': 3, 'search': 5}
+    SEARCH_MIN_LENGTH = 2
+    SEARCH_DEFAULT_LIMIT = 20
+    SEARCH_MAX_LIMIT = 50
+
+    def get_serializer_class(self):
+        if self.request.query_params.get('role') == 'customer' and self.action in ['list', 'retrieve']:
+            return CustomerSerializer
+        return UserSerializer
 
     def get_queryset(self):
-        queryset = User.objects.all()
+        queryset = User.objects.annotate(
+            total_spent=F('stats__total_spent'),
+            purchase_count=F('stats__purchases'),
+            open_services=F('stats__open_services'),
+        )
         role = self.request.query_params.get('role', None)
         if role:
             queryset = queryset.filter(role=role)
         return queryset
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        GET /api/auth/users/search/?q=jo&limit=20
+        Customer picker: active customers whose name, email or mobile
+        starts with q (case-insensitive), ordered by name
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < self.SEARCH_MIN_LENGTH:
+            return Response({
+                'error': f'q must be at least {self.SEARCH_MIN_LENGTH} characters.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', self.SEARCH_DEFAULT_LIMIT))
+            if limit <= 0:
+                raise ValueError
+        except ValueError:
+            return Response({
+                'error': 'Invalid limit. Must be a positive integer.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, self.SEARCH_MAX_LIMIT)
+
+        customers = User.search_customers(query, limit)
+        return Response({
+            'count': len(customers),
+            'results': CustomerSearchSerializer(customers, many=True).data
+        }, status=status.HTTP_200_OK)
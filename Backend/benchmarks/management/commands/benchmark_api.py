@@ -0,0 +1,376 @@
+"""
+End-to-end API benchmark on a seeded throwaway database.
+
+Seeds the volumes asked for (benchmarks.seed), then replays the scripted
+workloads of benchmarks.workloads against every router through the Django
+test client, or over HTTP against a local server started on the same
+database (--server). Reports p50/p95/p99 latency, throughput and queries
+per request (from the X-Query-Count header), per workload and endpoint,
+and writes them as a JSON baseline that later runs can be compared with:
+
+    python manage.py benchmark_api --customers 1000000 --sales 5000000 --output base.json
+    python manage.py benchmark_api --customers 1000000 --sales 5000000 --compare base.json
+
+Never touches the configured database.
+"""
+import http.client
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from benchmarks.seed import Seeder
+from benchmarks.workloads import WORKLOADS, BenchContext
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[max(0, min(len(ordered) - 1, int(len(ordered) * fraction + 0.5) - 1))]
+
+
+def summarize(samples, elapsed):
+    """samples: [(latency_seconds, status, queries)]"""
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[1] >= 400),
+        'throughput': round(len(samples) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+class ClientTransport:
+    """In-process requests through django.test.Client, one client per thread"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def send(self, method, path, data, token):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        headers = {'HTTP_X_QUERY_BUDGET': '1'}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        body = json.dumps(data) if data is not None else None
+        started = time.perf_counter()
+        response = client.generic(method, path, body or '', content_type='application/json', **headers)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code, response.get('X-Query-Count')
+
+
+class HTTPTransport:
+    """Real HTTP requests to a local server"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def send(self, method, path, data, token):
+        headers = {'X-Query-Budget': '1', 'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        body = json.dumps(data) if data is not None else None
+        started = time.perf_counter()
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        finally:
+            conn.close()
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status, response.getheader('X-Query-Count')
+
+
+class Command(BaseCommand):
+    help = 'Seed large datasets and measure latency, throughput and queries per request across the API'
+
+    def add_arguments(self, parser):
+        volumes = parser.add_argument_group('seeded volumes')
+        volumes.add_argument('--vehicles', type=int, default=1000)
+        volumes.add_argument('--admins', type=int, default=20)
+        volumes.add_argument('--customers', type=int, default=10000)
+        volumes.add_argument('--sales', type=int, default=50000)
+        volumes.add_argument('--service-requests', type=int, default=20000)
+        volumes.add_argument('--seed', type=int, default=1, help='Random seed for data and workloads')
+        volumes.add_argument('--workers', type=int, default=1, help='Seeding worker processes (see seed_data)')
+
+        run = parser.add_argument_group('workloads')
+        run.add_argument('--requests', type=int, default=200, help='Requests per workload')
+        run.add_argument('--concurrency', type=int, default=1, help='Client threads per workload')
+        run.add_argument('--workloads', default=','.join(WORKLOADS), help='Comma-separated subset to run')
+        run.add_argument('--server', action='store_true', help='Go through a local HTTP server instead of the test client')
+        run.add_argument('--warmup', type=int, default=5, help='Untimed requests per workload first')
+
+        output = parser.add_argument_group('results')
+        output.add_argument('--output', help='Write the results as JSON to this file')
+        output.add_argument('--compare', help='Compare with a baseline JSON file written by --output')
+        output.add_argument(
+            '--max-regression', type=float, default=None,
+            help='Fail when a p95 latency grows by more than this percentage over the baseline'
+        )
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['workloads'].split(',') if name.strip()]
+        unknown = set(names) - set(WORKLOADS)
+        if unknown:
+            raise CommandError(f'Unknown workload(s): {", ".join(sorted(unknown))}')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        test_db = None
+        if connection.vendor == 'sqlite':
+            # A file database so client threads and the server thread see the same data
+            fd, test_db = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = test_db
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.perf_counter()
+            Seeder(
+                vehicles=options['vehicles'],
+                admins=options['admins'],
+                customers=options['customers'],
+                sales=options['sales'],
+                service_requests=options['service_requests'],
+                workers=options['workers'],
+                seed=options['seed'],
+                log=self.stdout.write if options['verbosity'] > 1 else None,
+            ).run()
+            self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+            with self.benchmark_settings(options['verbosity']):
+                results = self.run_workloads(names, options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if test_db and os.path.exists(test_db):
+                os.remove(test_db)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+        if baseline is not None:
+            self.compare(baseline, results, options['max_regression'])
+
+    @contextmanager
+    def benchmark_settings(self, verbosity):
+        """No throttling (the counters still run), query headers on, middleware warnings quiet"""
+        rates = {scope: '1000000/second' for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+        logger = logging.getLogger('config.middleware')
+        level = logger.level
+        if verbosity < 2:
+            logger.setLevel(logging.ERROR)
+        try:
+            with mock.patch.object(SimpleRateThrottle, 'THROTTLE_RATES', rates), override_settings(
+                QUERY_BUDGET_HEADER_ENABLED=True,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1'],
+            ):
+                yield
+        finally:
+            logger.setLevel(level)
+
+    def run_workloads(self, names, options):
+        ctx = BenchContext(seed=options['seed'])
+        if not ctx.customers or not ctx.admins:
+            raise CommandError('Seed at least one admin and enough sales for customers to own vehicles.')
+
+        server = None
+        if options['server']:
+            server = LiveServerThread('127.0.0.1', lambda handler: handler)
+            server.daemon = True
+            server.start()
+            server.is_ready.wait()
+            if server.error:
+                raise server.error
+            transport = HTTPTransport('127.0.0.1', server.port)
+        else:
+            transport = ClientTransport()
+
+        try:
+            workloads = {}
+            for name in names:
+                workloads[name] = self.run_workload(name, WORKLOADS[name](ctx), ctx, transport, options)
+        finally:
+            if server is not None:
+                server.terminate()
+
+        return {
+            'meta': {
+                'created_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+                'commit': self.git_commit(),
+                'database': connection.vendor,
+                'transport': 'http' if options['server'] else 'client',
+                'requests_per_workload': options['requests'],
+                'concurrency': options['concurrency'],
+                'volumes': {
+                    key: options[key]
+                    for key in ('vehicles', 'admins', 'customers', 'sales', 'service_requests', 'seed')
+                },
+            },
+            'workloads': workloads,
+        }
+
+    def run_workload(self, name, steps, ctx, transport, options):
+        counter = iter(range(options['warmup'] + options['requests']))
+        lock = threading.Lock()
+        samples = {}
+        failures = []
+
+        def next_call():
+            """Round-robin over the steps, skipping steps with nothing left to do"""
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return None, None
+            for offset in range(len(steps)):
+                call = steps[(index + offset) % len(steps)]()
+                if call is not None:
+                    return index, call
+            return index, None
+
+        def worker():
+            try:
+                while True:
+                    index, call = next_call()
+                    if index is None:
+                        break
+                    if call is None:
+                        continue
+                    token = ctx.access_token(call.user) if call.user is not None else None
+                    elapsed, status, queries = transport.send(call.method, call.path, call.data, token)
+                    if index < options['warmup']:
+                        continue
+                    with lock:
+                        samples.setdefault(call.label, []).append(
+                            (elapsed, status, int(queries) if queries is not None else None)
+                        )
+                        if status >= 400 and len(failures) < 5:
+                            failures.append(f'{call.method} {call.path} -> {status}')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        for failure in failures:
+            self.stdout.write(self.style.WARNING(f'{name}: {failure}'))
+        everything = [sample for endpoint in samples.values() for sample in endpoint]
+        result = summarize(everything, elapsed)
+        # Endpoint throughput is its share of the workload's wall time
+        result['endpoints'] = {
+            label: summarize(endpoint, elapsed * len(endpoint) / len(everything))
+            for label, endpoint in samples.items()
+        }
+        return result
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, results):
+        meta = results['meta']
+        self.stdout.write(
+            f'{meta["transport"]} on {meta["database"]}, {meta["requests_per_workload"]} requests/workload, '
+            f'concurrency {meta["concurrency"]}'
+        )
+        self.stdout.write(
+            f'{"endpoint":<26}{"reqs":>6}{"err":>5}{"req/s":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"queries":>9}'
+        )
+        for name, workload in results['workloads'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(self.format_row(name, workload)))
+            for label, endpoint in workload['endpoints'].items():
+                self.stdout.write(self.format_row(f'  {label}', endpoint))
+
+    @staticmethod
+    def format_row(label, row):
+        def number(value, digits=1):
+            return '-' if value is None else f'{value:.{digits}f}'
+
+        return (
+            f'{label:<26}{row["requests"]:>6}{row["errors"]:>5}{number(row["throughput"]):>9}'
+            f'{number(row["p50_ms"]):>9}{number(row["p95_ms"]):>9}{number(row["p99_ms"]):>9}'
+            f'{number(row["queries_per_request"]):>9}'
+        )
+
+    def compare(self, baseline, results, max_regression):
+        self.stdout.write(
+            f'Compared with {baseline["meta"].get("commit") or "baseline"} '
+            f'({baseline["meta"].get("created_at")}):'
+        )
+        for key in ('volumes', 'transport', 'concurrency', 'database'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                self.stdout.write(self.style.WARNING(f'{key} differs from the baseline; timings are not comparable.'))
+
+        regressions = []
+        for name, workload in results['workloads'].items():
+            before_workload = baseline['workloads'].get(name)
+            if before_workload is None:
+                continue
+            rows = [(name, workload, before_workload)] + [
+                (f'  {label}', endpoint, before_workload['endpoints'][label])
+                for label, endpoint in workload['endpoints'].items()
+                if label in before_workload['endpoints']
+            ]
+            for label, after, before in rows:
+                p95 = self.change(before['p95_ms'], after['p95_ms'])
+                throughput = self.change(before['throughput'], after['throughput'])
+                line = (
+                    f'{label:<26} p95 {before["p95_ms"]} -> {after["p95_ms"]}ms ({p95:+.1f}%)  '
+                    f'req/s {before["throughput"]} -> {after["throughput"]} ({throughput:+.1f}%)  '
+                    f'queries {before["queries_per_request"]} -> {after["queries_per_request"]}'
+                )
+                regressed = max_regression is not None and p95 > max_regression
+                # Averages wobble a little with concurrency; a whole extra query is a regression
+                more_queries = (after['queries_per_request'] or 0) - (before['queries_per_request'] or 0) >= 1
+                if regressed or more_queries:
+                    regressions.append(label.strip())
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+
+        if regressions and max_regression is not None:
+            raise CommandError(f'Regressed: {", ".join(regressions)}')
+
+    @staticmethod
+    def change(before, after):
+        if not before or after is None:
+            return 0.0
+        return (after - before) / before * 100
@@ -0,0 +1,409 @@
+"""
+Bulk seeding of large, internally consistent datasets
+
+Used by the seed_data and benchmark_api commands. Rows are written with
+bulk_create in large batches, with explicit ids and a single precomputed
+password hash. Customers are seeded in blocks: each block inserts a
+contiguous range of customers together with their sales, service requests
+and the denormalized rows derived from them (CustomerStats,
+ServiceEligibility, status transitions), so memory stays bounded by the
+block size and no reconcile pass over the whole dataset is needed.
+
+Block ids and random streams are derived from the block number alone, so
+blocks can be written by parallel worker processes in any order and the
+data only depends on the seed.
+"""
+import bisect
+import math
+import multiprocessing
+import random
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from accounts.models import CustomerStats, User
+from inventory.models import LowStockAlert, StockMovement, Vehicle
+from sales.models import Sale, ServiceEligibility
+from service.models import ServiceRequest, ServiceStatusTransition, TechnicianLoad
+
+BENCH_PASSWORD = 'bench-pass-123'
+BRANDS = ['Hero', 'Honda', 'TVS', 'Bajaj', 'Yamaha', 'Suzuki', 'Royal Enfield', 'KTM', 'Ather', 'Ola']
+# (segment, lowest price, highest price, share of the catalog)
+SEGMENTS = [
+    ('Commuter', 60000, 110000, 0.40),
+    ('Scooter', 70000, 130000, 0.30),
+    ('Sports', 120000, 350000, 0.12),
+    ('Electric', 90000, 180000, 0.12),
+    ('Cruiser', 180000, 400000, 0.06),
+]
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Rohan', 'Karan', 'Rahul', 'Amit', 'Vikram',
+    'Ananya', 'Diya', 'Priya', 'Sneha', 'Pooja', 'Kavya', 'Neha', 'Riya', 'Meera', 'Isha',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Patel', 'Reddy', 'Nair', 'Iyer', 'Gupta', 'Singh', 'Kumar', 'Das',
+    'Joshi', 'Mehta', 'Shah', 'Rao', 'Pillai', 'Kulkarni', 'Chopra', 'Bose', 'Yadav', 'Jain',
+]
+# (description, median cost, share of requests)
+SERVICE_TYPES = [
+    ('General service', 1200, 0.45),
+    ('Oil change', 600, 0.20),
+    ('Brake inspection', 900, 0.10),
+    ('Chain and sprocket replacement', 2500, 0.08),
+    ('Battery replacement', 3000, 0.07),
+    ('Tyre replacement', 2800, 0.06),
+    ('Accident repair', 7000, 0.04),
+]
+# Relative sales per month; festival season (October-November) sells the most
+MONTH_WEIGHTS = [0.8, 0.8, 0.9, 1.0, 0.9, 0.8, 0.8, 0.9, 1.1, 1.6, 1.5, 1.0]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created/updated times we generate"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def fast_writes():
+    """
+    Skip the fsync per transaction on SQLite while seeding (this connection
+    only; SQLite refuses the change inside a transaction, e.g. in tests)
+    """
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')
+
+
+class Seeder:
+    """
+    Seeder(customers=10000, sales=50000, ...).run() on an empty database.
+    Seeded accounts all use BENCH_PASSWORD; admins are
+    bench-admin{n}@example.com and customers bench-customer{n}@example.com.
+    With workers > 1 the customer blocks are written by forked processes;
+    on SQLite their writes take turns while rows are built in parallel.
+    """
+
+    def __init__(self, vehicles=1000, admins=20, customers=10000, sales=50000,
+                 service_requests=20000, days=730, block_size=5000, batch_size=5000,
+                 workers=1, seed=1, log=None):
+        self.vehicles = vehicles
+        self.admins = admins
+        self.customers = customers
+        self.sales = sales
+        self.service_requests = service_requests
+        self.days = days
+        self.block_size = block_size
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.seed = seed
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.password = make_password(BENCH_PASSWORD)
+        self.prices = {}
+        self.vehicle_order = []
+        self.vehicle_weights = []
+
+    # Id layout: admins first, then customers, so both are contiguous ranges
+
+    def admin_ids(self):
+        return range(1, self.admins + 1)
+
+    def customer_ids(self):
+        return range(self.admins + 1, self.admins + self.customers + 1)
+
+    @property
+    def blocks(self):
+        return (self.customers + self.block_size - 1) // self.block_size
+
+    def share(self, total, block):
+        """[start, end) of the 1-based ids of `total` rows that belong to a block"""
+        first = block * self.block_size
+        last = min(first + self.block_size, self.customers)
+        return total * first // self.customers + 1, total * last // self.customers + 1
+
+    def run(self):
+        if User.objects.exists() or Vehicle.objects.exists():
+            raise ValueError('Seeding needs an empty database.')
+        if self.workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError('Parallel workers need the fork start method (Linux or macOS).')
+
+        with explicit_timestamps(User, Vehicle, Sale, ServiceRequest):
+            fast_writes()
+            self.seed_catalog()
+            if self.workers == 1:
+                for block in range(self.blocks):
+                    self.seed_block(block)
+            else:
+                self.run_workers()
+        self.finish()
+
+    def run_workers(self):
+        context = multiprocessing.get_context('fork')
+        # SQLite allows one writer at a time; other databases write in parallel
+        lock = context.Lock() if connection.vendor == 'sqlite' else None
+        # Children must open their own connections
+        connections.close_all()
+        processes = [
+            context.Process(target=self.worker, args=(range(worker, self.blocks, self.workers), lock))
+            for worker in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed = [process for process in processes if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f'{len(failed)} seeding worker(s) failed; the database is partially seeded.')
+
+    def worker(self, blocks, lock):
+        try:
+            fast_writes()
+            for block in blocks:
+                self.seed_block(block, lock)
+        finally:
+            connections.close_all()
+
+    def seed_catalog(self):
+        """Admins and vehicles, shared by all blocks"""
+        rng = random.Random(self.seed)
+        admins = [
+            self.user(rng, user_id, 'admin', f'bench-admin{n}@example.com', f'80{user_id:08d}')
+            for n, user_id in enumerate(self.admin_ids())
+        ]
+        vehicles = [self.vehicle(rng, vehicle_id) for vehicle_id in range(1, self.vehicles + 1)]
+        self.prices = {vehicle.id: vehicle.price for vehicle in vehicles}
+        # Popularity follows a long tail: a few models sell most units
+        self.vehicle_order = list(self.prices)
+        rng.shuffle(self.vehicle_order)
+        self.vehicle_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(self.vehicle_order))))
+
+        with transaction.atomic():
+            User.objects.bulk_create(admins, batch_size=self.batch_size)
+            CustomerStats.objects.bulk_create(
+                [CustomerStats(user_id=user_id) for user_id in self.admin_ids()], batch_size=self.batch_size
+            )
+            Vehicle.objects.bulk_create(vehicles, batch_size=self.batch_size)
+            # What Vehicle.save() would have written: the opening ledger entry
+            # and the low-stock alert set the reports read
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    vehicle_id=vehicle.id, quantity=vehicle.stock_qty, reason='initial', created_at=vehicle.created_at
+                )
+                for vehicle in vehicles if vehicle.stock_qty
+            ], batch_size=self.batch_size)
+            LowStockAlert.objects.bulk_create([
+                LowStockAlert(
+                    vehicle_id=vehicle.id,
+                    level=vehicle.stock_level,
+                    stock_qty=vehicle.stock_qty,
+                    threshold=vehicle.low_stock_threshold,
+                    raised_at=vehicle.created_at,
+                    updated_at=vehicle.created_at,
+                )
+                for vehicle in vehicles if vehicle.stock_level
+            ], batch_size=self.batch_size)
+        self.log(f'{self.admins} admins, {self.vehicles} vehicles')
+
+    def seed_block(self, block, lock=None):
+        rng = random.Random(f'{self.seed}:{block}')
+        first = block * self.block_size
+        customer_ids = self.customer_ids()[first:first + self.block_size]
+        sale_ids = range(*self.share(self.sales, block))
+        service_ids = range(*self.share(self.service_requests, block))
+
+        customers = [
+            self.user(rng, user_id, 'customer', f'bench-customer{user_id - self.admins - 1}@example.com',
+                      f'9{user_id:09d}')
+            for user_id in customer_ids
+        ]
+        # Most customers buy once or never, a few buy often
+        buyer_weights = list(accumulate(rng.paretovariate(1.5) for _ in customers))
+        sales = [
+            self.sale(rng, sale_id, customers[bisect.bisect(buyer_weights, rng.random() * buyer_weights[-1])])
+            for sale_id in sale_ids
+        ]
+
+        stats = {user.id: CustomerStats(user_id=user.id) for user in customers}
+        owned, purchases = {}, []
+        for sale in sales:
+            if sale.status == 'verified':
+                stats[sale.customer_id].total_spent += sale.amount
+                stats[sale.customer_id].purchases += 1
+                key = (sale.customer_id, sale.vehicle_id)
+                owned[key] = owned.get(key, 0) + 1
+                purchases.append(sale)
+
+        services, transitions = [], []
+        if purchases:
+            for service_id in service_ids:
+                service = self.service_request(rng, service_id, rng.choice(purchases))
+                services.append(service)
+                transitions.extend(self.transitions(rng, service))
+                if service.status in ServiceRequest.OPEN_STATUSES:
+                    stats[service.customer_id].open_services += 1
+
+        with lock or nullcontext(), transaction.atomic():
+            User.objects.bulk_create(customers, batch_size=self.batch_size)
+            CustomerStats.objects.bulk_create(stats.values(), batch_size=self.batch_size)
+            Sale.objects.bulk_create(sales, batch_size=self.batch_size)
+            ServiceEligibility.objects.bulk_create([
+                ServiceEligibility(customer_id=customer_id, vehicle_id=vehicle_id, verified_sales=count)
+                for (customer_id, vehicle_id), count in owned.items()
+            ], batch_size=self.batch_size)
+            ServiceRequest.objects.bulk_create(services, batch_size=self.batch_size)
+            ServiceStatusTransition.objects.bulk_create(transitions, batch_size=self.batch_size)
+        self.log(
+            f'block {block + 1}/{self.blocks}: {len(customers)} customers, '
+            f'{len(sales)} sales, {len(services)} service requests'
+        )
+
+    def finish(self):
+        """Admin workloads and id sequences, once every block is in"""
+        TechnicianLoad.objects.bulk_create([
+            TechnicianLoad(technician_id=technician_id, open_jobs=open_jobs)
+            for technician_id, open_jobs in TechnicianLoad.compute().items()
+        ])
+        models = [User, Vehicle, Sale, ServiceRequest]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+    # Row factories
+
+    def moment(self, rng, after=None):
+        """
+        A time in the last `days` days (and after `after`), weighted toward
+        the recent past as the business grows, and toward the busy months
+        """
+        start = self.now - timedelta(days=self.days)
+        if after is not None and after > start:
+            start = after
+        span = (self.now - start).total_seconds()
+        for _ in range(3):
+            moment = self.now - timedelta(seconds=span * rng.random() ** 1.5)
+            if rng.random() * 1.6 < MONTH_WEIGHTS[moment.month - 1]:
+                break
+        return moment
+
+    def later(self, moment, **delta):
+        """moment + delta, but never in the future"""
+        return min(moment + timedelta(**delta), self.now)
+
+    def user(self, rng, user_id, role, email, mobile):
+        created_at = self.moment(rng)
+        customer = role == 'customer'
+        return User(
+            id=user_id,
+            password=self.password,
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            email=email,
+            mobile=mobile,
+            role=role,
+            is_active=not customer or rng.random() > 0.02,
+            is_verified=not customer or rng.random() > 0.03,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+    def vehicle(self, rng, vehicle_id):
+        segment, low, high, _ = rng.choices(SEGMENTS, weights=[segment[3] for segment in SEGMENTS])[0]
+        created_at = self.moment(rng)
+        return Vehicle(
+            id=vehicle_id,
+            brand=rng.choice(BRANDS),
+            model=f'{segment} {vehicle_id}',
+            price=Decimal(rng.randrange(low, high, 500)),
+            stock_qty=int(rng.expovariate(1 / 40)),
+            description=f'{segment} two-wheeler',
+            is_active=rng.random() > 0.05,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+    def sale(self, rng, sale_id, customer):
+        vehicle_id = self.vehicle_order[
+            bisect.bisect(self.vehicle_weights, rng.random() * self.vehicle_weights[-1])
+        ]
+        quantity = rng.choices((1, 2, 3), weights=(93, 6, 1))[0]
+        date = self.moment(rng, after=customer.created_at)
+        age = self.now - date
+        if age < timedelta(days=2) and rng.random() < 0.7 or age < timedelta(days=14) and rng.random() < 0.1:
+            status = 'pending'
+        else:
+            status = 'verified' if rng.random() < 0.88 else 'cancelled'
+        verified = status == 'verified'
+        return Sale(
+            id=sale_id,
+            customer_id=customer.id,
+            vehicle_id=vehicle_id,
+            amount=self.prices[vehicle_id] * quantity,
+            quantity=quantity,
+            status=status,
+            date=date,
+            verified_at=self.later(date, hours=rng.lognormvariate(math.log(6), 1)) if verified else None,
+            verified_by_id=rng.choice(self.admin_ids()) if verified else None,
+            notes='Paid in cash' if rng.random() < 0.1 else None,
+        )
+
+    def service_request(self, rng, service_id, sale):
+        description, median_cost, _ = rng.choices(
+            SERVICE_TYPES, weights=[service_type[2] for service_type in SERVICE_TYPES]
+        )[0]
+        # Services follow the purchase, the first one usually within a few months
+        date = self.later(sale.verified_at, days=rng.gammavariate(2, 45))
+        age = self.now - date
+        if age < timedelta(days=2):
+            status = rng.choices(['pending', 'in_progress', 'completed'], weights=(60, 30, 10))[0]
+        elif age < timedelta(days=10):
+            status = rng.choices(['pending', 'in_progress', 'completed', 'cancelled'], weights=(10, 25, 60, 5))[0]
+        else:
+            status = 'completed' if rng.random() < 0.9 else 'cancelled'
+        completed = status == 'completed'
+        return ServiceRequest(
+            id=service_id,
+            customer_id=sale.customer_id,
+            vehicle_id=sale.vehicle_id,
+            description=description,
+            status=status,
+            cost=Decimal(round(median_cost * rng.lognormvariate(0, 0.4), -1)) if completed else Decimal('0.00'),
+            date=date,
+            completed_date=self.later(date, days=rng.lognormvariate(0, 0.7)) if completed else None,
+            assigned_to_id=rng.choice(self.admin_ids()) if status != 'pending' else None,
+        )
+
+    def transitions(self, rng, service):
+        rows = [ServiceStatusTransition(
+            service_request_id=service.id, status='pending', entered_at=service.date
+        )]
+        if service.status == 'pending':
+            return rows
+        if service.completed_date is not None:
+            left_at = service.completed_date
+        else:
+            left_at = self.later(service.date, hours=rng.lognormvariate(math.log(12), 1))
+        rows[0].left_at = left_at
+        rows.append(ServiceStatusTransition(
+            service_request_id=service.id,
+            from_status='pending',
+            status=service.status,
+            entered_at=left_at,
+            changed_by_id=service.assigned_to_id,
+        ))
+        return rows
@@ -0,0 +1,49 @@
+"""
+Tests for benchmarks app
+"""
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from inventory.models import Vehicle
+from .seed import Seeder
+
+
+class SeederTests(TestCase):
+    """Seeded data agrees with what the app maintains on normal writes"""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        Seeder(vehicles=60, admins=2, customers=20, sales=40, service_requests=10, block_size=10).run()
+        cls.admin = User.objects.get(email='bench-admin0@example.com')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def stock_counts(self, vehicles):
+        return (
+            vehicles.filter(stock_qty__gt=0, stock_qty__lte=10).count(),
+            vehicles.filter(stock_qty=0).count(),
+        )
+
+    def test_every_vehicle_has_its_opening_stock_in_the_ledger(self):
+        now = timezone.now()
+        for vehicle in Vehicle.objects.all():
+            self.assertEqual(vehicle.stock_at(now), vehicle.stock_qty)
+
+    def test_inventory_report_counts_match_stock(self):
+        low, out = self.stock_counts(Vehicle.objects.all())
+        self.assertTrue(low and out)
+
+        summary = self.client.get('/api/reports/inventory/').data['summary']
+
+        self.assertEqual((summary['low_stock_vehicles'], summary['out_of_stock_vehicles']), (low, out))
+
+    def test_dashboard_counts_match_stock(self):
+        low, out = self.stock_counts(Vehicle.objects.filter(is_active=True))
+
+        inventory = self.client.get('/api/reports/dashboard/').data['inventory']
+
+        self.assertEqual((inventory['low_stock_count'], inventory['out_of_stock_count']), (low, out))
@@ -0,0 +1,192 @@
+"""
+Scripted API workloads replayed by benchmark_api
+
+A workload is a list of steps; each step builds one request from the
+shared BenchContext (seeded ids, tokens, queues of pending work). Steps
+are picked round-robin, so every endpoint of a workload gets the same
+share of its requests.
+"""
+import random
+import threading
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.authentication import ClaimsRefreshToken
+from accounts.models import User
+from inventory.models import Vehicle
+from sales.models import Sale, ServiceEligibility
+from service.models import ServiceRequest
+from changes.models import ChangeEvent
+
+from .seed import BENCH_PASSWORD, BRANDS
+
+# user: a User to authenticate as, or None for an anonymous request
+Call = namedtuple('Call', 'label method path data user')
+
+
+class BenchContext:
+    """Ids and credentials the workloads draw from, loaded once after seeding"""
+    SAMPLE_SIZE = 500
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.admins = list(User.objects.filter(role='admin', is_active=True)[:50])
+        self.vehicle_ids = list(
+            Vehicle.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+        )
+        # Every page of the public vehicle list (it includes inactive vehicles)
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        self.vehicle_pages = range(1, max(1, (Vehicle.objects.count() + page_size - 1) // page_size) + 1)
+        self.in_stock_ids = list(
+            Vehicle.objects.filter(is_active=True, stock_qty__gte=10).order_by('id').values_list('id', flat=True)
+        )
+        # Customers who own a vehicle, so they can also book services
+        owners = list(
+            ServiceEligibility.objects.filter(verified_sales__gt=0, vehicle__is_active=True)
+            .order_by('customer_id').values_list('customer_id', 'vehicle_id')[:self.SAMPLE_SIZE]
+        )
+        customers = User.objects.in_bulk({customer_id for customer_id, _ in owners})
+        self.owners = [(customers[customer_id], vehicle_id) for customer_id, vehicle_id in owners]
+        self.customers = list(customers.values())
+        self.pending_sales = deque(
+            Sale.objects.filter(status='pending').order_by('-date').values_list('id', flat=True)[:10000]
+        )
+        self.pending_services = deque(
+            ServiceRequest.objects.filter(status='pending').order_by('-date').values_list('id', flat=True)[:10000]
+        )
+        self.change_seq = ChangeEvent.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+        self.tokens = {}
+
+    def pick(self, items):
+        with self.lock:
+            return self.rng.choice(items)
+
+    def pop(self, queue):
+        with self.lock:
+            return queue.popleft() if queue else None
+
+    def access_token(self, user):
+        token = self.tokens.get(user.id)
+        if token is None:
+            token = self.tokens[user.id] = str(ClaimsRefreshToken.for_user(user).access_token)
+        return token
+
+    def refresh_token(self, user):
+        """A fresh refresh token per call: refreshing rotates and blacklists it"""
+        return str(ClaimsRefreshToken.for_user(user))
+
+
+def catalog(ctx):
+    return [
+        lambda: Call('vehicles list', 'GET', f'/api/inventory/vehicles/?page={ctx.pick(ctx.vehicle_pages)}', None, None),
+        lambda: Call('vehicles search', 'GET', f'/api/inventory/vehicles/?search={ctx.pick(BRANDS)}', None, None),
+        lambda: Call('vehicles by price', 'GET', '/api/inventory/vehicles/?ordering=price&max_price=100000', None, None),
+        lambda: Call('vehicle detail', 'GET', f'/api/inventory/vehicles/{ctx.pick(ctx.vehicle_ids)}/', None, None),
+    ]
+
+
+def purchase(ctx):
+    def buy():
+        customer, _ = ctx.pick(ctx.owners)
+        return Call('purchase', 'POST', '/api/sales/sales/', {
+            'vehicle': ctx.pick(ctx.in_stock_ids), 'quantity': 1,
+        }, customer)
+
+    return [
+        buy,
+        lambda: Call('my purchases', 'GET', '/api/sales/sales/my_purchases/?limit=20', None, ctx.pick(ctx.customers)),
+    ]
+
+
+def verify(ctx):
+    def verify_sale():
+        sale_id = ctx.pop(ctx.pending_sales)
+        if sale_id is None:
+            return None
+        return Call('verify sale', 'PATCH', f'/api/sales/sales/{sale_id}/verify/', None, ctx.pick(ctx.admins))
+
+    return [
+        verify_sale,
+        lambda: Call('pending sales', 'GET', '/api/sales/sales/?status=pending', None, ctx.pick(ctx.admins)),
+    ]
+
+
+def service(ctx):
+    def book():
+        customer, vehicle_id = ctx.pick(ctx.owners)
+        return Call('book service', 'POST', '/api/service/requests/', {
+            'vehicle': vehicle_id, 'description': 'Benchmark service',
+        }, customer)
+
+    def start():
+        request_id = ctx.pop(ctx.pending_services)
+        if request_id is None:
+            return None
+        return Call('update status', 'PATCH', f'/api/service/requests/{request_id}/update_status/', {
+            'status': 'in_progress',
+        }, ctx.pick(ctx.admins))
+
+    return [
+        book,
+        start,
+        lambda: Call('my services', 'GET', '/api/service/requests/my_services/', None, ctx.pick(ctx.customers)),
+        lambda: Call('eligible vehicles', 'GET', '/api/service/requests/eligible_vehicles/', None,
+                     ctx.pick(ctx.customers)),
+        lambda: Call('open requests', 'GET', '/api/service/requests/?status=pending', None, ctx.pick(ctx.admins)),
+    ]
+
+
+def reports(ctx):
+    start = (timezone.now() - timedelta(days=90)).date().isoformat()
+    return [
+        lambda: Call('dashboard', 'GET', '/api/reports/dashboard/', None, ctx.pick(ctx.admins)),
+        lambda: Call('sales report', 'GET', f'/api/reports/sales/?start_date={start}', None, ctx.pick(ctx.admins)),
+        lambda: Call('inventory report', 'GET', '/api/reports/inventory/', None, ctx.pick(ctx.admins)),
+        lambda: Call('service report', 'GET', f'/api/reports/service/?start_date={start}', None, ctx.pick(ctx.admins)),
+        lambda: Call('dwell report', 'GET', f'/api/reports/service/dwell/?start_date={start}', None,
+                     ctx.pick(ctx.admins)),
+    ]
+
+
+def auth(ctx):
+    def login():
+        customer = ctx.pick(ctx.customers)
+        return Call('login', 'POST', '/api/auth/login/', {
+            'email': customer.email, 'password': BENCH_PASSWORD,
+        }, None)
+
+    def refresh():
+        return Call('token refresh', 'POST', '/api/auth/token/refresh/', {
+            'refresh': ctx.refresh_token(ctx.pick(ctx.customers)),
+        }, None)
+
+    return [
+        login,
+        refresh,
+        lambda: Call('me', 'GET', '/api/auth/me/', None, ctx.pick(ctx.customers)),
+        lambda: Call('customer search', 'GET', f'/api/auth/users/search/?q=bench-customer{ctx.pick(range(10, 100))}',
+                     None, ctx.pick(ctx.admins)),
+    ]
+
+
+def changes(ctx):
+    return [
+        lambda: Call('change feed', 'GET', f'/api/changes/?since={max(ctx.change_seq - 100, 0)}', None,
+                     ctx.pick(ctx.admins)),
+    ]
+
+
+# Run in this order; verify and service work through the seeded pending rows
+WORKLOADS = {
+    'catalog': catalog,
+    'purchase': purchase,
+    'verify': verify,
+    'service': service,
+    'reports': reports,
+    'auth': auth,
+    'changes': changes,
+}
@@ -0,0 +1,22 @@
+"""
+Admin configuration for changes app
+"""
+from django.contrib import admin
+from .models import ChangeEvent
+
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    """Read-only admin interface for the change feed"""
+    list_display = ['seq', 'entity', 'entity_id', 'op', 'created_at']
+    list_filter = ['entity', 'op', 'created_at']
+    ordering = ['-seq']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
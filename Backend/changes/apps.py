@@ -0,0 +1,9 @@
+"""
+App configuration for changes
+"""
+from django.apps import AppConfig
+
+
+class ChangesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'changes'
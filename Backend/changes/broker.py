@@ -0,0 +1,147 @@
+"""
+Fan-out of committed change events to live subscribers (SSE streams)
+
+Each ASGI process holds one broker. A subscriber is an asyncio.Queue on
+the event loop, so an idle connection costs a queue and a suspended
+coroutine rather than a thread. The backend is chosen with the
+CHANGE_BROKER_BACKEND setting:
+
+- changes.broker.InProcessBroker (default): events are pushed by the
+  process that committed them. Enough when the API and the streams are
+  served by the same single process.
+- changes.broker.DatabasePollingBroker: one task per process reads new
+  ChangeEvent rows every CHANGE_BROKER_POLL_INTERVAL seconds and fans
+  them out, so writes made by any process (WSGI workers, management
+  commands) reach every stream. Like the change feed it holds events
+  back at a gap in seq for up to CHANGE_FEED_VISIBILITY_LAG_MS.
+
+Other backends (e.g. Redis pub/sub) implement publish(), subscribe() and
+unsubscribe() with the same signatures.
+"""
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One live subscriber; events are delivered from any thread"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, messages):
+        try:
+            self.loop.call_soon_threadsafe(self._put, messages)
+        except RuntimeError:
+            # The subscriber's event loop is gone
+            self.overflowed = True
+
+    def _put(self, messages):
+        for message in messages:
+            try:
+                self.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client too slow to keep up must resync rather than stall others
+                self.overflowed = True
+                return
+
+    async def get(self, timeout):
+        """Next message, or None after `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Pushes events committed in this process to this process's subscribers"""
+    queue_size = 1000
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, messages):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(messages)
+
+    def subscribe(self):
+        """Register a subscriber on the running event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class DatabasePollingBroker(InProcessBroker):
+    """Reads new ChangeEvent rows once per process and fans them out"""
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+        self._last_seq = None
+
+    def publish(self, messages):
+        # Subscribers are fed by the poller, whichever process committed
+        pass
+
+    def subscribe(self):
+        subscription = super().subscribe()
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return subscription
+
+    async def _poll(self):
+        interval = getattr(settings, 'CHANGE_BROKER_POLL_INTERVAL', 1.0)
+        while self._subscribers:
+            messages = await sync_to_async(self._read_new)()
+            if messages:
+                super().publish(messages)
+            await asyncio.sleep(interval)
+
+    def _read_new(self):
+        from .models import ChangeEvent
+
+        if self._last_seq is None:
+            self._last_seq = ChangeEvent.position()
+            return []
+        # Stop at an unsettled gap so a late commit below the cursor is not skipped
+        messages = ChangeEvent.visible(self._last_seq, [
+            event.as_message()
+            for event in ChangeEvent.objects.filter(seq__gt=self._last_seq).order_by('seq')[:1000]
+        ])
+        if messages:
+            self._last_seq = messages[-1]['seq']
+        return messages
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'CHANGE_BROKER_BACKEND', 'changes.broker.InProcessBroker')
+                _broker = import_string(backend)()
+    return _broker
+
+
+def publish_on_commit(events):
+    """Publish saved ChangeEvents once the surrounding transaction commits"""
+    messages = [event.as_message() for event in events]
+    transaction.on_commit(lambda: get_broker().publish(messages))
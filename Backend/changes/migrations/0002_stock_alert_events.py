@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('changes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changeevent',
+            name='entity',
+            field=models.CharField(choices=[('sale', 'Sale'), ('service_request', 'Service Request'), ('vehicle', 'Vehicle'), ('stock_alert', 'Stock Alert')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,200 @@
+"""
+Models for changes app - Transactional outbox feeding incremental sync
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+
+from .broker import publish_on_commit
+
+
+class ChangeEvent(models.Model):
+    """
+    One row per Sale/ServiceRequest/Vehicle mutation, written in the same
+    transaction as the change. Clients sync with a single indexed range
+    read: WHERE seq > since ORDER BY seq.
+    
+    `seq` is handed out at INSERT, not at commit, so with concurrent
+    writers a lower seq can become visible after a higher one: it shows
+    up as a gap. Readers page on seq and deliver events up to the first
+    gap (see visible()). A gap is only passed once the event after it is
+    older than CHANGE_FEED_VISIBILITY_LAG_MS, giving a transaction still
+    in flight time to commit; gaps left by rolled-back transactions then
+    settle. Without gaps events are delivered at once.
+    """
+    
+    ENTITY_CHOICES = [
+        ('sale', 'Sale'),
+        ('service_request', 'Service Request'),
+        ('vehicle', 'Vehicle'),
+        ('stock_alert', 'Stock Alert'),
+    ]
+    
+    OP_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    
+    seq = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.PositiveBigIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Change Event'
+        verbose_name_plural = 'Change Events'
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.seq} {self.op} {self.entity} #{self.entity_id}"
+    
+    def as_message(self):
+        """Plain dict pushed to live subscribers (see changes/broker.py)"""
+        return {
+            'seq': self.seq,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'op': self.op,
+            'data': self.data,
+            'created_at': self.created_at,
+        }
+    
+    @staticmethod
+    def visibility_cutoff():
+        return timezone.now() - timedelta(milliseconds=settings.CHANGE_FEED_VISIBILITY_LAG_MS)
+    
+    @classmethod
+    def visible(cls, since, events):
+        """
+        The leading events (dicts of every event after `since`, in seq
+        order) before the first gap in seq that has not settled yet
+        """
+        cutoff = cls.visibility_cutoff()
+        expected = since + 1
+        for index, event in enumerate(events):
+            if event['seq'] != expected and event['created_at'] > cutoff:
+                return events[:index]
+            expected = event['seq'] + 1
+        return events
+    
+    @classmethod
+    def position(cls):
+        """Highest seq a client can safely resume from: the end of the settled run of events"""
+        cutoff = cls.visibility_cutoff()
+        # Gaps before an event older than the lag have settled
+        settled = (
+            cls.objects.filter(created_at__lte=cutoff).order_by('-created_at')
+            .values_list('seq', flat=True).first()
+        ) or 0
+        recent = cls.visible(settled, list(
+            cls.objects.filter(seq__gt=settled).order_by('seq').values('seq', 'created_at')
+        ))
+        return recent[-1]['seq'] if recent else settled
+    
+    @classmethod
+    def emit(cls, entity, entity_id, op, **data):
+        """Record a single change (call inside the change's transaction)"""
+        return cls.emit_many(entity, [(entity_id, op, data)])[0]
+    
+    @classmethod
+    def emit_many(cls, entity, changes):
+        """
+        Record [(entity_id, op, data), ...] with one INSERT; the events are
+        pushed to live subscribers once the transaction commits.
+        """
+        if not changes:
+            return []
+        now = timezone.now()
+        events = cls.objects.bulk_create([
+            cls(entity=entity, entity_id=entity_id, op=op, data=data, created_at=now)
+            for entity_id, op, data in changes
+        ])
+        publish_on_commit(events)
+        return events
+
+
+class ChangeFeedWatermark(models.Model):
+    """Single row recording the highest seq removed by compact_changes"""
+    seq = models.PositiveBigIntegerField(default=0)
+    compacted_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Change Feed Watermark'
+        verbose_name_plural = 'Change Feed Watermark'
+    
+    def __str__(self):
+        return f"Compacted through #{self.seq}"
+    
+    @classmethod
+    def compacted_through(cls):
+        return cls.objects.filter(pk=1).values_list('seq', flat=True).first() or 0
+    
+    @classmethod
+    def compact(cls, before, batch_size=1000):
+        """
+        Delete events created before `before` in batches, moving the
+        watermark first so readers never miss a deleted event. Returns the
+        number of events deleted.
+        """
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                seqs = list(
+                    ChangeEvent.objects.filter(created_at__lt=before)
+                    .order_by('seq').values_list('seq', flat=True)[:batch_size]
+                )
+                if not seqs:
+                    return deleted
+                cls.objects.update_or_create(pk=1, defaults={
+                    'seq': seqs[-1],
+                    'compacted_at': timezone.now(),
+                })
+                ChangeEvent.objects.filter(seq__lte=seqs[-1]).delete()
+            deleted += len(seqs)
+
+
+class ChangeFeedModelMixin:
+    """
+    Model mixin writing a ChangeEvent on save() and delete(), inside the
+    same transaction. `change_fields` are copied into the event so clients
+    can often apply it without refetching. Code paths that write through
+    QuerySet.update() emit their events explicitly.
+    """
+    change_entity = None
+    change_fields = ()
+    
+    def change_data(self):
+        return {field: getattr(self, field) for field in self.change_fields}
+    
+    def save(self, *args, **kwargs):
+        op = 'create' if self._state.adding else 'update'
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            ChangeEvent.emit(self.change_entity, self.pk, op, **self.change_data())
+    
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            ChangeEvent.emit(self.change_entity, pk, 'delete')
+        return result
+    
+    def emit_change(self, **data):
+        """Record an update made outside save(), e.g. a guarded UPDATE"""
+        ChangeEvent.emit(self.change_entity, self.pk, 'update', **(data or self.change_data()))
+    
+    @classmethod
+    def emit_changes(cls, objects):
+        """Record an update event per object with a single INSERT"""
+        ChangeEvent.emit_many(cls.change_entity, [
+            (obj.pk, 'update', obj.change_data()) for obj in objects
+        ])
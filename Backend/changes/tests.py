@@ -0,0 +1,39 @@
+"""
+Tests for changes app
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import ChangeEvent
+
+
+class VisibilityTests(TestCase):
+    """The feed pages on seq and only waits at gaps left by uncommitted writes"""
+
+    def event(self, seq, age_ms=0):
+        return {'seq': seq, 'created_at': timezone.now() - timedelta(milliseconds=age_ms)}
+
+    def seqs(self, since, events):
+        return [event['seq'] for event in ChangeEvent.visible(since, events)]
+
+    def test_contiguous_events_are_delivered_at_once(self):
+        self.assertEqual(self.seqs(10, [self.event(11), self.event(12)]), [11, 12])
+
+    def test_recent_gap_holds_back_later_events(self):
+        self.assertEqual(self.seqs(10, [self.event(11), self.event(13), self.event(14)]), [11])
+        self.assertEqual(self.seqs(10, [self.event(12)]), [])
+
+    def test_settled_gap_is_skipped(self):
+        events = [self.event(11, age_ms=5000), self.event(13, age_ms=5000), self.event(15)]
+        self.assertEqual(self.seqs(10, events), [11, 13])
+
+    def test_position_stops_before_an_unsettled_gap(self):
+        events = ChangeEvent.emit_many('sale', [(1, 'update', {}), (2, 'update', {})])
+        ChangeEvent.objects.filter(seq=events[0].seq).delete()
+
+        self.assertEqual(ChangeEvent.position(), events[0].seq - 1)
+
+        ChangeEvent.objects.update(created_at=timezone.now() - timedelta(seconds=5))
+        self.assertEqual(ChangeEvent.position(), events[1].seq)
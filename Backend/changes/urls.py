@@ -0,0 +1,10 @@
+"""
+URLs for changes app
+"""
+from django.urls import path
+from .views import change_feed, event_stream
+
+urlpatterns = [
+    path('', change_feed, name='change-feed'),
+    path('stream/', event_stream, name='event-stream'),
+]
@@ -0,0 +1,171 @@
+"""
+Views for changes app - Incremental sync feed and live admin event stream
+"""
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from accounts.authentication import StatelessJWTAuthentication
+from accounts.permissions import IsAdmin
+from config.middleware import query_budget
+from .broker import get_broker
+from .models import ChangeEvent, ChangeFeedWatermark
+
+CHANGE_FEED_DEFAULT_LIMIT = 500
+CHANGE_FEED_MAX_LIMIT = 1000
+STREAM_DEFAULT_ENTITIES = ('sale', 'service_request', 'stock_alert')
+STREAM_REPLAY_LIMIT = 1000
+
+
+@query_budget(5)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def change_feed(request):
+    """
+    GET /api/changes/?since=<seq>
+    Sales, service request and vehicle changes after `since` (Admin only)
+    
+    Query Parameters:
+    - since: Last seq the client has applied. Omit it to get the current
+      position (call once after a full load)
+    - limit: Maximum events to return (default: 500, max: 1000)
+    
+    Returns 410 Gone when events after `since` were already compacted;
+    the client must then reload the full lists.
+    """
+    since = request.query_params.get('since')
+    
+    if since is None:
+        return Response({
+            'events': [],
+            'next_since': ChangeEvent.position(),
+            'has_more': False,
+        }, status=status.HTTP_200_OK)
+    
+    try:
+        since = int(since)
+        limit = int(request.query_params.get('limit', CHANGE_FEED_DEFAULT_LIMIT))
+        if since < 0 or limit <= 0:
+            raise ValueError
+    except ValueError:
+        return Response({
+            'error': 'since and limit must be non-negative integers.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(limit, CHANGE_FEED_MAX_LIMIT)
+    
+    if since < ChangeFeedWatermark.compacted_through():
+        return Response({
+            'error': 'Changes since this position are no longer available. Reload the full lists.'
+        }, status=status.HTTP_410_GONE)
+    
+    # Events after a gap that has not settled wait for the next poll (see ChangeEvent)
+    events = ChangeEvent.visible(since, list(
+        ChangeEvent.objects.filter(seq__gt=since).order_by('seq').values(
+            'seq', 'entity', 'entity_id', 'op', 'data', 'created_at'
+        )[:limit + 1]
+    ))
+    
+    has_more = len(events) > limit
+    events = events[:limit]
+    
+    return Response({
+        'events': events,
+        'next_since': events[-1]['seq'] if events else since,
+        'has_more': has_more,
+    }, status=status.HTTP_200_OK)
+
+
+async def event_stream(request):
+    """
+    GET /api/changes/stream/
+    Server-Sent Events stream of sale, service request and stock alert
+    changes for the admin queues (Admin only, serve with an ASGI server)
+    
+    Query Parameters:
+    - token: JWT access token (EventSource cannot send an Authorization header)
+    - entities: Comma-separated entities (default: sale,service_request,stock_alert)
+    
+    Each event's `id` is its change feed seq; on reconnect the browser
+    sends Last-Event-ID and missed events are replayed from the feed.
+    Streams end after EVENT_STREAM_MAX_SECONDS and the client reconnects.
+    """
+    user = await _stream_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided or are invalid.'}, status=401)
+    if user.role != 'admin':
+        return JsonResponse({'error': 'You do not have permission to perform this action.'}, status=403)
+    
+    entities = set(filter(None, request.GET.get('entities', '').split(','))) or set(STREAM_DEFAULT_ENTITIES)
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_seq = 0
+    
+    response = StreamingHttpResponse(_stream(entities, last_seq), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _stream_user(request):
+    """Authenticate from ?token= or the Authorization header"""
+    authentication = StatelessJWTAuthentication()
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _sse(message):
+    data = json.dumps(message, cls=DjangoJSONEncoder)
+    return f"id: {message['seq']}\nevent: {message['entity']}\ndata: {data}\n\n".encode()
+
+
+async def _stream(entities, last_seq):
+    broker = get_broker()
+    heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + getattr(settings, 'EVENT_STREAM_MAX_SECONDS', 300)
+    # Subscribe before replaying so nothing committed in between is lost
+    subscription = broker.subscribe()
+    try:
+        yield b'retry: 3000\n\n'
+        
+        # Live events are only compared with the replayed ones: a lower seq
+        # committing after a higher one must still be delivered
+        replayed = set()
+        if last_seq:
+            missed = await sync_to_async(list)(
+                ChangeEvent.objects.filter(seq__gt=last_seq, entity__in=entities)
+                .order_by('seq')[:STREAM_REPLAY_LIMIT]
+            )
+            for event in missed:
+                replayed.add(event.seq)
+                yield _sse(event.as_message())
+        
+        while time.monotonic() < deadline:
+            message = await subscription.get(timeout=heartbeat)
+            if subscription.overflowed:
+                yield b'event: resync\ndata: {}\n\n'
+                return
+            if message is None:
+                yield b': ping\n\n'
+            elif message['entity'] in entities and message['seq'] not in replayed:
+                yield _sse(message)
+    finally:
+        broker.unsubscribe(subscription)
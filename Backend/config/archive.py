@@ -0,0 +1,120 @@
+"""
+Hot/cold archiving of closed sales and service requests
+
+Closed rows older than ARCHIVE_AFTER_DAYS are moved, in batched
+transactions, from the hot table into an archive table with the same
+columns and primary keys:
+
+    python manage.py archive_records --older-than 365 --batch-size 500
+
+Readers consult the archive only when the requested range reaches it,
+i.e. when it starts on or before the newest archived date.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from changes.models import ChangeEvent
+
+
+class ArchiveModelMixin:
+    """
+    Mixin for archive models. `archive_source` names the hot model
+    ('app_label.Model') and `closed_statuses` the statuses safe to move.
+    The archive model repeats the hot model's columns under the same names
+    (so serializers and values() projections work on both) plus an
+    `archived_at` timestamp.
+    """
+    archive_source = None
+    closed_statuses = ()
+    archive_date_field = 'date'
+
+    @classmethod
+    def source_model(cls):
+        from django.apps import apps
+        return apps.get_model(cls.archive_source)
+
+    @classmethod
+    def newest_date(cls):
+        """Newest archived date (one index lookup), or None when empty"""
+        return cls.objects.aggregate(newest=Max(cls.archive_date_field))['newest']
+
+    @classmethod
+    def reaches(cls, start=None, status=None):
+        """Whether a read starting at `start` (None: unbounded) can hit archived rows"""
+        if status and status not in cls.closed_statuses:
+            return False
+        newest = cls.newest_date()
+        if newest is None:
+            return False
+        return start is None or start <= newest
+
+    @classmethod
+    def default_cutoff(cls):
+        return timezone.now() - timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', 365))
+
+    @classmethod
+    def archive_batch(cls, cutoff, batch_size):
+        """Move one batch of closed rows older than `cutoff`; returns rows moved"""
+        source = cls.source_model()
+        columns = [field.attname for field in source._meta.concrete_fields]
+
+        with transaction.atomic():
+            ids = list(
+                source.objects.select_for_update()
+                .filter(status__in=cls.closed_statuses, **{f'{cls.archive_date_field}__lt': cutoff})
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return 0
+
+            archived_at = timezone.now()
+            cls.objects.bulk_create([
+                cls(archived_at=archived_at, **row)
+                for row in source.objects.filter(pk__in=ids).values(*columns)
+            ])
+            source.objects.filter(pk__in=ids).delete()
+            if getattr(source, 'change_entity', None):
+                # Archived rows leave the hot lists; tell syncing clients
+                ChangeEvent.emit_many(source.change_entity, [(pk, 'delete', {}) for pk in ids])
+        return len(ids)
+
+    @classmethod
+    def archive(cls, cutoff=None, batch_size=None):
+        """Move every closed row older than `cutoff` in batches; returns rows moved"""
+        cutoff = cutoff or cls.default_cutoff()
+        batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 500)
+        moved = 0
+        while True:
+            count = cls.archive_batch(cutoff, batch_size)
+            moved += count
+            if count < batch_size:
+                return moved
+
+
+def merge_grouped(results, keys, sums):
+    """
+    Merge values().annotate() rows from the hot and archive tables,
+    adding up `sums` for rows sharing the same `keys`.
+    """
+    merged = {}
+    for rows in results:
+        for row in rows:
+            key = tuple(row[name] for name in keys)
+            if key not in merged:
+                merged[key] = dict(row)
+                continue
+            for name in sums:
+                if row[name] is not None:
+                    merged[key][name] = (merged[key][name] or 0) + row[name]
+    return list(merged.values())
+
+
+def merge_newest_first(hot, cold, key):
+    """Merge two iterables already sorted newest first"""
+    return heapq.merge(hot, cold, key=key, reverse=True)
@@ -1,5 +1,9 @@
 """
 ASGI config for 2 Wheeler Sales Management and Maintenance System.
+
+Serve with an ASGI server (e.g. `uvicorn config.asgi:application`) so the
+live event stream at /api/changes/stream/ holds idle connections on the
+event loop instead of one worker thread each.
 """
 
 import os
@@ -0,0 +1,93 @@
+"""
+Sparse fieldsets for list endpoints
+
+    GET /api/sales/sales/?fields=id,status,amount
+    GET /api/inventory/vehicles/?omit=description
+
+The serializer drops the unrequested fields and the viewset narrows its
+queryset to match with .only() and a trimmed select_related().
+"""
+from rest_framework import serializers
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer mixin honouring ?fields= and ?omit= on the root serializer.
+
+    `sparse_sources` maps output fields that are not plain model columns to
+    the ORM paths they read, e.g. {'vehicle_details': ('vehicle__brand', ...)}.
+    Paths through a relation are select_related() only when requested.
+    """
+    sparse_sources = {}
+
+    @classmethod
+    def sparse_field_names(cls, request):
+        """Return the requested output field names, or None for all fields"""
+        if request is None:
+            return None
+        fields = _split(request.query_params.get('fields'))
+        omit = _split(request.query_params.get('omit'))
+        if not fields and not omit:
+            return None
+        names = set(fields or cls.Meta.fields)
+        return names - omit
+
+    @classmethod
+    def sparse_queryset(cls, queryset, request):
+        """Narrow the queryset to the columns and joins the requested fields read"""
+        names = cls.sparse_field_names(request)
+        if names is None:
+            return queryset
+
+        model = cls.Meta.model
+        columns = {model._meta.pk.name}
+        relations = set()
+        for name in names:
+            if name in cls.sparse_sources:
+                paths = cls.sparse_sources[name]
+            elif name in cls.Meta.fields:
+                paths = (name,)
+            else:
+                continue
+            for path in paths:
+                columns.add(path)
+                if '__' in path:
+                    relation = path.split('__', 1)[0]
+                    relations.add(relation)
+                    columns.add(relation)
+
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        return queryset.only(*sorted(columns))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Only prune the top-level serializer, never nested ones
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+
+        names = self.sparse_field_names(self.context.get('request'))
+        if names is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in names}
+
+
+class SparseFieldsetViewMixin:
+    """Viewset mixin applying the serializer's sparse queryset on list actions"""
+    sparse_fieldset_actions = ('list',)
+
+    def sparse_queryset(self, queryset):
+        if self.action not in self.sparse_fieldset_actions:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsetSerializerMixin):
+            return queryset
+        return serializer_class.sparse_queryset(queryset, self.request)
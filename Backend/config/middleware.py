@@ -0,0 +1,169 @@
+"""
+Per-request SQL recording: query budgets and N+1 detection
+
+Enabled for every request with QUERY_BUDGET_ENABLED, or per request with
+the X-Query-Budget: 1 header when QUERY_BUDGET_HEADER_ENABLED is on:
+
+    curl -H 'X-Query-Budget: 1' -H 'Authorization: Bearer ...' /api/sales/sales/
+
+Every statement on every database connection is recorded while the view
+runs. Responses carry X-Query-Count and X-DB-Time (milliseconds), and a
+warning with the stack of the offending code is logged when
+
+- the same query shape (SQL with literals and IN lists collapsed) runs
+  QUERY_BUDGET_REPEAT_THRESHOLD times or more, the usual N+1 signature, or
+- the request runs more queries than its budget.
+
+Budgets come from, in order: QUERY_BUDGETS[<url name>], the view's
+`query_budget` (an int, or {action: int} on viewsets; use the query_budget
+decorator for function views), then QUERY_BUDGET_DEFAULT. With
+QUERY_BUDGET_STRICT, violations raise QueryBudgetExceeded instead, so test
+runs fail on new N+1s. Queries made while a streaming response is consumed
+are not counted.
+"""
+import logging
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised instead of logging when QUERY_BUDGET_STRICT is on"""
+
+
+def query_budget(limit):
+    """
+    Set the query budget of a function view; apply it above @api_view:
+
+        @query_budget(10)
+        @api_view(['GET'])
+        def sales_report(request): ...
+    """
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+def query_shape(sql):
+    """SQL with literals and IN (...) lists collapsed, so N+1 queries compare equal"""
+    sql = _IN_LIST.sub('(%s...)', sql)
+    sql = _STRING.sub('?', sql)
+    return _NUMBER.sub('?', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper that records (alias, sql, duration, stack) per statement"""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((self.alias, sql, time.perf_counter() - started, self._stack()))
+
+    @staticmethod
+    def _stack():
+        """Frames from this project only; Django and library frames are noise here"""
+        base_dir = str(settings.BASE_DIR)
+        return [
+            frame for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(base_dir)
+            and 'site-packages' not in frame.filename
+            and frame.filename != __file__
+        ]
+
+
+class QueryBudgetMiddleware:
+    HEADER = 'HTTP_X_QUERY_BUDGET'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.enabled(request):
+            return self.get_response(request)
+
+        recorders = []
+        with ExitStack() as stack:
+            for connection in connections.all():
+                recorder = QueryRecorder(connection.alias)
+                stack.enter_context(connection.execute_wrapper(recorder))
+                recorders.append(recorder)
+            response = self.get_response(request)
+
+        queries = [query for recorder in recorders for query in recorder.queries]
+        response['X-Query-Count'] = str(len(queries))
+        response['X-DB-Time'] = f'{sum(query[2] for query in queries) * 1000:.2f}'
+        self.check(request, queries)
+        return response
+
+    def enabled(self, request):
+        if settings.QUERY_BUDGET_ENABLED:
+            return True
+        return settings.QUERY_BUDGET_HEADER_ENABLED and request.META.get(self.HEADER) in ('1', 'true')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
+
+    def budget(self, request):
+        match = request.resolver_match
+        if match is not None and match.url_name in settings.QUERY_BUDGETS:
+            return settings.QUERY_BUDGETS[match.url_name]
+
+        view_func = getattr(request, '_query_budget_view', None)
+        limit = getattr(view_func, 'query_budget', None)
+        if limit is None:
+            limit = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+        if isinstance(limit, dict):
+            actions = getattr(view_func, 'actions', None) or {}
+            limit = limit.get(actions.get(request.method.lower()))
+        return settings.QUERY_BUDGET_DEFAULT if limit is None else limit
+
+    def check(self, request, queries):
+        target = f'{request.method} {request.path}'
+        violations = []
+
+        shapes = Counter(query_shape(query[1]) for query in queries)
+        for shape, count in shapes.most_common():
+            if count < settings.QUERY_BUDGET_REPEAT_THRESHOLD:
+                break
+            # The second occurrence is the first repeat, usually inside the loop
+            first_repeat = [query for query in queries if query_shape(query[1]) == shape][1]
+            violations.append(
+                f'{target}: same query ran {count} times (possible N+1):\n'
+                f'    {shape}\n'
+                f'{self.format_stack(first_repeat[3])}'
+            )
+
+        limit = self.budget(request)
+        if len(queries) > limit:
+            top = '\n'.join(f'    {count}x {shape}' for shape, count in shapes.most_common(5))
+            violations.append(
+                f'{target}: {len(queries)} queries over a budget of {limit}; most frequent:\n{top}\n'
+                f'Query {limit + 1} ran from:\n{self.format_stack(queries[limit][3])}'
+            )
+
+        for violation in violations:
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(violation)
+            logger.warning(violation)
+
+    @staticmethod
+    def format_stack(frames):
+        return ''.join(traceback.format_list(frames)) or '    (no project frames)\n'
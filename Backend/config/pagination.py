@@ -0,0 +1,177 @@
+"""
+Keyset pagination and NDJSON streaming for customer history endpoints
+
+    GET /api/sales/sales/my_purchases/?limit=50
+    GET /api/sales/sales/my_purchases/?limit=50&cursor=<next_cursor>
+    GET /api/sales/sales/my_purchases/?stream=ndjson
+
+Pages are read with `WHERE (date, id) < cursor ORDER BY date DESC, id DESC
+LIMIT n + 1`; the extra row tells us whether another page exists, so no
+COUNT query is needed. Viewsets with an archive table (config/archive.py)
+merge its rows in by (date, id), reading it only when the page can reach it.
+"""
+import base64
+from operator import attrgetter, itemgetter
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from config.archive import merge_newest_first
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (datetime, pk) or raise ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError, TypeError):
+        raise ValueError('Invalid cursor.')
+    if value is None:
+        raise ValueError('Invalid cursor.')
+    return value, pk
+
+
+class KeysetHistoryMixin:
+    """
+    Viewset mixin for count-free history listings.
+
+    Without `limit`, `cursor` or `stream` the full history is returned as
+    before (`count` + `results`) so existing clients keep working.
+    """
+    history_ordering_field = 'date'
+    history_default_limit = 50
+    history_max_limit = 500
+    history_stream_chunk_size = 500
+
+    def history_archive_queryset(self):
+        """Archived rows of the same history, or None (override per viewset)"""
+        return None
+
+    def history_response(self, queryset):
+        params = self.request.query_params
+        field = self.history_ordering_field
+        queryset = queryset.order_by(f'-{field}', '-pk')
+        archive = self.history_archive_queryset()
+        if archive is not None:
+            archive = archive.order_by(f'-{field}', '-pk')
+
+        builder = self.get_row_builder() if hasattr(self, 'get_row_builder') else None
+
+        if params.get('stream') == 'ndjson':
+            return self.history_stream(queryset, builder, archive)
+
+        if 'limit' not in params and 'cursor' not in params:
+            if builder is not None:
+                rows = builder.project(queryset, field, 'pk')
+                if archive is not None:
+                    archived = builder.project(archive, field, 'pk')
+                    rows = merge_newest_first(rows, archived, itemgetter(field, 'pk'))
+                results = [builder.build(row) for row in rows]
+            else:
+                if archive is not None:
+                    queryset = list(merge_newest_first(queryset, archive, attrgetter(field, 'pk')))
+                results = self.get_serializer(queryset, many=True).data
+            return Response({
+                'count': len(results),
+                'results': results
+            }, status=status.HTTP_200_OK)
+
+        try:
+            limit = int(params.get('limit', self.history_default_limit))
+            if limit <= 0:
+                raise ValueError
+        except ValueError:
+            return Response({
+                'error': 'Invalid limit. Must be a positive integer.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, self.history_max_limit)
+
+        cursor = params.get('cursor')
+        if cursor:
+            try:
+                value, pk = decode_cursor(cursor)
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            after_cursor = Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            queryset = queryset.filter(after_cursor)
+            if archive is not None:
+                archive = archive.filter(after_cursor)
+
+        if builder is not None:
+            rows = list(builder.project(queryset, field, 'pk')[:limit + 1])
+            if self.history_archive_reached(archive, rows, limit, itemgetter(field)):
+                archived = list(builder.project(archive, field, 'pk')[:limit + 1])
+                rows = list(merge_newest_first(rows, archived, itemgetter(field, 'pk')))
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            results = [builder.build(row) for row in rows]
+            next_cursor = encode_cursor(rows[-1][field], rows[-1]['pk']) if has_more else None
+        else:
+            names, defer = queryset.query.deferred_loading
+            if names and not defer and field not in names:
+                # A sparse fieldset narrowed the columns; the cursor still needs the key
+                queryset = queryset.only(*names, field)
+
+            rows = list(queryset[:limit + 1])
+            if self.history_archive_reached(archive, rows, limit, attrgetter(field)):
+                archived = list(archive[:limit + 1])
+                rows = list(merge_newest_first(rows, archived, attrgetter(field, 'pk')))
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            results = self.get_serializer(rows, many=True).data
+            next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].pk) if has_more else None
+
+        return Response({
+            'results': results,
+            'has_more': has_more,
+            'next_cursor': next_cursor,
+        }, status=status.HTTP_200_OK)
+
+    def history_archive_reached(self, archive, rows, limit, get_date):
+        """
+        Whether the archive can add to this page: it is skipped when the hot
+        table already filled the page with rows newer than anything archived.
+        """
+        if archive is None:
+            return False
+        if len(rows) <= limit:
+            return True
+        newest = archive.model.newest_date()
+        return newest is not None and get_date(rows[-1]) <= newest
+
+    def history_stream(self, queryset, builder=None, archive=None):
+        """Stream the full history as newline-delimited JSON, one row per line"""
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        renderer = JSONRenderer()
+        chunk_size = self.history_stream_chunk_size
+        field = self.history_ordering_field
+
+        def rows():
+            if builder is not None:
+                hot = builder.project(queryset, field, 'pk').iterator(chunk_size=chunk_size)
+                if archive is not None:
+                    cold = builder.project(archive, field, 'pk').iterator(chunk_size=chunk_size)
+                    hot = merge_newest_first(hot, cold, itemgetter(field, 'pk'))
+                for row in hot:
+                    yield renderer.render(builder.build(row)) + b'\n'
+                return
+            objects = queryset.iterator(chunk_size=chunk_size)
+            if archive is not None:
+                cold = archive.iterator(chunk_size=chunk_size)
+                objects = merge_newest_first(objects, cold, attrgetter(field, 'pk'))
+            for obj in objects:
+                yield renderer.render(serializer_class(obj, context=context).data) + b'\n'
+
+        return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
@@ -0,0 +1,138 @@
+"""
+Serializer-free fast path for list endpoints
+
+A RowBuilder is compiled once per request from a (possibly sparse) model
+serializer. It reads a flat values() projection joined across the
+serializer's relations and shapes each row into the exact structure the
+serializer would produce, reusing the serializer's own field
+to_representation() and get_<field>() methods for every value.
+"""
+from types import SimpleNamespace
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+class RowBuilder:
+    """Compiled plan turning values() rows into serializer-shaped dicts"""
+
+    def __init__(self, serializer, prefix=''):
+        self.paths = set()
+        self.plan = []
+        self.model = serializer.Meta.model
+        self.pk_path = f'{prefix}{self.model._meta.pk.attname}'
+        sources = getattr(serializer, 'sparse_sources', {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                self.plan.append((name, self._nested(field, prefix)))
+            elif isinstance(field, serializers.SerializerMethodField):
+                method = getattr(serializer, field.method_name)
+                self.plan.append((name, self._method(method, sources[name], prefix)))
+            elif name in sources:
+                self.plan.append((name, self._computed(field, sources[name], prefix)))
+            elif isinstance(field, serializers.RelatedField):
+                self.plan.append((name, self._column(f'{prefix}{field.source}', None)))
+            elif isinstance(field, serializers.FileField):
+                self.plan.append((name, self._file(field, prefix)))
+            elif '.' in field.source or field.source == '*':
+                raise ValueError(f'Field {name!r} cannot be built from a values() row.')
+            else:
+                self.plan.append((name, self._column(f'{prefix}{field.source}', field.to_representation)))
+
+    def project(self, queryset, *extra):
+        """values() projection with every column the plan reads"""
+        return queryset.values(*sorted(self.paths.union(extra)))
+
+    def build(self, row):
+        return {name: build(row) for name, build in self.plan}
+
+    def _column(self, path, to_representation):
+        self.paths.add(path)
+        if to_representation is None:
+            return lambda row: row[path]
+        return lambda row: None if row[path] is None else to_representation(row[path])
+
+    def _file(self, field, prefix):
+        path = f'{prefix}{field.source}'
+        storage = self.model._meta.get_field(field.source).storage
+        self.paths.add(path)
+
+        def build(row):
+            name = row[path]
+            if not name:
+                return None
+            if not getattr(field, 'use_url', True):
+                return name
+            url = storage.url(name)
+            request = field.context.get('request')
+            return request.build_absolute_uri(url) if request is not None else url
+        return build
+
+    def _nested(self, serializer, prefix):
+        nested = RowBuilder(serializer, prefix=f'{prefix}{serializer.source}__')
+        self.paths |= nested.paths | {nested.pk_path}
+        return lambda row: None if row[nested.pk_path] is None else nested.build(row)
+
+    def _namespace(self, paths, prefix):
+        """Build a stand-in object exposing `paths` as attributes (relations nested)"""
+        self.paths.update(f'{prefix}{path}' for path in paths)
+        relations = {}
+        plain = []
+        for path in paths:
+            if '__' in path:
+                relation, attr = path.split('__', 1)
+                relations.setdefault(relation, []).append(attr)
+            else:
+                plain.append(path)
+
+        def make(row):
+            obj = SimpleNamespace(**{attr: row[f'{prefix}{attr}'] for attr in plain})
+            for relation, attrs in relations.items():
+                values = {attr: row[f'{prefix}{relation}__{attr}'] for attr in attrs}
+                setattr(obj, relation, SimpleNamespace(**values) if values.get('id') is not None else None)
+            return obj
+        return make
+
+    def _method(self, method, paths, prefix):
+        make = self._namespace(paths, prefix)
+        return lambda row: method(make(row))
+
+    def _computed(self, field, paths, prefix):
+        """Model properties (e.g. is_in_stock) evaluated against the row"""
+        prop = getattr(self.model, field.source)
+        make = self._namespace(paths, prefix)
+        return lambda row: field.to_representation(prop.fget(make(row)))
+
+
+class FastListMixin:
+    """
+    Viewset mixin rendering list actions through a RowBuilder instead of
+    the serializer. Falls back to the serializer when the setting
+    FAST_LIST_RENDERING is off or the serializer cannot be compiled.
+    """
+    fast_list_actions = ('list',)
+
+    def get_row_builder(self):
+        if not getattr(settings, 'FAST_LIST_RENDERING', True):
+            return None
+        if self.action not in self.fast_list_actions:
+            return None
+        try:
+            return RowBuilder(self.get_serializer())
+        except (ValueError, AttributeError, KeyError):
+            return None
+
+    def list(self, request, *args, **kwargs):
+        builder = self.get_row_builder()
+        if builder is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = builder.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([builder.build(row) for row in page])
+        return Response([builder.build(row) for row in queryset])
@@ -6,6 +6,8 @@ from pathlib import Path
 from datetime import timedelta
 import os
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,10 +47,13 @@ INSTALLED_APPS = [
     'sales',
     'service',
     'reports',
+    'changes',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'config.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,9 +91,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than in-memory SQLite, whose connections share one
+        # lock table: concurrency tests run overlapping transactions in threads
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Caches: 'default' is per process; 'shared' is seen by every worker (OTP codes).
+# The database table is created by migrations; point SHARED_CACHE_BACKEND at
+# django.core.cache.backends.redis.RedisCache in production.
+SHARED_CACHE_BACKEND = os.environ.get('SHARED_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'shared_cache'),
+        # The database backend culls live keys once MAX_ENTRIES is reached
+        'OPTIONS': {'MAX_ENTRIES': 100000} if SHARED_CACHE_BACKEND.endswith('DatabaseCache') else {},
+    },
+}
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -142,7 +166,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -150,12 +174,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'accounts.throttling.SharedAnonRateThrottle',
+        'accounts.throttling.SharedUserRateThrottle',
+        'accounts.throttling.SharedScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'login': '10/minute',
+        'register': '5/hour',
+        'otp_resend': '5/hour',
+        'otp_verify': '10/minute',
     },
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -168,6 +197,39 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
 }
 
+# Render sale/service list endpoints from values() rows instead of the
+# serializers (same JSON output, see config/rows.py)
+FAST_LIST_RENDERING = os.environ.get('FAST_LIST_RENDERING', 'True') == 'True'
+
+# Closed sales/service requests older than this move to the archive tables
+# (python manage.py archive_records, see config/archive.py)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
+
+# Change feed events older than this are removed by compact_changes
+CHANGE_FEED_RETENTION_DAYS = int(os.environ.get('CHANGE_FEED_RETENTION_DAYS', '7'))
+
+# Change feed readers wait this long at a gap in seq, so a transaction that
+# took a lower seq but commits later is not skipped. Keep it above the
+# longest write transaction; 0 is safe only while writes are serialized.
+CHANGE_FEED_VISIBILITY_LAG_MS = int(os.environ.get('CHANGE_FEED_VISIBILITY_LAG_MS', '1000'))
+
+# Live admin event stream (/api/changes/stream/, see changes/broker.py).
+# Use DatabasePollingBroker when more than one process serves the API.
+CHANGE_BROKER_BACKEND = os.environ.get('CHANGE_BROKER_BACKEND', 'changes.broker.InProcessBroker')
+CHANGE_BROKER_POLL_INTERVAL = float(os.environ.get('CHANGE_BROKER_POLL_INTERVAL', '1.0'))
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+EVENT_STREAM_MAX_SECONDS = 300
+
+# Workshop calendar for service bookings (/api/service/slots/)
+SERVICE_SLOT_MINUTES = int(os.environ.get('SERVICE_SLOT_MINUTES', '60'))
+SERVICE_WORKSHOP_OPENS = os.environ.get('SERVICE_WORKSHOP_OPENS', '09:00')
+SERVICE_WORKSHOP_CLOSES = os.environ.get('SERVICE_WORKSHOP_CLOSES', '18:00')
+SERVICE_BAYS = int(os.environ.get('SERVICE_BAYS', '3'))
+
+# Assign new service requests to the admin with the fewest open jobs
+SERVICE_AUTO_ASSIGN = os.environ.get('SERVICE_AUTO_ASSIGN', 'True') == 'True'
+
 
 # Simple JWT Configuration
 SIMPLE_JWT = {
@@ -186,6 +248,44 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# How long each process trusts its cached copy of a user's role/is_active/token_version
+USER_AUTH_CACHE_SECONDS = int(os.environ.get('USER_AUTH_CACHE_SECONDS', '60'))
+
+# Email verification codes (accounts.otp); expired leftovers are removed by sweep_otps
+OTP_CACHE_ALIAS = 'shared'
+OTP_TTL_SECONDS = 300
+OTP_RESEND_COOLDOWN_SECONDS = 60
+
+# Unverified registrations older than this are deleted by purge_unverified_users
+UNVERIFIED_USER_TTL_HOURS = int(os.environ.get('UNVERIFIED_USER_TTL_HOURS', '24'))
+
+# Throttle counters (accounts.throttling). The default keeps them in the
+# database, shared by all workers but written on every request. In production
+# use accounts.throttling.CacheRateCounter with THROTTLE_CACHE_ALIAS pointing
+# at a Redis or Memcached cache (e.g. 'shared' with SHARED_CACHE_BACKEND set to
+# Redis); `manage.py check` warns when the alias cannot share counters.
+THROTTLE_COUNTER_BACKEND = os.environ.get('THROTTLE_COUNTER_BACKEND', 'accounts.throttling.DatabaseRateCounter')
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'shared')
+
+# In-process refresh token blacklist index (accounts.blacklist); other
+# processes' blacklistings are picked up every TOKEN_BLACKLIST_SYNC_SECONDS
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100000
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_RECENT_SIZE = 10000
+TOKEN_BLACKLIST_SYNC_SECONDS = float(os.environ.get('TOKEN_BLACKLIST_SYNC_SECONDS', '2'))
+
+
+# Per-request query recording (config.middleware): X-Query-Count/X-DB-Time
+# headers, N+1 and budget warnings. On for every request with
+# QUERY_BUDGET_ENABLED, or per request with an `X-Query-Budget: 1` header
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', 'False') == 'True'
+QUERY_BUDGET_HEADER_ENABLED = os.environ.get('QUERY_BUDGET_HEADER_ENABLED', 'False') == 'True'
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+QUERY_BUDGET_DEFAULT = int(os.environ.get('QUERY_BUDGET_DEFAULT', '30'))
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.environ.get('QUERY_BUDGET_REPEAT_THRESHOLD', '5'))
+# Per-URL-name overrides of the views' own budgets, e.g. {'sale-list': 8}
+QUERY_BUDGETS = {}
+
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
@@ -198,3 +298,7 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only in development
+
+# Let browser clients send X-Query-Budget and read the query headers (config.middleware)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-query-budget')
+CORS_EXPOSE_HEADERS = ['X-Query-Count', 'X-DB-Time']
@@ -13,6 +13,7 @@ urlpatterns = [
     path('api/sales/', include('sales.urls')),
     path('api/service/', include('service.urls')),
     path('api/reports/', include('reports.urls')),
+    path('api/changes/', include('changes.urls')),
 ]
 
 # Serve media files in development
@@ -2,7 +2,8 @@
 Admin configuration for inventory app
 """
 from django.contrib import admin
-from .models import Vehicle
+from django.db import transaction
+from .models import Vehicle, StockMovement, StockSnapshot, LowStockAlert
 
 
 @admin.register(Vehicle)
@@ -19,9 +20,59 @@ class VehicleAdmin(admin.ModelAdmin):
             'fields': ('brand', 'model', 'description', 'image')
         }),
         ('Pricing & Stock', {
-            'fields': ('price', 'stock_qty', 'is_active')
+            'fields': ('price', 'stock_qty', 'low_stock_threshold', 'is_active')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        """Log stock edits made through the admin in the ledger"""
+        if not change:
+            # Vehicle.save() writes the opening movement
+            obj._stock_changed_by = request.user
+            super().save_model(request, obj, form, change)
+            return
+        previous_qty = form.initial.get('stock_qty', 0)
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            obj.log_stock_adjustment(previous_qty, user=request.user)
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """Read-only admin interface for the stock ledger"""
+    list_display = ['id', 'vehicle', 'quantity', 'reason', 'reference', 'created_by', 'created_at']
+    list_filter = ['reason', 'created_at']
+    search_fields = ['vehicle__brand', 'vehicle__model']
+    ordering = ['-id']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    """Admin interface for stock snapshots"""
+    list_display = ['id', 'vehicle', 'stock_qty', 'last_movement_id', 'taken_at']
+    list_filter = ['taken_at']
+    search_fields = ['vehicle__brand', 'vehicle__model']
+    ordering = ['-taken_at']
+    readonly_fields = ['vehicle', 'stock_qty', 'last_movement_id', 'taken_at']
+
+
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    """Admin interface for low-stock alerts"""
+    list_display = ['vehicle', 'level', 'stock_qty', 'threshold', 'is_active', 'raised_at', 'updated_at']
+    list_filter = ['level', 'is_active']
+    search_fields = ['vehicle__brand', 'vehicle__model']
+    readonly_fields = ['vehicle', 'level', 'stock_qty', 'threshold', 'is_active', 'raised_at', 'updated_at']
@@ -0,0 +1,54 @@
+"""
+Take periodic stock snapshots from the stock movement ledger.
+
+Run from cron (e.g. hourly) so "stock at time T" queries only replay
+the movements recorded since the previous run:
+
+    python manage.py snapshot_stock
+"""
+from django.core.management.base import BaseCommand
+
+from inventory.models import Vehicle, StockSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Snapshot stock balances for vehicles with ledger activity since their last snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vehicle',
+            type=int,
+            action='append',
+            dest='vehicles',
+            help='Only snapshot this vehicle ID (repeatable)',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report vehicles whose ledger balance differs from stock_qty',
+        )
+
+    def handle(self, *args, **options):
+        snapshots = StockSnapshot.take(vehicle_ids=options['vehicles'])
+        self.stdout.write(self.style.SUCCESS(f'Created {len(snapshots)} stock snapshot(s).'))
+
+        if options['check']:
+            self.report_drift(snapshots)
+
+    def report_drift(self, snapshots):
+        """Compare fresh snapshots against the live stock_qty column"""
+        current = dict(
+            Vehicle.objects.filter(
+                id__in=[snapshot.vehicle_id for snapshot in snapshots]
+            ).values_list('id', 'stock_qty')
+        )
+        drifted = 0
+        for snapshot in snapshots:
+            live_qty = current.get(snapshot.vehicle_id)
+            if live_qty is not None and live_qty != snapshot.stock_qty:
+                drifted += 1
+                self.stdout.write(self.style.WARNING(
+                    f'Vehicle #{snapshot.vehicle_id}: ledger={snapshot.stock_qty} stock_qty={live_qty}'
+                ))
+        if not drifted:
+            self.stdout.write('Ledger balances match stock_qty.')
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_ledger(apps, schema_editor):
+    """Record existing stock as opening balances so the ledger replays to stock_qty"""
+    Vehicle = apps.get_model('inventory', 'Vehicle')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(vehicle_id=vehicle_id, quantity=stock_qty, reason='initial')
+            for vehicle_id, stock_qty in Vehicle.objects.filter(
+                stock_qty__gt=0
+            ).values_list('id', 'stock_qty').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stock_qty', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField(help_text='Last ledger entry included in this balance')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Stock Snapshot',
+                'verbose_name_plural': 'Stock Snapshots',
+                'ordering': ['-taken_at', '-id'],
+                'indexes': [models.Index(fields=['vehicle', 'taken_at'], name='inventory_s_vehicle_1bdef3_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField(help_text='Signed change in stock')),
+                ('reason', models.CharField(choices=[('initial', 'Initial Stock'), ('add', 'Stock Added'), ('reduce', 'Stock Reduced'), ('adjustment', 'Manual Adjustment'), ('sale_verified', 'Sale Verified'), ('sale_cancelled', 'Sale Cancelled')], max_length=20)),
+                ('reference', models.PositiveBigIntegerField(blank=True, help_text='ID of the sale that caused the movement, if any', null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Stock Movement',
+                'verbose_name_plural': 'Stock Movements',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['vehicle', 'created_at'], name='inventory_s_vehicle_fd71e2_idx'), models.Index(fields=['reason', 'reference'], name='inventory_s_reason_ed092f_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
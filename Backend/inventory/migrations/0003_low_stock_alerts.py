@@ -0,0 +1,59 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def raise_existing_alerts(apps, schema_editor):
+    """Seed alerts for vehicles already at or below the default threshold"""
+    Vehicle = apps.get_model('inventory', 'Vehicle')
+    LowStockAlert = apps.get_model('inventory', 'LowStockAlert')
+    LowStockAlert.objects.bulk_create(
+        [
+            LowStockAlert(
+                vehicle_id=vehicle_id,
+                level='out' if stock_qty == 0 else 'low',
+                stock_qty=stock_qty,
+                threshold=threshold,
+            )
+            for vehicle_id, stock_qty, threshold in Vehicle.objects.filter(
+                stock_qty__lte=models.F('low_stock_threshold')
+            ).values_list('id', 'stock_qty', 'low_stock_threshold').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(default=10, help_text='Raise a low-stock alert when stock falls to this level'),
+        ),
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_alert', serialize=False, to='inventory.vehicle')),
+                ('level', models.CharField(choices=[('low', 'Low Stock'), ('out', 'Out of Stock')], max_length=10)),
+                ('stock_qty', models.PositiveIntegerField()),
+                ('threshold', models.PositiveIntegerField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('raised_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Low Stock Alert',
+                'verbose_name_plural': 'Low Stock Alerts',
+                'ordering': ['stock_qty'],
+                'indexes': [models.Index(fields=['is_active', 'level'], name='inventory_l_is_acti_c77748_idx'), models.Index(fields=['updated_at'], name='inventory_l_updated_f27398_idx')],
+            },
+        ),
+        migrations.RunPython(raise_existing_alerts, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,23 @@
 """
 Models for inventory app - Vehicle management
 """
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
+from changes.models import ChangeEvent, ChangeFeedModelMixin
 
-class Vehicle(models.Model):
+
+class Vehicle(ChangeFeedModelMixin, models.Model):
     """Vehicle model for 2-wheeler inventory"""
     
+    change_entity = 'vehicle'
+    change_fields = ('stock_qty', 'price', 'is_active')
+    
     id = models.BigAutoField(primary_key=True)
     brand = models.CharField(max_length=100, db_index=True)
     model = models.CharField(max_length=100, db_index=True)
@@ -18,6 +27,10 @@ class Vehicle(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))]
     )
     stock_qty = models.PositiveIntegerField(default=0)
+    low_stock_threshold = models.PositiveIntegerField(
+        default=10,
+        help_text='Raise a low-stock alert when stock falls to this level'
+    )
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='vehicles/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -37,21 +50,339 @@ class Vehicle(models.Model):
     def __str__(self):
         return f"{self.brand} {self.model} - ₹{self.price}"
     
-    def reduce_stock(self, quantity):
-        """Reduce stock quantity"""
-        if self.stock_qty >= quantity:
-            self.stock_qty -= quantity
-            self.save()
-            return True
-        return False
+    def save(self, *args, **kwargs):
+        """
+        Save, opening the stock ledger with an 'initial' movement when the
+        vehicle is new so that stock_at() always adds up to stock_qty.
+        Set _stock_changed_by to record who created it.
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                if self.stock_qty:
+                    self.stock_movement(
+                        self.stock_qty, 'initial', getattr(self, '_stock_changed_by', None)
+                    ).save()
+                LowStockAlert.sync([self])
+        self._stock_changed_by = None
     
-    def add_stock(self, quantity):
+    def reduce_stock(self, quantity, reason='reduce', user=None, reference=None):
+        """Reduce stock quantity (guarded UPDATE, never goes negative)"""
+        with transaction.atomic():
+            if not self._apply_stock_delta(-quantity):
+                return False
+            StockMovement.record([
+                self.stock_movement(-quantity, reason, user, reference)
+            ])
+        return True
+    
+    def add_stock(self, quantity, reason='add', user=None, reference=None):
         """Add stock quantity"""
-        self.stock_qty += quantity
-        self.save()
+        with transaction.atomic():
+            self._apply_stock_delta(quantity)
+            StockMovement.record([
+                self.stock_movement(quantity, reason, user, reference)
+            ])
+        return True
+    
+    def _apply_stock_delta(self, delta):
+        """
+        Change stock_qty in place with a single conditional UPDATE that only
+        writes stock_qty/updated_at. Returns False when the change would
+        make stock negative.
+        """
+        now = timezone.now()
+        # UPDATE ... RETURNING saves the read-back where it is known to work
+        # (MariaDB can RETURN from INSERT but not from UPDATE)
+        if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert:
+            table = connection.ops.quote_name(self._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET stock_qty = stock_qty + %s, updated_at = %s '
+                    f'WHERE id = %s AND stock_qty + %s >= 0 RETURNING stock_qty',
+                    [delta, connection.ops.adapt_datetimefield_value(now), self.pk, delta]
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return False
+            self.stock_qty = row[0]
+        else:
+            updated = Vehicle.objects.filter(
+                pk=self.pk,
+                stock_qty__gte=max(-delta, 0)
+            ).update(stock_qty=F('stock_qty') + delta, updated_at=now)
+            if not updated:
+                return False
+            self.stock_qty = Vehicle.objects.filter(pk=self.pk).values_list('stock_qty', flat=True).get()
+        self.updated_at = now
         return True
     
+    def log_stock_adjustment(self, previous_qty, reason='adjustment', user=None):
+        """
+        Record a direct edit of stock_qty (API update, Django admin) after
+        save(), which has already published the vehicle's change event
+        """
+        if self.stock_qty != previous_qty:
+            StockMovement.record([
+                self.stock_movement(self.stock_qty - previous_qty, reason, user)
+            ], emit=False)
+        else:
+            # The threshold may have changed even if stock did not
+            LowStockAlert.sync([self])
+    
+    def stock_movement(self, quantity, reason, user=None, reference=None):
+        """Build an unsaved ledger entry for this vehicle"""
+        return StockMovement(
+            vehicle=self,
+            quantity=quantity,
+            reason=reason,
+            reference=reference,
+            created_by=user,
+        )
+    
+    def stock_at(self, when):
+        """
+        Stock quantity at a point in time, read from the latest snapshot
+        taken before `when` plus the ledger tail recorded after it.
+        """
+        snapshot = self.stock_snapshots.filter(taken_at__lte=when).first()
+        tail = self.stock_movements.filter(created_at__lte=when)
+        base = 0
+        if snapshot:
+            base = snapshot.stock_qty
+            tail = tail.filter(id__gt=snapshot.last_movement_id)
+        return base + (tail.aggregate(total=Sum('quantity'))['total'] or 0)
+    
     @property
     def is_in_stock(self):
         """Check if vehicle is in stock"""
         return self.stock_qty > 0
+    
+    @property
+    def stock_level(self):
+        """'out', 'low' or None when stock is healthy"""
+        if self.stock_qty == 0:
+            return 'out'
+        if self.stock_qty <= self.low_stock_threshold:
+            return 'low'
+        return None
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of every change to a vehicle's stock"""
+    
+    REASON_CHOICES = [
+        ('initial', 'Initial Stock'),
+        ('add', 'Stock Added'),
+        ('reduce', 'Stock Reduced'),
+        ('adjustment', 'Manual Adjustment'),
+        ('sale_verified', 'Sale Verified'),
+        ('sale_cancelled', 'Sale Cancelled'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='stock_movements'
+    )
+    quantity = models.IntegerField(help_text='Signed change in stock')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text='ID of the sale that caused the movement, if any'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Stock Movement'
+        verbose_name_plural = 'Stock Movements'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['vehicle', 'created_at']),
+            models.Index(fields=['reason', 'reference']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_reason_display()} {self.quantity:+d} (vehicle #{self.vehicle_id})"
+    
+    def save(self, *args, **kwargs):
+        """Ledger entries are never rewritten"""
+        if not self._state.adding:
+            raise ValueError('Stock movements are append-only.')
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def record(cls, movements, emit=True):
+        """
+        Write ledger entries in one INSERT (call inside the stock change's
+        transaction), bring the affected vehicles' low-stock alerts up to date
+        and publish their new stock to the change feed. Pass emit=False when
+        the vehicles were saved with save(), which publishes them itself.
+        """
+        movements = cls.objects.bulk_create(movements)
+        vehicles = {movement.vehicle for movement in movements}
+        LowStockAlert.sync(vehicles)
+        if emit:
+            Vehicle.emit_changes(vehicles)
+        return movements
+
+
+class StockSnapshot(models.Model):
+    """
+    Periodic per-vehicle stock balance derived from the ledger.
+    Stock at time T = latest snapshot before T + movements after it.
+    """
+    
+    id = models.BigAutoField(primary_key=True)
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='stock_snapshots'
+    )
+    stock_qty = models.IntegerField()
+    last_movement_id = models.BigIntegerField(
+        help_text='Last ledger entry included in this balance'
+    )
+    taken_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Stock Snapshot'
+        verbose_name_plural = 'Stock Snapshots'
+        ordering = ['-taken_at', '-id']
+        indexes = [
+            models.Index(fields=['vehicle', 'taken_at']),
+        ]
+    
+    def __str__(self):
+        return f"Vehicle #{self.vehicle_id}: {self.stock_qty} @ {self.taken_at:%Y-%m-%d %H:%M}"
+    
+    @classmethod
+    def take(cls, vehicle_ids=None):
+        """
+        Snapshot every vehicle with ledger activity since its last snapshot.
+        Returns the created snapshots.
+        """
+        now = timezone.now()
+        movements = StockMovement.objects.filter(created_at__lte=now)
+        if vehicle_ids is not None:
+            movements = movements.filter(vehicle_id__in=vehicle_ids)
+        
+        # Sum only the tail after each vehicle's most recent snapshot
+        last_snapshot = cls.objects.filter(
+            vehicle_id=OuterRef('vehicle_id')
+        ).order_by('-taken_at', '-id')
+        tails = movements.annotate(
+            snapshot_movement_id=Coalesce(Subquery(last_snapshot.values('last_movement_id')[:1]), 0),
+            snapshot_qty=Coalesce(Subquery(last_snapshot.values('stock_qty')[:1]), 0),
+        ).filter(
+            id__gt=F('snapshot_movement_id')
+        ).values('vehicle_id', 'snapshot_qty').annotate(
+            total=Sum('quantity'),
+            last_id=Max('id'),
+        ).order_by()
+        
+        return cls.objects.bulk_create([
+            cls(
+                vehicle_id=row['vehicle_id'],
+                stock_qty=row['snapshot_qty'] + row['total'],
+                last_movement_id=row['last_id'],
+                taken_at=now,
+            )
+            for row in tails
+        ])
+
+
+class LowStockAlert(models.Model):
+    """
+    Incrementally maintained set of vehicles at or below their low-stock
+    threshold. Resolved alerts are kept (inactive) so pollers see them clear.
+    """
+    
+    LEVEL_CHOICES = [
+        ('low', 'Low Stock'),
+        ('out', 'Out of Stock'),
+    ]
+    
+    vehicle = models.OneToOneField(
+        Vehicle,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stock_alert'
+    )
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    stock_qty = models.PositiveIntegerField()
+    threshold = models.PositiveIntegerField()
+    is_active = models.BooleanField(default=True)
+    raised_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Low Stock Alert'
+        verbose_name_plural = 'Low Stock Alerts'
+        ordering = ['stock_qty']
+        indexes = [
+            models.Index(fields=['is_active', 'level']),
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_level_display()}: vehicle #{self.vehicle_id} ({self.stock_qty})"
+    
+    @classmethod
+    def sync(cls, vehicles):
+        """Raise, update or resolve alerts for the given (saved) vehicles"""
+        vehicles = {vehicle.pk: vehicle for vehicle in vehicles}
+        if not vehicles:
+            return
+        
+        now = timezone.now()
+        existing = cls.objects.in_bulk(list(vehicles))
+        to_create, to_update = [], []
+        
+        for vehicle_id, vehicle in vehicles.items():
+            level = vehicle.stock_level
+            alert = existing.get(vehicle_id)
+            if alert is None:
+                if level:
+                    to_create.append(cls(
+                        vehicle_id=vehicle_id,
+                        level=level,
+                        stock_qty=vehicle.stock_qty,
+                        threshold=vehicle.low_stock_threshold,
+                        raised_at=now,
+                        updated_at=now,
+                    ))
+                continue
+            
+            state = (level or alert.level, vehicle.stock_qty, vehicle.low_stock_threshold, bool(level))
+            if state == (alert.level, alert.stock_qty, alert.threshold, alert.is_active):
+                continue
+            if level and not alert.is_active:
+                alert.raised_at = now
+            alert.level, alert.stock_qty, alert.threshold, alert.is_active = state
+            alert.updated_at = now
+            to_update.append(alert)
+        
+        if to_create:
+            cls.objects.bulk_create(to_create)
+        if to_update:
+            cls.objects.bulk_update(
+                to_update,
+                ['level', 'stock_qty', 'threshold', 'is_active', 'raised_at', 'updated_at']
+            )
+        
+        ChangeEvent.emit_many('stock_alert', [
+            (alert.vehicle_id, op, {'level': alert.level, 'stock_qty': alert.stock_qty, 'is_active': alert.is_active})
+            for op, alerts in (('create', to_create), ('update', to_update))
+            for alert in alerts
+        ])
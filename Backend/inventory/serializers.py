@@ -2,7 +2,8 @@
 Serializers for inventory app
 """
 from rest_framework import serializers
-from .models import Vehicle
+from config.fieldsets import SparseFieldsetSerializerMixin
+from .models import Vehicle, StockMovement, LowStockAlert
 
 
 class VehicleSerializer(serializers.ModelSerializer):
@@ -13,8 +14,8 @@ class VehicleSerializer(serializers.ModelSerializer):
         model = Vehicle
         fields = [
             'id', 'brand', 'model', 'price', 'stock_qty',
-            'description', 'image', 'is_in_stock', 'is_active',
-            'created_at', 'updated_at'
+            'low_stock_threshold', 'description', 'image', 'is_in_stock',
+            'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
@@ -37,7 +38,7 @@ class VehicleCreateSerializer(serializers.ModelSerializer):
         model = Vehicle
         fields = [
             'id', 'brand', 'model', 'price', 'stock_qty',
-            'description', 'image', 'is_active'
+            'low_stock_threshold', 'description', 'image', 'is_active'
         ]
         read_only_fields = ['id']
     
@@ -59,15 +60,54 @@ class VehicleCreateSerializer(serializers.ModelSerializer):
                 })
         
         return attrs
+    
+    def create(self, validated_data):
+        """Create the vehicle; its opening stock movement is credited to the requesting user"""
+        vehicle = Vehicle(**validated_data)
+        request = self.context.get('request')
+        vehicle._stock_changed_by = request.user if request else None
+        vehicle.save()
+        return vehicle
 
 
-class VehicleListSerializer(serializers.ModelSerializer):
+class VehicleListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Lightweight serializer for vehicle listing"""
     is_in_stock = serializers.BooleanField(read_only=True)
     
+    sparse_sources = {
+        'is_in_stock': ('stock_qty',),
+    }
+    
     class Meta:
         model = Vehicle
         fields = [
             'id', 'brand', 'model', 'price', 'stock_qty',
             'description', 'is_in_stock', 'is_active', 'image'
         ]
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    """Serializer for stock ledger entries"""
+    reason_display = serializers.CharField(source='get_reason_display', read_only=True)
+    
+    class Meta:
+        model = StockMovement
+        fields = [
+            'id', 'vehicle', 'quantity', 'reason', 'reason_display',
+            'reference', 'created_by', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class LowStockAlertSerializer(serializers.ModelSerializer):
+    """Serializer for low-stock alerts"""
+    brand = serializers.CharField(source='vehicle.brand', read_only=True)
+    model = serializers.CharField(source='vehicle.model', read_only=True)
+    
+    class Meta:
+        model = LowStockAlert
+        fields = [
+            'vehicle', 'brand', 'model', 'level', 'stock_qty',
+            'threshold', 'is_active', 'raised_at', 'updated_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,76 @@
+"""
+Tests for inventory app
+"""
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from changes.models import ChangeEvent
+from .models import LowStockAlert, StockMovement, Vehicle
+
+
+class StockLedgerTests(TestCase):
+    """stock_at() adds up to stock_qty however the vehicle was created"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password=None, name='Admin',
+            mobile='8000000000', role='admin', is_verified=True,
+        )
+
+    def create(self, stock_qty, **fields):
+        return Vehicle.objects.create(
+            brand='Hero', model='Splendor', price=Decimal('75000'), stock_qty=stock_qty, **fields
+        )
+
+    def test_create_writes_the_opening_movement(self):
+        vehicle = self.create(5)
+
+        self.assertEqual(vehicle.stock_at(timezone.now()), 5)
+        movement = vehicle.stock_movements.get()
+        self.assertEqual((movement.reason, movement.quantity), ('initial', 5))
+
+    def test_edit_after_create(self):
+        vehicle = self.create(5)
+
+        vehicle.stock_qty = 3
+        vehicle.save()
+        vehicle.log_stock_adjustment(5)
+        vehicle.reduce_stock(1)
+
+        self.assertEqual(vehicle.stock_at(timezone.now()), 2)
+
+    def test_create_without_stock_raises_an_alert(self):
+        vehicle = self.create(0)
+
+        self.assertFalse(vehicle.stock_movements.exists())
+        self.assertEqual(vehicle.stock_at(timezone.now()), 0)
+        self.assertEqual(LowStockAlert.objects.get(vehicle=vehicle).level, 'out')
+
+    def test_api_create_credits_the_admin(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.post('/api/inventory/vehicles/', {
+            'brand': 'Honda', 'model': 'Shine', 'price': '82000.00', 'stock_qty': 4,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        movement = StockMovement.objects.get(vehicle_id=response.data['id'])
+        self.assertEqual((movement.reason, movement.quantity, movement.created_by), ('initial', 4, self.admin))
+
+    def test_api_stock_edit_emits_one_vehicle_event(self):
+        vehicle = self.create(5)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.patch(f'/api/inventory/vehicles/{vehicle.id}/', {'stock_qty': 2}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        events = ChangeEvent.objects.filter(entity='vehicle', entity_id=vehicle.id, op='update')
+        self.assertEqual([event.data['stock_qty'] for event in events], [2])
+        self.assertEqual(vehicle.stock_at(timezone.now()), 2)
@@ -3,10 +3,11 @@ URLs for inventory app
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VehicleViewSet
+from .views import VehicleViewSet, LowStockAlertViewSet
 
 router = DefaultRouter()
 router.register(r'vehicles', VehicleViewSet, basename='vehicle')
+router.register(r'alerts', LowStockAlertViewSet, basename='stock-alert')
 
 urlpatterns = [
     path('', include(router.urls)),
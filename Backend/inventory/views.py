@@ -6,28 +6,45 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
+import time
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import Vehicle
-from .serializers import VehicleSerializer, VehicleCreateSerializer, VehicleListSerializer
+from .models import Vehicle, StockMovement, LowStockAlert
+from .serializers import (
+    VehicleSerializer,
+    VehicleCreateSerializer,
+    VehicleListSerializer,
+    StockMovementSerializer,
+    LowStockAlertSerializer
+)
 from accounts.permissions import IsAdmin, IsAdminOrReadOnly
+from config.fieldsets import SparseFieldsetViewMixin
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for Vehicle management
     
-    GET /api/inventory/vehicles/ - List all vehicles (Public)
+    GET /api/inventory/vehicles/ - List all vehicles (Public, supports ?fields=/?omit=)
     GET /api/inventory/vehicles/{id}/ - Get vehicle details (Public)
     POST /api/inventory/vehicles/ - Create vehicle (Admin only)
     PUT /api/inventory/vehicles/{id}/ - Update vehicle (Admin only)
     PATCH /api/inventory/vehicles/{id}/ - Partial update (Admin only)
     DELETE /api/inventory/vehicles/{id}/ - Delete vehicle (Admin only)
+    GET /api/inventory/vehicles/{id}/stock_history/ - Stock ledger (Admin only)
+    GET /api/inventory/vehicles/{id}/stock_at/?at= - Stock at a point in time (Admin only)
     """
     queryset = Vehicle.objects.all()
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['brand']
     search_fields = ['brand', 'model', 'description']
+    # Query budgets (config.middleware)
+    query_budget = {'list': 5, 'retrieve': 3}
     ordering_fields = ['price', 'created_at', 'stock_qty']
     ordering = ['-created_at']
     
@@ -58,7 +75,14 @@ class VehicleViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
             
-        return queryset
+        return self.sparse_queryset(queryset)
+    
+    def perform_update(self, serializer):
+        """Update vehicle and log any direct stock edit"""
+        previous_qty = serializer.instance.stock_qty
+        with transaction.atomic():
+            vehicle = serializer.save()
+            vehicle.log_stock_adjustment(previous_qty, user=self.request.user)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin])
     def update_stock(self, request, pk=None):
@@ -85,7 +109,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         if action_type == 'reduce':
-            if vehicle.reduce_stock(quantity):
+            if vehicle.reduce_stock(quantity, user=request.user):
                 return Response({
                     'message': f'Stock reduced by {quantity}.',
                     'vehicle': VehicleSerializer(vehicle).data
@@ -95,12 +119,57 @@ class VehicleViewSet(viewsets.ModelViewSet):
                     'error': 'Insufficient stock.'
                 }, status=status.HTTP_400_BAD_REQUEST)
         else:
-            vehicle.add_stock(quantity)
+            vehicle.add_stock(quantity, user=request.user)
             return Response({
                 'message': f'Stock increased by {quantity}.',
                 'vehicle': VehicleSerializer(vehicle).data
             }, status=status.HTTP_200_OK)
     
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsAdmin])
+    def stock_history(self, request, pk=None):
+        """
+        GET /api/inventory/vehicles/{id}/stock_history/
+        Stock ledger for a vehicle, newest first (Admin only)
+        """
+        vehicle = self.get_object()
+        movements = StockMovement.objects.filter(vehicle=vehicle)
+        
+        page = self.paginate_queryset(movements)
+        if page is not None:
+            serializer = StockMovementSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = StockMovementSerializer(movements, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsAdmin])
+    def stock_at(self, request, pk=None):
+        """
+        GET /api/inventory/vehicles/{id}/stock_at/?at=2026-01-31T18:00:00Z
+        Stock quantity at a point in time (Admin only)
+        """
+        vehicle = self.get_object()
+        at = request.query_params.get('at')
+        
+        try:
+            when = parse_datetime(at) if at else timezone.now()
+        except ValueError:
+            # Well formed but out of range, e.g. month 13
+            when = None
+        if when is None:
+            return Response({
+                'error': 'Invalid at format. Use an ISO 8601 datetime.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        
+        return Response({
+            'vehicle': vehicle.id,
+            'at': when,
+            'stock_qty': vehicle.stock_at(when),
+            'current_stock_qty': vehicle.stock_qty,
+        }, status=status.HTTP_200_OK)
+    
     def destroy(self, request, *args, **kwargs):
         """Hard delete - completely remove vehicle from database"""
         vehicle = self.get_object()
@@ -108,3 +177,77 @@ class VehicleViewSet(viewsets.ModelViewSet):
         return Response({
             'message': 'Vehicle deleted successfully.'
         }, status=status.HTTP_204_NO_CONTENT)
+
+
+class LowStockAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for low-stock alerts (Admin only)
+    
+    GET /api/inventory/alerts/ - Active low/out-of-stock alerts
+    GET /api/inventory/alerts/{vehicle_id}/ - Alert for a vehicle
+    GET /api/inventory/alerts/poll/?since=&timeout= - Long-poll for alert changes
+    """
+    serializer_class = LowStockAlertSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['level']
+    
+    # Each waiting poll holds a worker, so the wait is kept short; the
+    # stock_alert events of /api/changes/stream/ push without holding one
+    POLL_INTERVAL = 1
+    MAX_POLL_TIMEOUT = 5
+    # Alerts from a transaction that commits late carry an updated_at just
+    # before the cursor; every response repeats this window to pick them up
+    CURSOR_OVERLAP = timedelta(seconds=2)
+    
+    def get_queryset(self):
+        """Active alerts; pass ?include_resolved=true for the full set"""
+        queryset = LowStockAlert.objects.select_related('vehicle')
+        if self.request.query_params.get('include_resolved') != 'true':
+            queryset = queryset.filter(is_active=True)
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def poll(self, request):
+        """
+        GET /api/inventory/alerts/poll/?since=<cursor>&timeout=5
+        Wait until alerts change after `since`, then return the changed
+        alerts (including resolved ones) and a new cursor. Alerts changed
+        shortly before `since` are sent again; apply them by vehicle.
+        Without `since` the current active alerts are returned at once.
+        """
+        since = request.query_params.get('since')
+        try:
+            timeout = min(float(request.query_params.get('timeout', self.MAX_POLL_TIMEOUT)), self.MAX_POLL_TIMEOUT)
+        except ValueError:
+            return Response({
+                'error': 'Invalid timeout. Must be a number of seconds.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        alerts = LowStockAlert.objects.select_related('vehicle')
+        if not since:
+            changed = alerts.filter(is_active=True)
+            cursor = LowStockAlert.objects.aggregate(latest=Max('updated_at'))['latest']
+        else:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({
+                    'error': 'Invalid since cursor.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            deadline = time.monotonic() + timeout
+            changes = alerts.filter(updated_at__gt=since)
+            while not changes.exists() and time.monotonic() < deadline:
+                time.sleep(self.POLL_INTERVAL)
+            changed = list(
+                alerts.filter(updated_at__gt=since - self.CURSOR_OVERLAP).order_by('updated_at', 'vehicle_id')
+            )
+            cursor = max(changed[-1].updated_at, since) if changed else since
+        
+        return Response({
+            'cursor': cursor,
+            'results': LowStockAlertSerializer(changed, many=True).data,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,44 @@
+"""
+Move closed sales and service requests into the archive tables.
+
+Run from cron (e.g. nightly); each batch is its own transaction so the
+hot tables are never locked for long:
+
+    python manage.py archive_records
+    python manage.py archive_records --older-than 180 --batch-size 1000
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sales.models import ArchivedSale
+from service.models import ArchivedServiceRequest
+
+
+class Command(BaseCommand):
+    help = 'Archive verified/cancelled sales and completed/cancelled service requests older than N days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help='Age in days (default: ARCHIVE_AFTER_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+            help='Rows moved per transaction (default: ARCHIVE_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        for archive_model in (ArchivedSale, ArchivedServiceRequest):
+            moved = archive_model.archive(cutoff=cutoff, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {moved} {archive_model.source_model()._meta.verbose_name_plural.lower()} '
+                f'older than {cutoff:%Y-%m-%d}.'
+            ))
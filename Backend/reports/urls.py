@@ -6,6 +6,7 @@ from .views import (
     sales_report,
     inventory_report,
     service_report,
+    service_dwell_report,
     dashboard_summary
 )
 
@@ -13,5 +14,6 @@ urlpatterns = [
     path('sales/', sales_report, name='sales-report'),
     path('inventory/', inventory_report, name='inventory-report'),
     path('service/', service_report, name='service-report'),
+    path('service/dwell/', service_dwell_report, name='service-dwell-report'),
     path('dashboard/', dashboard_summary, name='dashboard-summary'),
 ]
@@ -5,14 +5,22 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Count, Avg, Q, F
 from django.utils import timezone
 from datetime import timedelta, datetime
 
 from accounts.permissions import IsAdmin
-from sales.models import Sale
-from inventory.models import Vehicle
-from service.models import ServiceRequest
+from config.archive import merge_grouped
+from sales.models import Sale, ArchivedSale
+from inventory.models import Vehicle, LowStockAlert
+from service.models import ServiceRequest, ArchivedServiceRequest, ServiceStatusTransition
+
+
+def _aware(value):
+    """Report dates are parsed naive; compare them in the current timezone"""
+    if value is None or timezone.is_aware(value):
+        return value
+    return timezone.make_aware(value)
 
 
 @api_view(['GET'])
@@ -31,13 +39,13 @@ def sales_report(request):
     end_date = request.query_params.get('end_date')
     status_filter = request.query_params.get('status')
     
-    queryset = Sale.objects.select_related('customer', 'vehicle').all()
+    filters = {}
     
     # Filter by date range
     if start_date:
         try:
             start_date = datetime.strptime(start_date, '%Y-%m-%d')
-            queryset = queryset.filter(date__gte=start_date)
+            filters['date__gte'] = start_date
         except ValueError:
             return Response({
                 'error': 'Invalid start_date format. Use YYYY-MM-DD.'
@@ -48,7 +56,7 @@ def sales_report(request):
             end_date = datetime.strptime(end_date, '%Y-%m-%d')
             # Include the entire end date
             end_date = end_date + timedelta(days=1)
-            queryset = queryset.filter(date__lt=end_date)
+            filters['date__lt'] = end_date
         except ValueError:
             return Response({
                 'error': 'Invalid end_date format. Use YYYY-MM-DD.'
@@ -56,39 +64,57 @@ def sales_report(request):
     
     # Filter by status
     if status_filter:
-        queryset = queryset.filter(status=status_filter)
+        filters['status'] = status_filter
     
-    # Calculate statistics
-    total_sales = queryset.count()
-    verified_sales = queryset.filter(status='verified').count()
-    pending_sales = queryset.filter(status='pending').count()
-    cancelled_sales = queryset.filter(status='cancelled').count()
+    # Old closed sales live in the archive; only read it when the range reaches it
+    querysets = [Sale.objects.filter(**filters)]
+    if ArchivedSale.reaches(_aware(start_date), status_filter):
+        querysets.append(ArchivedSale.objects.filter(**filters))
     
-    total_revenue = queryset.filter(status='verified').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    # Sales by status
+    sales_by_status = merge_grouped(
+        [
+            queryset.values('status').annotate(
+                count=Count('id'),
+                total_amount=Sum('amount'),
+                total_quantity=Sum('quantity')
+            ).order_by()
+            for queryset in querysets
+        ],
+        keys=['status'],
+        sums=['count', 'total_amount', 'total_quantity']
+    )
+    by_status = {row['status']: row for row in sales_by_status}
+    verified = by_status.get('verified', {})
     
-    total_quantity = queryset.filter(status='verified').aggregate(
-        total=Sum('quantity')
-    )['total'] or 0
+    # Calculate statistics
+    total_sales = sum(row['count'] for row in sales_by_status)
+    verified_sales = verified.get('count', 0)
+    pending_sales = by_status.get('pending', {}).get('count', 0)
+    cancelled_sales = by_status.get('cancelled', {}).get('count', 0)
     
-    average_sale_amount = queryset.filter(status='verified').aggregate(
-        avg=Avg('amount')
-    )['avg'] or 0
+    total_revenue = verified.get('total_amount') or 0
+    total_quantity = verified.get('total_quantity') or 0
+    average_sale_amount = total_revenue / verified_sales if verified_sales else 0
     
     # Top selling vehicles
-    top_vehicles = queryset.filter(status='verified').values(
-        'vehicle__brand', 'vehicle__model'
-    ).annotate(
-        total_sold=Sum('quantity'),
-        total_revenue=Sum('amount')
-    ).order_by('-total_sold')[:10]
-    
-    # Sales by status
-    sales_by_status = queryset.values('status').annotate(
-        count=Count('id'),
-        total_amount=Sum('amount')
+    top_vehicles = merge_grouped(
+        [
+            queryset.filter(status='verified').values(
+                'vehicle__brand', 'vehicle__model'
+            ).annotate(
+                total_sold=Sum('quantity'),
+                total_revenue=Sum('amount')
+            ).order_by()
+            for queryset in querysets
+        ],
+        keys=['vehicle__brand', 'vehicle__model'],
+        sums=['total_sold', 'total_revenue']
     )
+    top_vehicles = sorted(top_vehicles, key=lambda row: -row['total_sold'])[:10]
+    
+    for row in sales_by_status:
+        del row['total_quantity']
     
     return Response({
         'period': {
@@ -104,8 +130,8 @@ def sales_report(request):
             'total_quantity_sold': total_quantity,
             'average_sale_amount': float(average_sale_amount),
         },
-        'top_vehicles': list(top_vehicles),
-        'sales_by_status': list(sales_by_status),
+        'top_vehicles': top_vehicles,
+        'sales_by_status': sales_by_status,
     }, status=status.HTTP_200_OK)
 
 
@@ -117,10 +143,12 @@ def inventory_report(request):
     Generate inventory report (Admin only)
     
     Query Parameters:
-    - low_stock: Filter vehicles with stock below threshold (default: 10)
+    - low_stock: Filter vehicles with stock below threshold
+      (default: each vehicle's low_stock_threshold, read from the alert set)
     - brand: Filter by brand
     """
-    low_stock_threshold = int(request.query_params.get('low_stock', 10))
+    low_stock_param = request.query_params.get('low_stock')
+    low_stock_threshold = int(low_stock_param or 10)
     brand_filter = request.query_params.get('brand')
     
     queryset = Vehicle.objects.all()
@@ -132,11 +160,37 @@ def inventory_report(request):
     total_vehicles = queryset.count()
     active_vehicles = queryset.filter(is_active=True).count()
     in_stock_vehicles = queryset.filter(stock_qty__gt=0).count()
-    low_stock_vehicles = queryset.filter(
-        stock_qty__gt=0,
-        stock_qty__lte=low_stock_threshold
-    ).count()
-    out_of_stock_vehicles = queryset.filter(stock_qty=0).count()
+    
+    if low_stock_param is None and not brand_filter:
+        # Default view: read the maintained alert set (per-vehicle thresholds)
+        alerts = LowStockAlert.objects.filter(is_active=True)
+        low_stock_list = alerts.filter(level='low').values(
+            'stock_qty',
+            id=F('vehicle_id'),
+            brand=F('vehicle__brand'),
+            model=F('vehicle__model'),
+            price=F('vehicle__price'),
+        ).order_by('stock_qty')
+        out_of_stock_list = alerts.filter(level='out').values(
+            id=F('vehicle_id'),
+            brand=F('vehicle__brand'),
+            model=F('vehicle__model'),
+            price=F('vehicle__price'),
+        )
+    else:
+        # Low stock vehicles
+        low_stock_list = queryset.filter(
+            stock_qty__gt=0,
+            stock_qty__lte=low_stock_threshold
+        ).values('id', 'brand', 'model', 'stock_qty', 'price').order_by('stock_qty')
+        
+        # Out of stock vehicles
+        out_of_stock_list = queryset.filter(stock_qty=0).values(
+            'id', 'brand', 'model', 'price'
+        )
+    
+    low_stock_vehicles = low_stock_list.count()
+    out_of_stock_vehicles = out_of_stock_list.count()
     
     total_stock_value = queryset.aggregate(
         total=Sum('price') * Sum('stock_qty')
@@ -152,17 +206,6 @@ def inventory_report(request):
         avg_price=Avg('price')
     ).order_by('-total_stock')
     
-    # Low stock vehicles
-    low_stock_list = queryset.filter(
-        stock_qty__gt=0,
-        stock_qty__lte=low_stock_threshold
-    ).values('id', 'brand', 'model', 'stock_qty', 'price').order_by('stock_qty')
-    
-    # Out of stock vehicles
-    out_of_stock_list = queryset.filter(stock_qty=0).values(
-        'id', 'brand', 'model', 'price'
-    )
-    
     return Response({
         'summary': {
             'total_vehicles': total_vehicles,
@@ -194,13 +237,13 @@ def service_report(request):
     end_date = request.query_params.get('end_date')
     status_filter = request.query_params.get('status')
     
-    queryset = ServiceRequest.objects.select_related('customer', 'vehicle').all()
+    filters = {}
     
     # Filter by date range
     if start_date:
         try:
             start_date = datetime.strptime(start_date, '%Y-%m-%d')
-            queryset = queryset.filter(date__gte=start_date)
+            filters['date__gte'] = start_date
         except ValueError:
             return Response({
                 'error': 'Invalid start_date format. Use YYYY-MM-DD.'
@@ -210,7 +253,7 @@ def service_report(request):
         try:
             end_date = datetime.strptime(end_date, '%Y-%m-%d')
             end_date = end_date + timedelta(days=1)
-            queryset = queryset.filter(date__lt=end_date)
+            filters['date__lt'] = end_date
         except ValueError:
             return Response({
                 'error': 'Invalid end_date format. Use YYYY-MM-DD.'
@@ -218,34 +261,51 @@ def service_report(request):
     
     # Filter by status
     if status_filter:
-        queryset = queryset.filter(status=status_filter)
+        filters['status'] = status_filter
     
-    # Calculate statistics
-    total_requests = queryset.count()
-    pending_requests = queryset.filter(status='pending').count()
-    in_progress_requests = queryset.filter(status='in_progress').count()
-    completed_requests = queryset.filter(status='completed').count()
-    cancelled_requests = queryset.filter(status='cancelled').count()
-    
-    total_revenue = queryset.filter(status='completed').aggregate(
-        total=Sum('cost')
-    )['total'] or 0
-    
-    average_cost = queryset.filter(status='completed').aggregate(
-        avg=Avg('cost')
-    )['avg'] or 0
+    # Old closed requests live in the archive; only read it when the range reaches it
+    querysets = [ServiceRequest.objects.filter(**filters)]
+    if ArchivedServiceRequest.reaches(_aware(start_date), status_filter):
+        querysets.append(ArchivedServiceRequest.objects.filter(**filters))
     
     # Services by status
-    services_by_status = queryset.values('status').annotate(
-        count=Count('id'),
-        total_revenue=Sum('cost')
+    services_by_status = merge_grouped(
+        [
+            queryset.values('status').annotate(
+                count=Count('id'),
+                total_revenue=Sum('cost')
+            ).order_by()
+            for queryset in querysets
+        ],
+        keys=['status'],
+        sums=['count', 'total_revenue']
     )
+    by_status = {row['status']: row for row in services_by_status}
+    completed = by_status.get('completed', {})
+    
+    # Calculate statistics
+    total_requests = sum(row['count'] for row in services_by_status)
+    pending_requests = by_status.get('pending', {}).get('count', 0)
+    in_progress_requests = by_status.get('in_progress', {}).get('count', 0)
+    completed_requests = completed.get('count', 0)
+    cancelled_requests = by_status.get('cancelled', {}).get('count', 0)
+    
+    total_revenue = completed.get('total_revenue') or 0
+    average_cost = total_revenue / completed_requests if completed_requests else 0
     
     # Services by vehicle brand
-    services_by_brand = queryset.values('vehicle__brand').annotate(
-        count=Count('id'),
-        total_revenue=Sum('cost')
-    ).order_by('-count')
+    services_by_brand = merge_grouped(
+        [
+            queryset.values('vehicle__brand').annotate(
+                count=Count('id'),
+                total_revenue=Sum('cost')
+            ).order_by()
+            for queryset in querysets
+        ],
+        keys=['vehicle__brand'],
+        sums=['count', 'total_revenue']
+    )
+    services_by_brand.sort(key=lambda row: -row['count'])
     
     return Response({
         'period': {
@@ -261,8 +321,52 @@ def service_report(request):
             'total_revenue': float(total_revenue),
             'average_cost': float(average_cost),
         },
-        'services_by_status': list(services_by_status),
-        'services_by_brand': list(services_by_brand),
+        'services_by_status': services_by_status,
+        'services_by_brand': services_by_brand,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def service_dwell_report(request):
+    """
+    GET /api/reports/service/dwell/
+    Time service requests spend in each status (Admin only)
+    
+    Query Parameters:
+    - start_date: Count stays entered on or after this date (YYYY-MM-DD)
+    - end_date: Count stays entered up to this date (YYYY-MM-DD)
+    """
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
+    
+    if start_date:
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d')
+        except ValueError:
+            return Response({
+                'error': 'Invalid start_date format. Use YYYY-MM-DD.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if end_date:
+        try:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return Response({
+                'error': 'Invalid end_date format. Use YYYY-MM-DD.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    by_status = ServiceStatusTransition.dwell_stats(
+        _aware(start_date),
+        _aware(end_date + timedelta(days=1)) if end_date else None
+    )
+    
+    return Response({
+        'period': {
+            'start_date': start_date.strftime('%Y-%m-%d') if start_date else None,
+            'end_date': end_date.strftime('%Y-%m-%d') if end_date else None,
+        },
+        'by_status': by_status,
     }, status=status.HTTP_200_OK)
 
 
@@ -276,32 +380,44 @@ def dashboard_summary(request):
     # Sales metrics (last 30 days)
     thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    recent_sales = Sale.objects.filter(
-        date__gte=thirty_days_ago,
-        status='verified'
-    )
-    sales_count = recent_sales.count()
-    sales_revenue = recent_sales.aggregate(total=Sum('amount'))['total'] or 0
+    sales_models = [Sale]
+    if ArchivedSale.reaches(thirty_days_ago):
+        sales_models.append(ArchivedSale)
+    sales_count, sales_revenue = 0, 0
+    for model in sales_models:
+        recent_sales = model.objects.filter(
+            date__gte=thirty_days_ago,
+            status='verified'
+        ).aggregate(count=Count('id'), total=Sum('amount'))
+        sales_count += recent_sales['count']
+        sales_revenue += recent_sales['total'] or 0
     
     # Inventory metrics
     total_vehicles = Vehicle.objects.filter(is_active=True).count()
-    low_stock_count = Vehicle.objects.filter(
+    alert_counts = LowStockAlert.objects.filter(
         is_active=True,
-        stock_qty__gt=0,
-        stock_qty__lte=10
-    ).count()
-    out_of_stock_count = Vehicle.objects.filter(
-        is_active=True,
-        stock_qty=0
-    ).count()
+        vehicle__is_active=True
+    ).aggregate(
+        low=Count('vehicle', filter=Q(level='low')),
+        out=Count('vehicle', filter=Q(level='out')),
+    )
+    low_stock_count = alert_counts['low']
+    out_of_stock_count = alert_counts['out']
     
     # Service metrics (last 30 days)
     recent_services = ServiceRequest.objects.filter(date__gte=thirty_days_ago)
     pending_services = recent_services.filter(status='pending').count()
-    completed_services = recent_services.filter(status='completed').count()
-    service_revenue = recent_services.filter(
-        status='completed'
-    ).aggregate(total=Sum('cost'))['total'] or 0
+    service_models = [ServiceRequest]
+    if ArchivedServiceRequest.reaches(thirty_days_ago):
+        service_models.append(ArchivedServiceRequest)
+    completed_services, service_revenue = 0, 0
+    for model in service_models:
+        completed = model.objects.filter(
+            date__gte=thirty_days_ago,
+            status='completed'
+        ).aggregate(count=Count('id'), total=Sum('cost'))
+        completed_services += completed['count']
+        service_revenue += completed['total'] or 0
     
     # Customer metrics
     from accounts.models import User
@@ -2,7 +2,7 @@
 Admin configuration for sales app
 """
 from django.contrib import admin
-from .models import Sale
+from .models import Sale, ArchivedSale, ServiceEligibility
 
 
 @admin.register(Sale)
@@ -34,3 +34,32 @@ class SaleAdmin(admin.ModelAdmin):
         if obj and obj.status == 'verified':
             return ['customer', 'vehicle', 'amount', 'quantity', 'date', 'verified_at', 'verified_by']
         return self.readonly_fields
+
+
+@admin.register(ArchivedSale)
+class ArchivedSaleAdmin(admin.ModelAdmin):
+    """Read-only admin interface for archived sales"""
+    list_display = ['id', 'customer', 'vehicle', 'amount', 'quantity', 'status', 'date', 'verified_by', 'archived_at']
+    list_filter = ['status', 'date', 'archived_at']
+    search_fields = ['customer__name', 'customer__email', 'vehicle__brand', 'vehicle__model']
+    ordering = ['-date']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ServiceEligibility)
+class ServiceEligibilityAdmin(admin.ModelAdmin):
+    """Read-only admin interface for per-customer service eligibility"""
+    list_display = ['customer', 'vehicle', 'verified_sales']
+    search_fields = ['customer__name', 'customer__email', 'vehicle__brand', 'vehicle__model']
+    list_select_related = ['customer', 'vehicle']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
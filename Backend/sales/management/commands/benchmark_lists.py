@@ -0,0 +1,124 @@
+"""
+Compare the fast row-builder list path against the serializers.
+
+Seeds a throwaway test database, renders the sale and service request
+list endpoints both ways, checks the JSON is byte-for-byte identical and
+reports the timings. The equivalence itself is tested in sales/tests.py;
+this checks it again at benchmark volumes:
+
+    python manage.py benchmark_lists --rows 2000
+"""
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from inventory.models import Vehicle
+from sales.models import Sale
+from sales.views import SaleViewSet
+from service.models import ServiceRequest
+from service.views import ServiceRequestViewSet
+
+
+class Command(BaseCommand):
+    help = 'Check the fast list path matches the serializers and measure the speedup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Sales and service requests to seed')
+        parser.add_argument('--page-size', type=int, default=100, help='Keyset page size for my_purchases')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed renders per endpoint')
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options['rows'])
+            self.compare(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, rows):
+        self.admin = User.objects.create_user(
+            email='bench-admin@example.com', password=None, name='Bench Admin',
+            mobile='8000000000', role='admin', is_verified=True,
+        )
+        self.customer = User.objects.create_user(
+            email='bench-customer@example.com', password=None, name='Bench Customer',
+            mobile='7000000000', is_verified=True,
+        )
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                brand='Bench', model=f'Model {i}', price=Decimal('54999.50'),
+                stock_qty=i % 3, description='Seeded for benchmarking',
+                image=f'vehicles/model-{i}.jpg' if i % 2 else None,
+            )
+            for i in range(10)
+        ])
+        now = timezone.now()
+        Sale.objects.bulk_create([
+            Sale(
+                customer=self.customer,
+                vehicle=vehicles[i % len(vehicles)],
+                amount=Decimal('54999.50'),
+                quantity=1 + i % 2,
+                status=('pending', 'verified', 'cancelled')[i % 3],
+                verified_at=now if i % 3 == 1 else None,
+                verified_by=self.admin if i % 3 == 1 else None,
+                notes='Paid in cash' if i % 5 == 0 else None,
+            )
+            for i in range(rows)
+        ])
+        ServiceRequest.objects.bulk_create([
+            ServiceRequest(
+                customer=self.customer,
+                vehicle=vehicles[i % len(vehicles)],
+                description='General service',
+                status=('pending', 'in_progress', 'completed', 'cancelled')[i % 4],
+                cost=Decimal('1250.00') * (i % 4),
+                scheduled_date=now if i % 2 else None,
+                completed_date=now if i % 4 == 2 else None,
+                assigned_to=self.admin if i % 4 in (1, 2) else None,
+            )
+            for i in range(rows)
+        ])
+
+    def render(self, viewset, action, user, params, fast):
+        factory = APIRequestFactory()
+        view = viewset.as_view({'get': action}, throttle_classes=[])
+        request = factory.get('/', params)
+        force_authenticate(request, user=user)
+        with override_settings(FAST_LIST_RENDERING=fast):
+            response = view(request)
+        return JSONRenderer().render(response.data)
+
+    def compare(self, options):
+        cases = [
+            ('sales list', SaleViewSet, 'list', self.admin, {}),
+            ('sales list ?fields=', SaleViewSet, 'list', self.admin, {'fields': 'id,status,amount,customer_details'}),
+            ('my_purchases', SaleViewSet, 'my_purchases', self.customer, {'limit': options['page_size']}),
+            ('service list', ServiceRequestViewSet, 'list', self.admin, {}),
+            ('my_services', ServiceRequestViewSet, 'my_services', self.customer, {}),
+        ]
+        for label, viewset, action, user, params in cases:
+            slow = self.render(viewset, action, user, params, fast=False)
+            fast = self.render(viewset, action, user, params, fast=True)
+            if slow != fast:
+                raise CommandError(f'{label}: fast output differs from the serializer output')
+
+            timings = {}
+            for mode in (False, True):
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    self.render(viewset, action, user, params, fast=mode)
+                timings[mode] = (time.perf_counter() - started) / options['repeat']
+
+            self.stdout.write(
+                f'{label:<22} identical ({len(fast)} bytes)  '
+                f'serializer={timings[False] * 1000:.1f}ms  fast={timings[True] * 1000:.1f}ms  '
+                f'speedup={timings[False] / timings[True]:.1f}x'
+            )
@@ -0,0 +1,134 @@
+"""
+Benchmark sale verification under concurrent admins.
+
+Runs against a throwaway test database, never the configured one:
+
+    python manage.py benchmark_verify --sales 2000 --admins 8
+"""
+import os
+import queue
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from inventory.models import Vehicle
+from sales.models import Sale
+from sales.views import SaleViewSet
+
+
+class Command(BaseCommand):
+    help = 'Measure verifies/sec for PATCH /sales/{id}/verify/ with concurrent admins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=1000, help='Pending sales to verify')
+        parser.add_argument('--admins', type=int, default=4, help='Concurrent admin threads')
+        parser.add_argument('--vehicles', type=int, default=5, help='Vehicles the sales are spread over')
+
+    def handle(self, *args, **options):
+        test_db = None
+        if connection.vendor == 'sqlite':
+            # A file database so every admin thread sees the same data
+            fd, test_db = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = test_db
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run_benchmark(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if test_db and os.path.exists(test_db):
+                os.remove(test_db)
+
+    def run_benchmark(self, options):
+        admins = [
+            User.objects.create_user(
+                email=f'bench-admin{i}@example.com',
+                password=None,
+                name=f'Bench Admin {i}',
+                mobile=f'80000{i:05d}',
+                role='admin',
+                is_verified=True,
+            )
+            for i in range(options['admins'])
+        ]
+        customer = User.objects.create_user(
+            email='bench-customer@example.com',
+            password=None,
+            name='Bench Customer',
+            mobile='7000000000',
+            is_verified=True,
+        )
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(brand='Bench', model=f'Model {i}', price=Decimal('50000.00'), stock_qty=options['sales'])
+            for i in range(options['vehicles'])
+        ])
+        sales = Sale.objects.bulk_create([
+            Sale(customer=customer, vehicle=vehicles[i % len(vehicles)], amount=Decimal('50000.00'))
+            for i in range(options['sales'])
+        ])
+
+        work = queue.Queue()
+        for sale in sales:
+            work.put(sale.id)
+
+        view = SaleViewSet.as_view({'patch': 'verify'}, throttle_classes=[])
+        factory = APIRequestFactory()
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+
+        def admin_worker(admin):
+            local = []
+            try:
+                while True:
+                    try:
+                        sale_id = work.get_nowait()
+                    except queue.Empty:
+                        break
+                    request = factory.patch(f'/api/sales/sales/{sale_id}/verify/')
+                    force_authenticate(request, user=admin)
+                    started = time.perf_counter()
+                    response = view(request, pk=sale_id)
+                    local.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        with lock:
+                            failures.append((sale_id, response.status_code))
+            finally:
+                connections.close_all()
+                with lock:
+                    latencies.extend(local)
+
+        threads = [threading.Thread(target=admin_worker, args=(admin,)) for admin in admins]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        verified = Sale.objects.filter(status='verified').count()
+        stock_left = sum(Vehicle.objects.values_list('stock_qty', flat=True))
+        expected_stock = options['sales'] * len(vehicles) - verified
+
+        self.stdout.write(f'admins={len(admins)} sales={len(sales)} elapsed={elapsed:.2f}s')
+        self.stdout.write(f'verifies/sec: {verified / elapsed:.1f}')
+        if latencies:
+            self.stdout.write(
+                f'latency p50={latencies[len(latencies) // 2] * 1000:.1f}ms '
+                f'p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms'
+            )
+        if failures:
+            self.stdout.write(self.style.WARNING(f'{len(failures)} request(s) failed, e.g. {failures[:5]}'))
+        if stock_left == expected_stock:
+            self.stdout.write(self.style.SUCCESS('Stock is consistent with verified sales.'))
+        else:
+            self.stdout.write(self.style.ERROR(f'Stock drift: {stock_left} left, expected {expected_stock}'))
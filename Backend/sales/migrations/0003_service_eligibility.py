@@ -0,0 +1,52 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_service_eligibility(apps, schema_editor):
+    """One row per (customer, vehicle) with verified sales, archived ones included"""
+    ServiceEligibility = apps.get_model('sales', 'ServiceEligibility')
+    counts = {}
+    for name in ('Sale', 'ArchivedSale'):
+        model = apps.get_model('sales', name)
+        for row in model.objects.filter(status='verified').values(
+            'customer_id', 'vehicle_id'
+        ).annotate(count=models.Count('id')).order_by():
+            key = (row['customer_id'], row['vehicle_id'])
+            counts[key] = counts.get(key, 0) + row['count']
+    ServiceEligibility.objects.bulk_create([
+        ServiceEligibility(customer_id=customer_id, vehicle_id=vehicle_id, verified_sales=count)
+        for (customer_id, vehicle_id), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0003_low_stock_alerts'),
+        ('sales', '0002_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceEligibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verified_sales', models.PositiveIntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_eligibility', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_eligibility', to='inventory.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Service Eligibility',
+                'verbose_name_plural': 'Service Eligibility',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='serviceeligibility',
+            constraint=models.UniqueConstraint(fields=('customer', 'vehicle'), name='unique_service_eligibility'),
+        ),
+        migrations.RunPython(backfill_service_eligibility, migrations.RunPython.noop),
+    ]
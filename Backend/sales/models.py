@@ -1,16 +1,23 @@
 """
 Models for sales app - Sales transactions
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-from accounts.models import User
-from inventory.models import Vehicle
+from accounts.models import User, CustomerStats
+from inventory.models import Vehicle, StockMovement
+from config.archive import ArchiveModelMixin
+from changes.models import ChangeFeedModelMixin
 
 
-class Sale(models.Model):
+class Sale(ChangeFeedModelMixin, models.Model):
     """Sale model for vehicle purchases"""
     
+    change_entity = 'sale'
+    change_fields = ('status',)
+    
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('verified', 'Verified'),
@@ -62,26 +69,257 @@ class Sale(models.Model):
         return f"Sale #{self.id} - {self.customer.name} - {self.vehicle.brand} {self.vehicle.model}"
     
     def verify(self, admin_user):
-        """Verify sale and update stock"""
+        """
+        Verify sale and update stock.
+        
+        The pending -> verified transition and the stock decrement are both
+        guarded UPDATEs touching only the changed columns, so concurrent
+        admins cannot verify a sale twice or oversell a vehicle. The instance
+        (and its cached vehicle) is updated in place without re-reading.
+        """
         if self.status != 'pending':
             return False
         
-        # Reduce stock
-        if self.vehicle.reduce_stock(self.quantity):
-            self.status = 'verified'
-            from django.utils import timezone
-            self.verified_at = timezone.now()
-            self.verified_by = admin_user
-            self.save()
-            return True
-        return False
-    
-    def cancel(self):
+        verified_at = timezone.now()
+        with transaction.atomic():
+            claimed = Sale.objects.filter(pk=self.pk, status='pending').update(
+                status='verified',
+                verified_at=verified_at,
+                verified_by=admin_user,
+            )
+            if not claimed:
+                return False
+            
+            # Reduce stock
+            if not self.vehicle.reduce_stock(
+                self.quantity,
+                reason='sale_verified',
+                user=admin_user,
+                reference=self.id
+            ):
+                transaction.set_rollback(True)
+                return False
+            
+            CustomerStats.bump(self.customer_id, total_spent=self.amount, purchases=1)
+            ServiceEligibility.bump_many({(self.customer_id, self.vehicle_id): 1})
+            self.emit_change(status='verified')
+        
+        self.status = 'verified'
+        self.verified_at = verified_at
+        self.verified_by = admin_user
+        return True
+    
+    def cancel(self, user=None):
         """Cancel sale and restore stock"""
-        if self.status == 'verified':
-            # Restore stock
-            self.vehicle.add_stock(self.quantity)
+        with transaction.atomic():
+            previous_status = self.status
+            claimed = Sale.objects.filter(pk=self.pk, status=previous_status).update(
+                status='cancelled'
+            )
+            if not claimed:
+                return False
+            
+            if previous_status == 'verified':
+                # Restore stock
+                self.vehicle.add_stock(
+                    self.quantity,
+                    reason='sale_cancelled',
+                    user=user,
+                    reference=self.id
+                )
+                CustomerStats.bump(self.customer_id, total_spent=-self.amount, purchases=-1)
+                ServiceEligibility.bump_many({(self.customer_id, self.vehicle_id): -1})
+            self.emit_change(status='cancelled')
         
         self.status = 'cancelled'
-        self.save()
         return True
+    
+    @classmethod
+    def bulk_verify(cls, sale_ids, admin_user):
+        """
+        Verify many pending sales in one transaction.
+        
+        The involved vehicles are locked once, oldest sales claim stock first,
+        each vehicle's stock is decremented by one set-based UPDATE and all
+        verified sales are marked with a single UPDATE.
+        Returns {sale_id: outcome}.
+        """
+        outcomes = {sale_id: 'not_found' for sale_id in sale_ids}
+        
+        with transaction.atomic():
+            sales = list(
+                cls.objects.select_for_update()
+                .filter(id__in=sale_ids)
+                .only('id', 'customer_id', 'vehicle_id', 'amount', 'quantity', 'status')
+                .order_by('id')
+            )
+            pending = []
+            for sale in sales:
+                if sale.status == 'pending':
+                    pending.append(sale)
+                else:
+                    outcomes[sale.id] = f'already_{sale.status}'
+            
+            vehicles = {
+                vehicle.id: vehicle
+                for vehicle in Vehicle.objects.select_for_update().filter(
+                    id__in={sale.vehicle_id for sale in pending}
+                ).order_by('id')
+            }
+            
+            taken = {}
+            verified = []
+            for sale in pending:
+                vehicle = vehicles[sale.vehicle_id]
+                if vehicle.stock_qty >= sale.quantity:
+                    vehicle.stock_qty -= sale.quantity
+                    taken[vehicle.id] = taken.get(vehicle.id, 0) + sale.quantity
+                    verified.append(sale)
+                    outcomes[sale.id] = 'verified'
+                else:
+                    outcomes[sale.id] = 'insufficient_stock'
+            
+            if verified:
+                now = timezone.now()
+                Vehicle.objects.filter(id__in=taken).update(
+                    stock_qty=Case(
+                        *[When(id=vehicle_id, then=F('stock_qty') - quantity)
+                          for vehicle_id, quantity in taken.items()],
+                        output_field=models.PositiveIntegerField()
+                    ),
+                    updated_at=now,
+                )
+                cls.objects.filter(id__in=[sale.id for sale in verified]).update(
+                    status='verified',
+                    verified_at=now,
+                    verified_by=admin_user,
+                )
+                for sale in verified:
+                    sale.status = 'verified'
+                cls.emit_changes(verified)
+                StockMovement.record([
+                    vehicles[sale.vehicle_id].stock_movement(
+                        -sale.quantity, 'sale_verified', admin_user, sale.id
+                    )
+                    for sale in verified
+                ])
+                
+                spent = {}
+                for sale in verified:
+                    deltas = spent.setdefault(sale.customer_id, {'total_spent': Decimal('0.00'), 'purchases': 0})
+                    deltas['total_spent'] += sale.amount
+                    deltas['purchases'] += 1
+                CustomerStats.bump_many(spent)
+                
+                owned = {}
+                for sale in verified:
+                    key = (sale.customer_id, sale.vehicle_id)
+                    owned[key] = owned.get(key, 0) + 1
+                ServiceEligibility.bump_many(owned)
+        
+        return outcomes
+
+
+class ServiceEligibility(models.Model):
+    """
+    Vehicles each customer may book service for: one row per (customer,
+    vehicle) counting their verified sales, kept current by verify,
+    cancel and bulk_verify. Rows survive archiving of the sales.
+    """
+    customer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='service_eligibility'
+    )
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='service_eligibility'
+    )
+    verified_sales = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Service Eligibility'
+        verbose_name_plural = 'Service Eligibility'
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'vehicle'], name='unique_service_eligibility'),
+        ]
+    
+    def __str__(self):
+        return f"Customer #{self.customer_id} - vehicle #{self.vehicle_id} ({self.verified_sales})"
+    
+    @classmethod
+    def allows(cls, customer_id, vehicle_id):
+        """Whether the customer may book service for the vehicle: one lookup on the unique index"""
+        return cls.objects.filter(customer_id=customer_id, vehicle_id=vehicle_id, verified_sales__gt=0).exists()
+    
+    @classmethod
+    def bump_many(cls, deltas):
+        """Apply {(customer_id, vehicle_id): delta}"""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        
+        cls.objects.bulk_create(
+            [cls(customer_id=customer_id, vehicle_id=vehicle_id) for customer_id, vehicle_id in deltas],
+            ignore_conflicts=True
+        )
+        for delta in set(deltas.values()):
+            pairs = models.Q()
+            for (customer_id, vehicle_id), value in deltas.items():
+                if value == delta:
+                    pairs |= models.Q(customer_id=customer_id, vehicle_id=vehicle_id)
+            cls.objects.filter(pairs).update(
+                verified_sales=Case(
+                    When(verified_sales__gte=-delta, then=F('verified_sales') + Value(delta)),
+                    default=Value(0)
+                )
+            )
+
+
+class ArchivedSale(ArchiveModelMixin, models.Model):
+    """
+    Closed sales moved out of the hot table by archive_records.
+    Same columns and ids as Sale, so history readers can merge the two.
+    """
+    
+    archive_source = 'sales.Sale'
+    closed_statuses = ('verified', 'cancelled')
+    
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_purchases'
+    )
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='archived_sales'
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=Sale.STATUS_CHOICES)
+    date = models.DateTimeField()
+    verified_at = models.DateTimeField(null=True, blank=True)
+    verified_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_verified_sales'
+    )
+    notes = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Archived Sale'
+        verbose_name_plural = 'Archived Sales'
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['customer', 'date']),
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"Archived Sale #{self.id}"
@@ -3,16 +3,31 @@ Serializers for sales app
 """
 from rest_framework import serializers
 from .models import Sale
+from config.fieldsets import SparseFieldsetSerializerMixin
 from inventory.serializers import VehicleListSerializer
 from accounts.serializers import UserSerializer
 
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Sale model"""
     vehicle_details = VehicleListSerializer(source='vehicle', read_only=True)
     customer_details = serializers.SerializerMethodField()
     verified_by_details = serializers.SerializerMethodField()
     
+    sparse_sources = {
+        'vehicle_details': (
+            'vehicle__id', 'vehicle__brand', 'vehicle__model', 'vehicle__price',
+            'vehicle__stock_qty', 'vehicle__description', 'vehicle__is_active',
+            'vehicle__image'
+        ),
+        'customer_details': (
+            'customer__id', 'customer__name', 'customer__email', 'customer__mobile'
+        ),
+        'verified_by_details': (
+            'verified_by__id', 'verified_by__name', 'verified_by__email'
+        ),
+    }
+    
     class Meta:
         model = Sale
         fields = [
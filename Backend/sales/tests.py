@@ -0,0 +1,194 @@
+"""
+Tests for sales app
+"""
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from inventory.models import StockMovement, Vehicle
+from service.models import ServiceRequest
+from service.views import ServiceRequestViewSet
+from .models import Sale
+from .views import SaleViewSet
+
+
+class FastListRenderingTests(TestCase):
+    """The RowBuilder list path (config.rows) renders exactly what the serializers do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password=None, name='Admin',
+            mobile='8000000000', role='admin', is_verified=True,
+        )
+        cls.customer = User.objects.create_user(
+            email='customer@example.com', password=None, name='Customer',
+            mobile='7000000000', is_verified=True,
+        )
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                brand='Hero', model=f'Model {i}', price=Decimal('54999.50'),
+                stock_qty=i % 3, description='Commuter' if i % 2 else None,
+                image=f'vehicles/model-{i}.jpg' if i % 2 else None,
+            )
+            for i in range(4)
+        ])
+        now = timezone.now()
+        # Every status, with and without the nullable fields
+        Sale.objects.bulk_create([
+            Sale(
+                customer=cls.customer,
+                vehicle=vehicles[i % len(vehicles)],
+                amount=Decimal('54999.50'),
+                quantity=1 + i % 2,
+                status=('pending', 'verified', 'cancelled')[i % 3],
+                verified_at=now if i % 3 == 1 else None,
+                verified_by=cls.admin if i % 3 == 1 else None,
+                notes='Paid in cash' if i % 5 == 0 else None,
+            )
+            for i in range(30)
+        ])
+        ServiceRequest.objects.bulk_create([
+            ServiceRequest(
+                customer=cls.customer,
+                vehicle=vehicles[i % len(vehicles)],
+                description='General service',
+                status=('pending', 'in_progress', 'completed', 'cancelled')[i % 4],
+                cost=Decimal('1250.00') * (i % 4),
+                scheduled_date=now if i % 2 else None,
+                completed_date=now if i % 4 == 2 else None,
+                assigned_to=cls.admin if i % 4 in (1, 2) else None,
+                notes='Chain noise' if i % 3 == 0 else None,
+            )
+            for i in range(30)
+        ])
+
+    def render(self, viewset, action, user, params, fast):
+        view = viewset.as_view({'get': action}, throttle_classes=[])
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=user)
+        with override_settings(FAST_LIST_RENDERING=fast):
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        return JSONRenderer().render(response.data)
+
+    def assertSameOutput(self, viewset, action, user, params=None):
+        params = params or {}
+        serialized = self.render(viewset, action, user, params, fast=False)
+        fast = self.render(viewset, action, user, params, fast=True)
+        self.assertEqual(fast, serialized)
+
+    def test_sales_list(self):
+        self.assertSameOutput(SaleViewSet, 'list', self.admin)
+
+    def test_sales_list_sparse_fields(self):
+        self.assertSameOutput(SaleViewSet, 'list', self.admin, {'fields': 'id,status,amount,customer_details'})
+
+    def test_sales_list_omit(self):
+        self.assertSameOutput(SaleViewSet, 'list', self.admin, {'omit': 'vehicle_details,notes'})
+
+    def test_my_purchases_keyset_page(self):
+        self.assertSameOutput(SaleViewSet, 'my_purchases', self.customer, {'limit': 10})
+
+    def test_service_list(self):
+        self.assertSameOutput(ServiceRequestViewSet, 'list', self.admin)
+
+    def test_service_list_filtered(self):
+        self.assertSameOutput(ServiceRequestViewSet, 'list', self.admin, {'status': 'in_progress'})
+
+    def test_my_services(self):
+        self.assertSameOutput(ServiceRequestViewSet, 'my_services', self.customer)
+
+
+class ConcurrentVerifyTests(TransactionTestCase):
+    """Two admins verifying sales of the last unit in overlapping transactions"""
+
+    def setUp(self):
+        self.admins = [
+            User.objects.create_user(
+                email=f'admin{n}@example.com', password=None, name=f'Admin {n}',
+                mobile=f'800000000{n}', role='admin', is_verified=True,
+            )
+            for n in range(2)
+        ]
+        customer = User.objects.create_user(
+            email='customer@example.com', password=None, name='Customer',
+            mobile='7000000000', is_verified=True,
+        )
+        self.vehicle = Vehicle.objects.create(brand='Hero', model='Splendor', price=Decimal('75000'), stock_qty=1)
+        self.sales = [
+            Sale.objects.create(customer=customer, vehicle=self.vehicle, amount=self.vehicle.price)
+            for _ in range(2)
+        ]
+
+    def overlap(self, first, second):
+        """
+        Run first() and second() in their own threads and transactions;
+        second() starts while first() holds its stock decrement uncommitted
+        """
+        decremented = threading.Event()
+        record = StockMovement.record.__func__
+
+        def slow_record(cls, *args, **kwargs):
+            movements = record(cls, *args, **kwargs)
+            if threading.current_thread().name == 'first':
+                decremented.set()
+                time.sleep(0.3)
+            return movements
+
+        results, errors = {}, []
+
+        def run(name, work, wait):
+            try:
+                if wait:
+                    decremented.wait(5)
+                results[name] = work()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, name='first', args=('first', first, False)),
+            threading.Thread(target=run, name='second', args=('second', second, True)),
+        ]
+        with mock.patch.object(StockMovement, 'record', classmethod(slow_record)):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        return results['first'], results['second']
+
+    def assertSoldOnce(self):
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.stock_qty, 0)
+        self.assertEqual(Sale.objects.filter(status='verified').count(), 1)
+        self.assertEqual(self.vehicle.stock_movements.filter(reason='sale_verified').count(), 1)
+
+    def test_two_verifies(self):
+        first, second = self.overlap(
+            lambda: Sale.objects.get(pk=self.sales[0].pk).verify(self.admins[0]),
+            lambda: Sale.objects.get(pk=self.sales[1].pk).verify(self.admins[1]),
+        )
+
+        self.assertEqual((first, second), (True, False))
+        self.assertSoldOnce()
+
+    def test_bulk_verify_and_verify(self):
+        first, second = self.overlap(
+            lambda: Sale.bulk_verify([self.sales[0].pk], self.admins[0]),
+            lambda: Sale.objects.get(pk=self.sales[1].pk).verify(self.admins[1]),
+        )
+
+        self.assertEqual((first, second), ({self.sales[0].pk: 'verified'}, False))
+        self.assertSoldOnce()
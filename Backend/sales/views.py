@@ -8,19 +8,23 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 
-from .models import Sale
+from .models import Sale, ArchivedSale
 from .serializers import SaleSerializer, SaleCreateSerializer, SaleListSerializer
 from accounts.permissions import IsAdmin, IsCustomer
+from config.fieldsets import SparseFieldsetViewMixin
+from config.pagination import KeysetHistoryMixin
+from config.rows import FastListMixin
 
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(FastListMixin, SparseFieldsetViewMixin, KeysetHistoryMixin, viewsets.ModelViewSet):
     """
     ViewSet for Sale management
     
-    GET /api/sales/sales/ - List sales (Admin: all, Customer: own)
+    GET /api/sales/sales/ - List sales (Admin: all, Customer: own, supports ?fields=/?omit=)
     GET /api/sales/sales/{id}/ - Get sale details
     POST /api/sales/sales/ - Create sale (Purchase vehicle)
     PATCH /api/sales/sales/{id}/verify/ - Verify sale (Admin only)
+    POST /api/sales/sales/bulk_verify/ - Verify many sales at once (Admin only)
     PATCH /api/sales/sales/{id}/cancel/ - Cancel sale
     """
     permission_classes = [IsAuthenticated]
@@ -28,6 +32,11 @@ class SaleViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'vehicle', 'customer']
     ordering_fields = ['date', 'amount']
     ordering = ['-date']
+    sparse_fieldset_actions = ('list', 'my_purchases')
+    fast_list_actions = ('list', 'my_purchases')
+    # Query budgets (config.middleware); my_purchases may also read the archive
+    query_budget = {'list': 6, 'retrieve': 4, 'my_purchases': 8}
+    BULK_VERIFY_LIMIT = 1000
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -45,7 +54,13 @@ class SaleViewSet(viewsets.ModelViewSet):
         if self.request.user.role == 'customer':
             queryset = queryset.filter(customer=self.request.user)
         
-        return queryset
+        return self.sparse_queryset(queryset)
+    
+    def history_archive_queryset(self):
+        """Archived purchases merged into my_purchases"""
+        return ArchivedSale.objects.select_related(
+            'customer', 'vehicle', 'verified_by'
+        ).filter(customer=self.request.user)
     
     def create(self, request, *args, **kwargs):
         """Create a new sale (Purchase vehicle)"""
@@ -82,6 +97,47 @@ class SaleViewSet(viewsets.ModelViewSet):
                 'error': 'Failed to verify sale. Insufficient stock.'
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin])
+    def bulk_verify(self, request):
+        """
+        POST /api/sales/sales/bulk_verify/
+        Verify a batch of pending sales (Admin only)
+        
+        Body: {"ids": [1, 2, 3]}
+        Each sale is reported as verified, insufficient_stock, not_found,
+        already_verified or already_cancelled.
+        """
+        ids = request.data.get('ids')
+        
+        if not isinstance(ids, list) or not ids:
+            return Response({
+                'error': 'ids must be a non-empty list of sale IDs.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(ids) > self.BULK_VERIFY_LIMIT:
+            return Response({
+                'error': f'At most {self.BULK_VERIFY_LIMIT} sales can be verified per request.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            ids = list(dict.fromkeys(int(sale_id) for sale_id in ids))
+        except (ValueError, TypeError):
+            return Response({
+                'error': 'Invalid sale ID. IDs must be integers.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        outcomes = Sale.bulk_verify(ids, request.user)
+        verified_count = sum(1 for outcome in outcomes.values() if outcome == 'verified')
+        
+        return Response({
+            'message': f'{verified_count} of {len(ids)} sales verified.',
+            'verified': verified_count,
+            'results': [
+                {'id': sale_id, 'status': outcomes[sale_id]}
+                for sale_id in ids
+            ]
+        }, status=status.HTTP_200_OK)
+    
     @action(detail=True, methods=['patch'])
     def cancel(self, request, pk=None):
         """
@@ -108,7 +164,10 @@ class SaleViewSet(viewsets.ModelViewSet):
                     'error': 'Only admin can cancel verified sales.'
                 }, status=status.HTTP_403_FORBIDDEN)
         
-        sale.cancel()
+        if not sale.cancel(request.user):
+            return Response({
+                'error': 'Sale was updated by another request. Please retry.'
+            }, status=status.HTTP_409_CONFLICT)
         
         return Response({
             'message': 'Sale cancelled successfully.',
@@ -120,10 +179,12 @@ class SaleViewSet(viewsets.ModelViewSet):
         """
         GET /api/sales/sales/my_purchases/
         Get current customer's purchase history
+        
+        Query Parameters:
+        - limit / cursor: Keyset pagination (returns has_more and next_cursor)
+        - stream=ndjson: Stream the full history as newline-delimited JSON
+        
+        Archived (older closed) purchases are included.
         """
         sales = self.get_queryset().filter(customer=request.user)
-        serializer = self.get_serializer(sales, many=True)
-        return Response({
-            'count': sales.count(),
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        return self.history_response(sales)
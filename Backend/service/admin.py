@@ -1,13 +1,35 @@
 """
 Admin configuration for service app
 """
+from django import forms
 from django.contrib import admin
-from .models import ServiceRequest
+from .models import (
+    ServiceRequest, ArchivedServiceRequest, ServiceSlot, SlotUnavailable, TechnicianLoad,
+    ServiceStatusTransition
+)
+
+
+class ServiceRequestAdminForm(forms.ModelForm):
+    """Reject scheduled dates outside workshop hours before save() books the slot"""
+    
+    class Meta:
+        model = ServiceRequest
+        fields = '__all__'
+    
+    def clean_scheduled_date(self):
+        value = self.cleaned_data.get('scheduled_date')
+        if value is not None:
+            try:
+                ServiceSlot.slot_start(value)
+            except SlotUnavailable as exc:
+                raise forms.ValidationError(str(exc))
+        return value
 
 
 @admin.register(ServiceRequest)
 class ServiceRequestAdmin(admin.ModelAdmin):
     """Admin interface for ServiceRequest model"""
+    form = ServiceRequestAdminForm
     list_display = [
         'id', 'customer', 'vehicle', 'status', 'cost',
         'date', 'scheduled_date', 'assigned_to', 'completed_date'
@@ -34,3 +56,51 @@ class ServiceRequestAdmin(admin.ModelAdmin):
             'fields': ('date', 'completed_date')
         }),
     )
+
+
+@admin.register(ArchivedServiceRequest)
+class ArchivedServiceRequestAdmin(admin.ModelAdmin):
+    """Read-only admin interface for archived service requests"""
+    list_display = ['id', 'customer', 'vehicle', 'status', 'cost', 'date', 'assigned_to', 'archived_at']
+    list_filter = ['status', 'date', 'archived_at']
+    search_fields = ['customer__name', 'customer__email', 'vehicle__brand', 'vehicle__model']
+    ordering = ['-date']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ServiceSlot)
+class ServiceSlotAdmin(admin.ModelAdmin):
+    """Admin interface for workshop slots (adjust capacity, e.g. when a bay is closed)"""
+    list_display = ['start', 'capacity', 'booked']
+    list_filter = ['start']
+    ordering = ['-start']
+    readonly_fields = ['booked']
+
+
+@admin.register(TechnicianLoad)
+class TechnicianLoadAdmin(admin.ModelAdmin):
+    """Admin interface for open jobs per admin (maintained automatically)"""
+    list_display = ['technician', 'open_jobs', 'updated_at']
+    search_fields = ['technician__email', 'technician__name']
+    ordering = ['open_jobs']
+    readonly_fields = ['technician', 'open_jobs', 'updated_at']
+
+
+@admin.register(ServiceStatusTransition)
+class ServiceStatusTransitionAdmin(admin.ModelAdmin):
+    """Read-only admin interface for service request status history"""
+    list_display = ['service_request_id', 'from_status', 'status', 'entered_at', 'left_at', 'changed_by']
+    list_filter = ['status', 'entered_at']
+    search_fields = ['service_request_id']
+    ordering = ['-entered_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,40 @@
+"""
+Recompute TechnicianLoad open job counts from service requests.
+
+    python manage.py reconcile_technician_load
+    python manage.py reconcile_technician_load --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from service.models import TechnicianLoad
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-admin open job counters used for automatic assignment and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report mismatches')
+
+    def handle(self, *args, **options):
+        expected = TechnicianLoad.compute()
+        existing = TechnicianLoad.objects.in_bulk(list(expected))
+
+        to_create, to_update = [], []
+        for technician_id, open_jobs in expected.items():
+            load = existing.get(technician_id)
+            if load is None:
+                to_create.append(TechnicianLoad(technician_id=technician_id, open_jobs=open_jobs))
+            elif load.open_jobs != open_jobs:
+                self.stdout.write(f'User #{technician_id}: open_jobs {load.open_jobs} -> {open_jobs}')
+                load.open_jobs = open_jobs
+                to_update.append(load)
+
+        self.stdout.write(f'{len(to_create)} missing row(s), {len(to_update)} drifted row(s).')
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            TechnicianLoad.objects.bulk_create(to_create)
+            TechnicianLoad.objects.bulk_update(to_update, ['open_jobs'])
+        self.stdout.write(self.style.SUCCESS('Technician load reconciled.'))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:34
+
+import config.archive
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0003_low_stock_alerts'),
+        ('service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedServiceRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('cost', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('date', models.DateTimeField()),
+                ('scheduled_date', models.DateTimeField(blank=True, null=True)),
+                ('completed_date', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField()),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_assigned_services', to=settings.AUTH_USER_MODEL)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_service_requests', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_service_requests', to='inventory.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Archived Service Request',
+                'verbose_name_plural': 'Archived Service Requests',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['customer', 'date'], name='service_arc_custome_e42d34_idx'), models.Index(fields=['date'], name='service_arc_date_de74d6_idx')],
+            },
+            bases=(config.archive.ArchiveModelMixin, models.Model),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:40
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def book_existing_requests(apps, schema_editor):
+    """Attach open scheduled requests to slots; never reject existing bookings"""
+    ServiceRequest = apps.get_model('service', 'ServiceRequest')
+    ServiceSlot = apps.get_model('service', 'ServiceSlot')
+    length = timedelta(minutes=settings.SERVICE_SLOT_MINUTES)
+    opens_at = time.fromisoformat(settings.SERVICE_WORKSHOP_OPENS)
+    closes_at = time.fromisoformat(settings.SERVICE_WORKSHOP_CLOSES)
+
+    bookings = {}
+    for request_id, scheduled in ServiceRequest.objects.filter(
+        status__in=['pending', 'in_progress'], scheduled_date__isnull=False
+    ).values_list('id', 'scheduled_date').iterator():
+        local = timezone.localtime(scheduled)
+        opens = timezone.make_aware(datetime.combine(local.date(), opens_at))
+        closes = timezone.make_aware(datetime.combine(local.date(), closes_at))
+        if not opens <= local < closes:
+            continue
+        start = opens + (local - opens) // length * length
+        if start + length <= closes:
+            bookings.setdefault(start, []).append(request_id)
+
+    for start, request_ids in bookings.items():
+        slot = ServiceSlot.objects.create(
+            start=start,
+            capacity=max(settings.SERVICE_BAYS, len(request_ids)),
+            booked=len(request_ids),
+        )
+        ServiceRequest.objects.filter(id__in=request_ids).update(slot=slot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0002_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(unique=True)),
+                ('capacity', models.PositiveIntegerField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Service Slot',
+                'verbose_name_plural': 'Service Slots',
+                'ordering': ['start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='serviceslot',
+            constraint=models.CheckConstraint(check=models.Q(('booked__lte', models.F('capacity'))), name='service_slot_not_overbooked'),
+        ),
+        migrations.AddField(
+            model_name='archivedservicerequest',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_requests', to='service.serviceslot'),
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='slot',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requests', to='service.serviceslot'),
+        ),
+        migrations.RunPython(book_existing_requests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_technician_load(apps, schema_editor):
+    """One row per admin (and past assignee) with their current open jobs"""
+    User = apps.get_model('accounts', 'User')
+    ServiceRequest = apps.get_model('service', 'ServiceRequest')
+    TechnicianLoad = apps.get_model('service', 'TechnicianLoad')
+    loads = {user_id: 0 for user_id in User.objects.filter(role='admin').values_list('id', flat=True)}
+    for row in ServiceRequest.objects.filter(
+        status__in=['pending', 'in_progress'], assigned_to__isnull=False
+    ).values('assigned_to_id').annotate(count=models.Count('id')).order_by():
+        loads[row['assigned_to_id']] = row['count']
+    TechnicianLoad.objects.bulk_create([
+        TechnicianLoad(technician_id=technician_id, open_jobs=open_jobs)
+        for technician_id, open_jobs in loads.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customer_stats'),
+        ('service', '0003_service_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TechnicianLoad',
+            fields=[
+                ('technician', models.OneToOneField(limit_choices_to={'role': 'admin'}, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='technician_load', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_jobs', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Technician Load',
+                'verbose_name_plural': 'Technician Loads',
+                'indexes': [models.Index(fields=['open_jobs', 'technician'], name='service_tec_open_jo_77e785_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_technician_load, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.9 on 2026-10-18 22:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_current_status(apps, schema_editor):
+    """Start each existing timeline with its current status (earlier history is unknown)"""
+    ServiceRequest = apps.get_model('service', 'ServiceRequest')
+    ServiceStatusTransition = apps.get_model('service', 'ServiceStatusTransition')
+    rows = ServiceRequest.objects.values_list('id', 'status', 'date', 'completed_date').iterator()
+    ServiceStatusTransition.objects.bulk_create((
+        ServiceStatusTransition(
+            service_request_id=request_id,
+            status=status,
+            entered_at=completed_date if status == 'completed' and completed_date else date
+        )
+        for request_id, status, date, completed_date in rows
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('service', '0004_technician_load'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('entered_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('left_at', models.DateTimeField(blank=True, null=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='service_transitions', to=settings.AUTH_USER_MODEL)),
+                ('service_request', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transitions', to='service.servicerequest')),
+            ],
+            options={
+                'verbose_name': 'Service Status Transition',
+                'verbose_name_plural': 'Service Status Transitions',
+                'ordering': ['entered_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'entered_at'], name='service_ser_status_65b61c_idx'), models.Index(fields=['service_request', 'entered_at'], name='service_ser_service_d483a7_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_current_status, migrations.RunPython.noop),
+    ]
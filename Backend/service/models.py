@@ -1,22 +1,241 @@
 """
 Models for service app - Service requests
 """
-from django.db import models
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, Max, Q, Value, When
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
-from accounts.models import User
+from accounts.models import User, CustomerStats
 from inventory.models import Vehicle
+from config.archive import ArchiveModelMixin
+from changes.models import ChangeFeedModelMixin
+
 
+class SlotUnavailable(Exception):
+    """The requested workshop slot is full or outside working hours"""
 
-class ServiceRequest(models.Model):
+
+class ServiceSlot(models.Model):
+    """
+    Occupancy counter for one workshop time slot. Rows are created when a
+    slot is first booked; slots without a row are empty with the default
+    capacity (SERVICE_BAYS). Bookings are guarded UPDATEs on `booked`.
+    """
+    
+    start = models.DateTimeField(unique=True)
+    capacity = models.PositiveIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Service Slot'
+        verbose_name_plural = 'Service Slots'
+        ordering = ['start']
+        constraints = [
+            models.CheckConstraint(check=Q(booked__lte=F('capacity')), name='service_slot_not_overbooked'),
+        ]
+    
+    def __str__(self):
+        return f"{timezone.localtime(self.start):%Y-%m-%d %H:%M} ({self.booked}/{self.capacity})"
+    
+    @property
+    def available(self):
+        return max(self.capacity - self.booked, 0)
+    
+    @staticmethod
+    def length():
+        return timedelta(minutes=settings.SERVICE_SLOT_MINUTES)
+    
+    @classmethod
+    def starts_between(cls, start, end):
+        """Slot start times within workshop hours in [start, end)"""
+        opens = time.fromisoformat(settings.SERVICE_WORKSHOP_OPENS)
+        closes = time.fromisoformat(settings.SERVICE_WORKSHOP_CLOSES)
+        day = timezone.localtime(start).date()
+        last_day = timezone.localtime(end).date()
+        while day <= last_day:
+            slot = timezone.make_aware(datetime.combine(day, opens))
+            day_end = timezone.make_aware(datetime.combine(day, closes))
+            while slot + cls.length() <= day_end:
+                if start <= slot < end:
+                    yield slot
+                slot += cls.length()
+            day += timedelta(days=1)
+    
+    @classmethod
+    def slot_start(cls, when):
+        """Start of the slot containing `when` (raises SlotUnavailable outside hours)"""
+        local = timezone.localtime(when)
+        opens = timezone.make_aware(datetime.combine(local.date(), time.fromisoformat(settings.SERVICE_WORKSHOP_OPENS)))
+        closes = timezone.make_aware(datetime.combine(local.date(), time.fromisoformat(settings.SERVICE_WORKSHOP_CLOSES)))
+        if not opens <= local < closes:
+            raise SlotUnavailable('The workshop is closed at this time.')
+        start = opens + (local - opens) // cls.length() * cls.length()
+        if start + cls.length() > closes:
+            raise SlotUnavailable('The workshop is closed at this time.')
+        return start
+    
+    @classmethod
+    def availability(cls, start, end):
+        """Every slot in [start, end) with its occupancy, from one indexed range read"""
+        rows = {
+            slot.start: slot
+            for slot in cls.objects.filter(start__gte=start, start__lt=end)
+        }
+        return [
+            rows.get(slot_start) or cls(start=slot_start, capacity=settings.SERVICE_BAYS)
+            for slot_start in cls.starts_between(start, end)
+        ]
+    
+    @classmethod
+    def book(cls, when):
+        """Take one place in the slot containing `when`; returns the slot"""
+        start = cls.slot_start(when)
+        slot, _ = cls.objects.get_or_create(start=start, defaults={'capacity': settings.SERVICE_BAYS})
+        taken = cls.objects.filter(pk=slot.pk, booked__lt=F('capacity')).update(booked=F('booked') + 1)
+        if not taken:
+            raise SlotUnavailable('This slot is fully booked.')
+        slot.booked += 1
+        return slot
+    
+    @classmethod
+    def release(cls, slot_id):
+        cls.objects.filter(pk=slot_id, booked__gt=0).update(booked=F('booked') - 1)
+    
+    @classmethod
+    def release_many(cls, slot_ids):
+        """Release one place per occurrence of each slot id with a single UPDATE"""
+        counts = {}
+        for slot_id in slot_ids:
+            counts[slot_id] = counts.get(slot_id, 0) + 1
+        if not counts:
+            return
+        cls.objects.filter(pk__in=counts).update(booked=Case(
+            *[When(pk=slot_id, booked__gte=count, then=F('booked') - count)
+              for slot_id, count in counts.items()],
+            default=Value(0)
+        ))
+
+
+class TechnicianLoad(models.Model):
+    """
+    Open (pending/in progress) service requests assigned to each admin, kept
+    current with F() updates on assignment and status changes. New requests
+    go to the least-loaded active admin, read from the (open_jobs, technician)
+    index rather than counted over service requests.
+    """
+    technician = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='technician_load',
+        limit_choices_to={'role': 'admin'}
+    )
+    open_jobs = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Technician Load'
+        verbose_name_plural = 'Technician Loads'
+        indexes = [
+            models.Index(fields=['open_jobs', 'technician']),
+        ]
+    
+    def __str__(self):
+        return f"Load for user #{self.technician_id}: {self.open_jobs}"
+    
+    @classmethod
+    def pick(cls):
+        """
+        ID of the active admin with the fewest open jobs, or None. Call it in
+        the booking's transaction: the row stays locked (FOR UPDATE SKIP
+        LOCKED) until the booking's open_jobs bump commits, so concurrent
+        bookings take the next admin instead of all reading the same one.
+        """
+        candidates = cls.objects.filter(
+            technician__role='admin', technician__is_active=True
+        ).order_by('open_jobs', 'technician_id')
+        features = connections[router.db_for_write(cls)].features
+        if features.has_select_for_update_skip_locked:
+            of = ('self',) if features.has_select_for_update_of else ()
+            technician_id = candidates.select_for_update(skip_locked=True, of=of).values_list(
+                'technician_id', flat=True
+            ).first()
+            if technician_id is not None:
+                return technician_id
+        # SQLite has no row locks (its writes are serialized); with every admin
+        # locked by other bookings, fall back to the least-loaded one
+        return candidates.values_list('technician_id', flat=True).first()
+    
+    @classmethod
+    def bump_many(cls, deltas):
+        """Apply {technician_id: delta} with a single UPDATE"""
+        deltas = {technician_id: delta for technician_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        
+        cls.objects.bulk_create([cls(technician_id=technician_id) for technician_id in deltas], ignore_conflicts=True)
+        cls.objects.filter(technician_id__in=deltas).update(
+            open_jobs=F('open_jobs') + Case(
+                *[When(technician_id=technician_id, then=Value(delta)) for technician_id, delta in deltas.items()],
+                default=Value(0)
+            ),
+            updated_at=timezone.now()
+        )
+    
+    @classmethod
+    def transition_deltas(cls, transitions):
+        """{technician_id: delta} for (old_status, old_assignee, new_status, new_assignee) tuples"""
+        deltas = {}
+        for old_status, old_assignee, new_status, new_assignee in transitions:
+            before = old_assignee if old_status in ServiceRequest.OPEN_STATUSES else None
+            after = new_assignee if new_status in ServiceRequest.OPEN_STATUSES else None
+            if before == after:
+                continue
+            if before is not None:
+                deltas[before] = deltas.get(before, 0) - 1
+            if after is not None:
+                deltas[after] = deltas.get(after, 0) + 1
+        return deltas
+    
+    @classmethod
+    def compute(cls):
+        """Recompute open job counts for every admin and assignee: {technician_id: open_jobs}"""
+        loads = {
+            technician_id: 0
+            for technician_id in User.objects.filter(role='admin').values_list('id', flat=True)
+        }
+        for row in ServiceRequest.objects.filter(
+            status__in=ServiceRequest.OPEN_STATUSES, assigned_to__isnull=False
+        ).values('assigned_to_id').annotate(count=models.Count('id')).order_by():
+            loads[row['assigned_to_id']] = row['count']
+        return loads
+
+
+class ServiceRequest(ChangeFeedModelMixin, models.Model):
     """ServiceRequest model for vehicle maintenance"""
     
+    change_entity = 'service_request'
+    change_fields = ('status', 'assigned_to_id')
+    
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+    OPEN_STATUSES = ('pending', 'in_progress')
+    # Transitions accepted by bulk_update_status
+    ALLOWED_TRANSITIONS = {
+        'pending': ('in_progress', 'completed', 'cancelled'),
+        'in_progress': ('pending', 'completed', 'cancelled'),
+        'completed': (),
+        'cancelled': (),
+    }
     
     id = models.BigAutoField(primary_key=True)
     customer = models.ForeignKey(
@@ -40,6 +259,14 @@ class ServiceRequest(models.Model):
     )
     date = models.DateTimeField(auto_now_add=True)
     scheduled_date = models.DateTimeField(null=True, blank=True)
+    slot = models.ForeignKey(
+        ServiceSlot,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='requests'
+    )
     completed_date = models.DateTimeField(null=True, blank=True)
     assigned_to = models.ForeignKey(
         User,
@@ -64,21 +291,332 @@ class ServiceRequest(models.Model):
     def __str__(self):
         return f"Service #{self.id} - {self.customer.name} - {self.vehicle.brand} {self.vehicle.model}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'status' in instance.__dict__:
+            instance._saved_status = instance.status
+        if 'scheduled_date' in instance.__dict__:
+            instance._saved_scheduled_date = instance.scheduled_date
+        if 'assigned_to_id' in instance.__dict__:
+            instance._saved_assigned_to_id = instance.assigned_to_id
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Save and apply the side effects of any status transition. New open
+        requests without an assignee go to the least-loaded admin (see
+        TechnicianLoad). Raises SlotUnavailable when a new or changed
+        scheduled_date cannot be booked.
+        """
+        if self._state.adding:
+            previous_status, previous_assignee, known = None, None, True
+        else:
+            previous_status = getattr(self, '_saved_status', None)
+            previous_assignee = getattr(self, '_saved_assigned_to_id', None)
+            known = hasattr(self, '_saved_status') and hasattr(self, '_saved_assigned_to_id')
+        
+        with transaction.atomic():
+            if (
+                self._state.adding
+                and self.assigned_to_id is None
+                and self.status in self.OPEN_STATUSES
+                and settings.SERVICE_AUTO_ASSIGN
+            ):
+                self.assigned_to_id = TechnicianLoad.pick()
+            self.sync_slot(previous_status)
+            super().save(*args, **kwargs)
+            if known and previous_status != self.status:
+                self.status_changed(previous_status)
+            if known:
+                TechnicianLoad.bump_many(TechnicianLoad.transition_deltas([
+                    (previous_status, previous_assignee, self.status, self.assigned_to_id)
+                ]))
+        self._saved_status = self.status
+        self._saved_scheduled_date = self.scheduled_date
+        self._saved_assigned_to_id = self.assigned_to_id
+    
+    def sync_slot(self, previous_status):
+        """Book the slot for scheduled_date and release the old one (cancelled requests hold none)"""
+        if (
+            not self._state.adding
+            and hasattr(self, '_saved_scheduled_date')
+            and self.scheduled_date == self._saved_scheduled_date
+            and (previous_status == 'cancelled') == (self.status == 'cancelled')
+        ):
+            return
+        
+        wanted = self.scheduled_date if self.status != 'cancelled' else None
+        if wanted is not None and self.slot_id and self.slot.start == ServiceSlot.slot_start(wanted):
+            return
+        
+        slot = ServiceSlot.book(wanted) if wanted is not None else None
+        if self.slot_id:
+            ServiceSlot.release(self.slot_id)
+        self.slot = slot
+    
+    def status_changed(self, previous_status):
+        """Keep derived data in step; previous_status is None on creation"""
+        was_open = previous_status in self.OPEN_STATUSES
+        is_open = self.status in self.OPEN_STATUSES
+        if was_open != is_open:
+            CustomerStats.bump(self.customer_id, open_services=1 if is_open else -1)
+        ServiceStatusTransition.record(
+            [(self.id, previous_status, self.status)],
+            changed_by=getattr(self, '_status_changed_by', None)
+        )
+        self._status_changed_by = None
+    
+    @classmethod
+    def statuses_changed(cls, service_requests, previous, changed_by=None):
+        """Bulk counterpart of status_changed; previous maps id -> (status, assigned_to_id)"""
+        deltas = {}
+        for service_request in service_requests:
+            was_open = previous[service_request.id][0] in cls.OPEN_STATUSES
+            is_open = service_request.status in cls.OPEN_STATUSES
+            if was_open != is_open:
+                user_deltas = deltas.setdefault(service_request.customer_id, {'open_services': 0})
+                user_deltas['open_services'] += 1 if is_open else -1
+        CustomerStats.bump_many(deltas)
+        TechnicianLoad.bump_many(TechnicianLoad.transition_deltas([
+            (*previous[service_request.id], service_request.status, service_request.assigned_to_id)
+            for service_request in service_requests
+        ]))
+        ServiceStatusTransition.record([
+            (service_request.id, previous[service_request.id][0], service_request.status)
+            for service_request in service_requests
+        ], changed_by=changed_by)
+    
     def update_status(self, new_status, admin_user=None):
-        """Update service status"""
+        """
+        Update service status. admin_user is recorded as the transition's
+        changed_by (the customer, for a cancellation) and is assigned the
+        job when it starts or completes.
+        """
         if new_status not in dict(self.STATUS_CHOICES):
             return False
         
         self.status = new_status
+        self._status_changed_by = admin_user
         
         from django.utils import timezone
         if new_status == 'completed':
             self.completed_date = timezone.now()
-            if admin_user:
+            if admin_user and not self.assigned_to_id:
                 self.assigned_to = admin_user
         elif new_status == 'in_progress':
-            if admin_user:
+            if admin_user and not self.assigned_to_id:
                 self.assigned_to = admin_user
         
         self.save()
         return True
+    
+    @classmethod
+    def bulk_update_status(cls, request_ids, new_status, admin_user=None, cost=None, notes=None):
+        """
+        Move many service requests to new_status in one transaction.
+        
+        Only ALLOWED_TRANSITIONS are applied. The requests are locked once and
+        updated with a single UPDATE (completed_date/assigned_to as in
+        update_status); cancelled requests release their slots together.
+        Returns {request_id: outcome}.
+        """
+        outcomes = {request_id: 'not_found' for request_id in request_ids}
+        
+        with transaction.atomic():
+            service_requests = list(
+                cls.objects.select_for_update()
+                .filter(id__in=request_ids)
+                .only('id', 'customer_id', 'status', 'slot_id', 'assigned_to_id')
+                .order_by('id')
+            )
+            moved = []
+            for service_request in service_requests:
+                if service_request.status == new_status:
+                    outcomes[service_request.id] = f'already_{new_status}'
+                elif new_status not in cls.ALLOWED_TRANSITIONS[service_request.status]:
+                    outcomes[service_request.id] = 'invalid_transition'
+                else:
+                    moved.append(service_request)
+                    outcomes[service_request.id] = 'updated'
+            
+            if moved:
+                changes = {'status': new_status}
+                if new_status == 'completed':
+                    changes['completed_date'] = timezone.now()
+                if new_status in ('completed', 'in_progress') and admin_user:
+                    changes['assigned_to'] = Coalesce(F('assigned_to'), Value(admin_user.id))
+                if new_status == 'cancelled':
+                    changes['slot'] = None
+                if cost is not None:
+                    changes['cost'] = cost
+                if notes is not None:
+                    changes['notes'] = notes
+                cls.objects.filter(id__in=[service_request.id for service_request in moved]).update(**changes)
+                
+                if new_status == 'cancelled':
+                    ServiceSlot.release_many(
+                        service_request.slot_id for service_request in moved if service_request.slot_id
+                    )
+                
+                previous = {}
+                for service_request in moved:
+                    previous[service_request.id] = (service_request.status, service_request.assigned_to_id)
+                    service_request.status = new_status
+                    if 'assigned_to' in changes:
+                        service_request.assigned_to_id = service_request.assigned_to_id or admin_user.id
+                cls.emit_changes(moved)
+                cls.statuses_changed(moved, previous, changed_by=admin_user)
+        
+        return outcomes
+
+
+class ServiceStatusTransition(models.Model):
+    """
+    One row per status a service request has been in: entered_at is when it
+    moved into `status`, left_at when it moved on (NULL while current).
+    Written by ServiceRequest.status_changed and statuses_changed. Rows are
+    kept when the request is archived, hence no database constraint.
+    """
+    id = models.BigAutoField(primary_key=True)
+    service_request = models.ForeignKey(
+        ServiceRequest,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='transitions'
+    )
+    from_status = models.CharField(max_length=20, choices=ServiceRequest.STATUS_CHOICES, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=ServiceRequest.STATUS_CHOICES)
+    entered_at = models.DateTimeField(default=timezone.now)
+    left_at = models.DateTimeField(null=True, blank=True)
+    changed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='service_transitions'
+    )
+    
+    class Meta:
+        verbose_name = 'Service Status Transition'
+        verbose_name_plural = 'Service Status Transitions'
+        ordering = ['entered_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'entered_at']),
+            models.Index(fields=['service_request', 'entered_at']),
+        ]
+    
+    def __str__(self):
+        return f"Service #{self.service_request_id}: {self.from_status or '-'} -> {self.status}"
+    
+    @property
+    def dwell(self):
+        """Time spent in this status so far"""
+        return (self.left_at or timezone.now()) - self.entered_at
+    
+    @classmethod
+    def record(cls, transitions, changed_by=None):
+        """Close the current rows and insert new ones for [(request_id, from_status, status)]"""
+        if not transitions:
+            return
+        now = timezone.now()
+        cls.objects.filter(
+            service_request_id__in=[request_id for request_id, _, _ in transitions],
+            left_at__isnull=True
+        ).update(left_at=now)
+        cls.objects.bulk_create([
+            cls(
+                service_request_id=request_id,
+                from_status=from_status,
+                status=status,
+                entered_at=now,
+                changed_by=changed_by
+            )
+            for request_id, from_status, status in transitions
+        ])
+    
+    @classmethod
+    def dwell_stats(cls, start=None, end=None):
+        """
+        Per-status time spent, for stays entered in [start, end):
+        {status: {'entered', 'current', 'average_seconds', 'max_seconds'}}.
+        Averages cover finished stays only; each status is one range scan
+        of the (status, entered_at) index.
+        """
+        dwell = ExpressionWrapper(F('left_at') - F('entered_at'), output_field=models.DurationField())
+        stats = {}
+        for status, _ in ServiceRequest.STATUS_CHOICES:
+            queryset = cls.objects.filter(status=status)
+            if start is not None:
+                queryset = queryset.filter(entered_at__gte=start)
+            if end is not None:
+                queryset = queryset.filter(entered_at__lt=end)
+            row = queryset.aggregate(
+                entered=Count('id'),
+                current=Count('id', filter=Q(left_at__isnull=True)),
+                average=Avg(dwell, filter=Q(left_at__isnull=False)),
+                longest=Max(dwell, filter=Q(left_at__isnull=False)),
+            )
+            stats[status] = {
+                'entered': row['entered'],
+                'current': row['current'],
+                'average_seconds': row['average'].total_seconds() if row['average'] is not None else None,
+                'max_seconds': row['longest'].total_seconds() if row['longest'] is not None else None,
+            }
+        return stats
+
+
+class ArchivedServiceRequest(ArchiveModelMixin, models.Model):
+    """
+    Closed service requests moved out of the hot table by archive_records.
+    Same columns and ids as ServiceRequest, so history readers can merge the two.
+    """
+    
+    archive_source = 'service.ServiceRequest'
+    closed_statuses = ('completed', 'cancelled')
+    
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_service_requests'
+    )
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='archived_service_requests'
+    )
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=ServiceRequest.STATUS_CHOICES)
+    cost = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    date = models.DateTimeField()
+    scheduled_date = models.DateTimeField(null=True, blank=True)
+    slot = models.ForeignKey(
+        ServiceSlot,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_requests'
+    )
+    completed_date = models.DateTimeField(null=True, blank=True)
+    assigned_to = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_assigned_services'
+    )
+    notes = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Archived Service Request'
+        verbose_name_plural = 'Archived Service Requests'
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['customer', 'date']),
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"Archived Service #{self.id}"
@@ -1,18 +1,84 @@
 """
 Serializers for service app
 """
+from django.utils import timezone
 from rest_framework import serializers
-from .models import ServiceRequest
+from .models import ServiceRequest, ServiceSlot, ServiceStatusTransition, SlotUnavailable
+from config.fieldsets import SparseFieldsetSerializerMixin
 from inventory.serializers import VehicleListSerializer
 from accounts.serializers import UserSerializer
 
 
-class ServiceRequestSerializer(serializers.ModelSerializer):
+def validate_slot_start(value, current=None):
+    """
+    scheduled_date must be the start of a workshop slot that has not begun
+    (`current`, the request's existing booking, is accepted unchanged)
+    """
+    if value is None or value == current:
+        return value
+    if value < timezone.now():
+        raise serializers.ValidationError('This slot has already started. Pick a later one.')
+    try:
+        start = ServiceSlot.slot_start(value)
+    except SlotUnavailable as exc:
+        raise serializers.ValidationError(str(exc))
+    if start != value:
+        raise serializers.ValidationError('Pick a slot start time from /api/service/slots/.')
+    return value
+
+
+class SlotBookingMixin:
+    """Report a slot lost to a concurrent booking as a validation error"""
+    
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        except SlotUnavailable as exc:
+            raise serializers.ValidationError({'scheduled_date': str(exc)})
+
+
+class ServiceSlotSerializer(serializers.ModelSerializer):
+    """Workshop slot availability"""
+    available = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = ServiceSlot
+        fields = ['start', 'capacity', 'booked', 'available']
+
+
+class ServiceStatusTransitionSerializer(serializers.ModelSerializer):
+    """One entry of a service request timeline"""
+    changed_by_name = serializers.CharField(source='changed_by.name', read_only=True, default=None)
+    duration_seconds = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ServiceStatusTransition
+        fields = ['from_status', 'status', 'entered_at', 'left_at', 'duration_seconds', 'changed_by', 'changed_by_name']
+    
+    def get_duration_seconds(self, obj):
+        return obj.dwell.total_seconds()
+
+
+class ServiceRequestSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for ServiceRequest model"""
     vehicle_details = VehicleListSerializer(source='vehicle', read_only=True)
     customer_details = serializers.SerializerMethodField()
     assigned_to_details = serializers.SerializerMethodField()
     
+    sparse_sources = {
+        'vehicle_details': (
+            'vehicle__id', 'vehicle__brand', 'vehicle__model', 'vehicle__price',
+            'vehicle__stock_qty', 'vehicle__description', 'vehicle__is_active',
+            'vehicle__image'
+        ),
+        'customer_details': (
+            'customer__id', 'customer__name', 'customer__email', 'customer__mobile'
+        ),
+        'assigned_to_details': (
+            'assigned_to__id', 'assigned_to__name', 'assigned_to__email'
+        ),
+    }
+    
     class Meta:
         model = ServiceRequest
         fields = [
@@ -50,15 +116,18 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
         return value
 
 
-from sales.models import Sale
+from sales.models import ServiceEligibility
 
-class ServiceRequestCreateSerializer(serializers.ModelSerializer):
+class ServiceRequestCreateSerializer(SlotBookingMixin, serializers.ModelSerializer):
     """Serializer for creating a service request"""
     class Meta:
         model = ServiceRequest
         fields = ['id', 'vehicle', 'description', 'scheduled_date', 'notes']
         read_only_fields = ['id']
     
+    def validate_scheduled_date(self, value):
+        return validate_slot_start(value)
+    
     def validate(self, attrs):
         """Validate service request creation"""
         vehicle = attrs.get('vehicle')
@@ -69,9 +138,8 @@ class ServiceRequestCreateSerializer(serializers.ModelSerializer):
                 'vehicle': 'This vehicle is not available.'
             })
             
-        # Check if user has purchased this vehicle
-        # We assume 'verified' status means completed purchase based on Sale model
-        if not Sale.objects.filter(customer=user, vehicle=vehicle, status='verified').exists():
+        # Check if user has purchased this vehicle (a verified sale, see ServiceEligibility)
+        if not ServiceEligibility.allows(user.id, vehicle.id):
             raise serializers.ValidationError({
                 'vehicle': 'You can only request service for vehicles you have purchased and received.'
             })
@@ -97,7 +165,7 @@ class ServiceRequestListSerializer(serializers.ModelSerializer):
         ]
 
 
-class ServiceRequestUpdateSerializer(serializers.ModelSerializer):
+class ServiceRequestUpdateSerializer(SlotBookingMixin, serializers.ModelSerializer):
     """Serializer for updating service request (Admin only)"""
     class Meta:
         model = ServiceRequest
@@ -105,6 +173,9 @@ class ServiceRequestUpdateSerializer(serializers.ModelSerializer):
             'status', 'cost', 'scheduled_date', 'assigned_to', 'notes'
         ]
     
+    def validate_scheduled_date(self, value):
+        return validate_slot_start(value, self.instance.scheduled_date if self.instance else None)
+    
     def validate_status(self, value):
         """Validate status transitions"""
         if value not in dict(ServiceRequest.STATUS_CHOICES):
@@ -0,0 +1,14 @@
+"""
+Signals for service app
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from accounts.models import User
+from .models import TechnicianLoad
+
+
+@receiver(post_save, sender=User)
+def create_technician_load(sender, instance, created, raw=False, **kwargs):
+    """Make admins eligible for automatic assignment"""
+    if instance.role == 'admin' and not raw:
+        TechnicianLoad.objects.get_or_create(technician=instance)
@@ -0,0 +1,138 @@
+"""
+Tests for service app
+"""
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from inventory.models import Vehicle
+from sales.models import ServiceEligibility
+from .models import ServiceRequest, TechnicianLoad
+
+
+class SlotBookingTests(TestCase):
+    """Only slots that have not started can be listed and booked"""
+    client_class = APIClient
+
+    # A Monday, half way through the 10:00 slot
+    NOW = timezone.make_aware(datetime(2025, 6, 2, 10, 30))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(
+            email='customer@example.com', password=None, name='Customer',
+            mobile='7000000000', is_verified=True,
+        )
+        cls.vehicle = Vehicle.objects.create(brand='Hero', model='Splendor', price=Decimal('75000'), stock_qty=5)
+        ServiceEligibility.objects.create(customer=cls.customer, vehicle=cls.vehicle, verified_sales=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.customer)
+        patcher = mock.patch('django.utils.timezone.now', return_value=self.NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def book(self, hour):
+        return self.client.post('/api/service/requests/', {
+            'vehicle': self.vehicle.id,
+            'description': 'General service',
+            'scheduled_date': timezone.make_aware(datetime(2025, 6, 2, hour)).isoformat(),
+        }, format='json')
+
+    def test_list_starts_at_the_next_slot(self):
+        response = self.client.get('/api/service/slots/', {'from': '2025-06-02', 'to': '2025-06-02'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['start'], '2025-06-02T11:00:00Z')
+        self.assertEqual(response.data['count'], 7)
+
+    def test_started_slot_is_rejected(self):
+        response = self.book(10)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('scheduled_date', response.data)
+        self.assertFalse(ServiceRequest.objects.exists())
+
+    def test_next_slot_can_be_booked(self):
+        response = self.book(11)
+
+        self.assertEqual(response.status_code, 201, response.data)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentAssignmentTests(TransactionTestCase):
+    """
+    Bookings in overlapping transactions go to different technicians
+    (SQLite serializes writes and has no row locks to skip)
+    """
+
+    def setUp(self):
+        self.admins = [
+            User.objects.create_user(
+                email=f'admin{n}@example.com', password=None, name=f'Admin {n}',
+                mobile=f'800000000{n}', role='admin', is_verified=True,
+            )
+            for n in range(2)
+        ]
+        self.customers = [
+            User.objects.create_user(
+                email=f'customer{n}@example.com', password=None, name=f'Customer {n}',
+                mobile=f'700000000{n}', is_verified=True,
+            )
+            for n in range(2)
+        ]
+        self.vehicle = Vehicle.objects.create(brand='Hero', model='Splendor', price=Decimal('75000'), stock_qty=5)
+
+    def book(self, customer):
+        return ServiceRequest.objects.create(
+            customer=customer, vehicle=self.vehicle, description='General service'
+        ).assigned_to_id
+
+    def test_overlapping_bookings_take_different_technicians(self):
+        # The first booking keeps its transaction (and the picked row lock)
+        # open until the second one has picked
+        picked = threading.Event()
+        bump_many = TechnicianLoad.bump_many.__func__
+
+        def slow_bump_many(cls, deltas):
+            bump_many(cls, deltas)
+            if threading.current_thread().name == 'first':
+                picked.set()
+                time.sleep(0.3)
+
+        results, errors = {}, []
+
+        def run(name, customer, wait):
+            try:
+                if wait:
+                    picked.wait(5)
+                results[name] = self.book(customer)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, name='first', args=('first', self.customers[0], False)),
+            threading.Thread(target=run, name='second', args=('second', self.customers[1], True)),
+        ]
+        with mock.patch.object(TechnicianLoad, 'bump_many', classmethod(slow_bump_many)):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+        self.assertEqual({results['first'], results['second']}, {admin.id for admin in self.admins})
+        self.assertEqual(
+            sorted(TechnicianLoad.objects.values_list('open_jobs', flat=True)), [1, 1]
+        )
@@ -3,10 +3,11 @@ URLs for service app
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ServiceRequestViewSet
+from .views import ServiceRequestViewSet, ServiceSlotViewSet
 
 router = DefaultRouter()
 router.register(r'requests', ServiceRequestViewSet, basename='servicerequest')
+router.register(r'slots', ServiceSlotViewSet, basename='serviceslot')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -30,6 +30,7 @@ export const API_ENDPOINTS = {
   UPDATE_SERVICE_STATUS: (id) => `/service/requests/${id}/update_status/`,
   CANCEL_SERVICE: (id) => `/service/requests/${id}/cancel/`,
   MY_SERVICES: '/service/requests/my_services/',
+  SERVICE_SLOTS: '/service/slots/',
   
   // Reports
   SALES_REPORT: '/reports/sales/',
@@ -14,6 +14,7 @@ import { toast } from 'react-toastify';
 const Services = () => {
   const [services, setServices] = useState([]);
   const [vehicles, setVehicles] = useState([]);
+  const [slots, setSlots] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showBookingForm, setShowBookingForm] = useState(false);
   const [formData, setFormData] = useState({
@@ -26,6 +27,7 @@ const Services = () => {
   useEffect(() => {
     fetchServices();
     fetchVehicles();
+    fetchSlots();
   }, []);
 
   const fetchServices = async () => {
@@ -48,6 +50,15 @@ const Services = () => {
     }
   };
 
+  const fetchSlots = async () => {
+    try {
+      const response = await serviceService.getAvailableSlots();
+      setSlots(response.results || []);
+    } catch (error) {
+      console.error('Error fetching slots:', error);
+    }
+  };
+
   const handleBookService = async (e) => {
     e.preventDefault();
     try {
@@ -61,8 +72,14 @@ const Services = () => {
       setShowBookingForm(false);
       setFormData({ vehicle: '', description: '', scheduled_date: '', notes: '' });
       fetchServices();
+      fetchSlots();
     } catch (error) {
-      toast.error(error.response?.data?.error || 'Failed to book service');
+      toast.error(
+        error.response?.data?.error ||
+        error.response?.data?.scheduled_date?.[0] ||
+        'Failed to book service'
+      );
+      fetchSlots();
     }
   };
 
@@ -165,13 +182,19 @@ const Services = () => {
                         </select>
                       </div>
                       <div className="col-md-6 mb-3">
-                        <label className="form-label">Scheduled Date</label>
-                        <input
-                          type="datetime-local"
-                          className="form-control"
+                        <label className="form-label">Scheduled Slot</label>
+                        <select
+                          className="form-select"
                           value={formData.scheduled_date}
                           onChange={(e) => setFormData({ ...formData, scheduled_date: e.target.value })}
-                        />
+                        >
+                          <option value="">No preference</option>
+                          {slots.map((slot) => (
+                            <option key={slot.start} value={slot.start}>
+                              {new Date(slot.start).toLocaleString()} ({slot.available} free)
+                            </option>
+                          ))}
+                        </select>
                       </div>
                     </div>
                     <div className="mb-3">
@@ -66,4 +66,14 @@ export const serviceService = {
     const response = await api.get(API_ENDPOINTS.MY_SERVICES);
     return response.data;
   },
+
+  /**
+   * Get workshop slots with free bays
+   */
+  getAvailableSlots: async (params = {}) => {
+    const response = await api.get(API_ENDPOINTS.SERVICE_SLOTS, {
+      params: { available: 'true', ...params },
+    });
+    return response.data;
+  },
 };